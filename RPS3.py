@@ -1,8 +1,17 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
-import sqlite3
 from datetime import datetime
-from main import msd_radix_sort
+from background import BackgroundRunner, JobCancelled
+from metrics import METRICS, enable_from_env
+from parsing import parse_ints
+from sort_cache import SortCache
+from storage import ArrayStorage, MetricsTable, format_preview
+
+# Начальное количество строк в окне просмотра БД (уточняется по высоте таблицы)
+PAGE_ROWS = 20
+
+# Шаг прокрутки колесом мыши в строках
+WHEEL_ROWS = 3
 
 
 class ArraySorterApp:
@@ -12,25 +21,26 @@ class ArraySorterApp:
         self.root.geometry("900x650")  # Увеличим размер окна
 
         # Подключение к БД
-        self.conn = sqlite3.connect('arrays.db')
-        self.create_table()
+        self.storage = ArrayStorage('arrays.db')
+        self.conn = self.storage.conn
+        # Повторно введенные массивы не сортируются заново
+        self.sort_cache = SortCache(self.storage)
+        # Метрики этапов пишутся в таблицу metrics, если задана переменная RPS3_METRICS
+        self.metrics_table = MetricsTable(self.storage) if enable_from_env() else None
+
+        # Окно просмотра БД: в таблице только видимые строки, остальные
+        # подгружаются при прокрутке по ключу (created_at, id)
+        self.page_rows = PAGE_ROWS
+        self.view_offset = 0  # Номер первой видимой строки
+        self.view_keys = []  # Ключи видимых строк
+        self.total_rows = 0
+
+        # Сортировка и запись в БД выполняются в фоновых потоках
+        self.runner = BackgroundRunner(root)
 
         # Создание интерфейса
         self.create_widgets()
-
-    def create_table(self):
-        """Создание таблицы в БД с полем для отсортированного массива"""
-        cursor = self.conn.cursor()
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS arrays (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                array_data TEXT NOT NULL,
-                sorted_array_data TEXT,
-                is_sorted BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        self.conn.commit()
+        self.runner.on_update = self.update_progress
 
     def create_widgets(self):
         """Создание элементов интерфейса"""
@@ -53,9 +63,17 @@ class ArraySorterApp:
         ttk.Button(input_frame, text="Сохранить в БД", command=self.save_to_db).grid(row=1, column=1, pady=5,
                                                                                      sticky=tk.E)
 
+        # Прогресс фоновых задач
+        self.progress_var = tk.DoubleVar()
+        ttk.Progressbar(input_frame, variable=self.progress_var, maximum=100).grid(row=2, column=0, columnspan=2,
+                                                                                   pady=5, sticky=tk.EW)
+        ttk.Button(input_frame, text="Отмена", command=self.runner.cancel_all).grid(row=2, column=2, padx=5)
+        self.jobs_var = tk.StringVar()
+        ttk.Label(input_frame, textvariable=self.jobs_var).grid(row=3, column=0, columnspan=2, sticky=tk.W)
+
         # Элементы работы с БД
         columns = ("id", "array_data", "sorted_array_data", "is_sorted", "created_at")
-        self.tree = ttk.Treeview(db_frame, columns=columns, show="headings")
+        self.tree = ttk.Treeview(db_frame, columns=columns, show="headings", height=PAGE_ROWS)
 
         # Настройка заголовков и ширины столбцов
         self.tree.heading("id", text="ID")
@@ -72,10 +90,14 @@ class ArraySorterApp:
 
         self.tree.pack(fill=tk.BOTH, expand=True)
 
-        # Добавим вертикальную прокрутку
-        scrollbar = ttk.Scrollbar(db_frame, orient="vertical", command=self.tree.yview)
-        scrollbar.pack(side="right", fill="y")
-        self.tree.configure(yscrollcommand=scrollbar.set)
+        # Добавим вертикальную прокрутку: ползунок отражает положение окна
+        # среди всех строк БД, а не среди загруженных в таблицу
+        self.scrollbar = ttk.Scrollbar(db_frame, orient="vertical", command=self.scroll_view)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.bind("<Configure>", self.on_tree_resize)
+        self.tree.bind("<MouseWheel>", self.on_mouse_wheel)
+        self.tree.bind("<Button-4>", self.on_mouse_wheel)
+        self.tree.bind("<Button-5>", self.on_mouse_wheel)
 
         button_frame = ttk.Frame(db_frame)
         button_frame.pack(fill=tk.X, pady=5)
@@ -96,43 +118,73 @@ class ArraySorterApp:
         self.refresh_db_view()
 
     def sort_array(self):
-        """Сортировка введенного массива"""
-        try:
-            arr = list(map(int, self.array_entry.get().split()))
-            sorted_arr = msd_radix_sort(arr)
-            self.array_entry.delete(0, tk.END)
-            self.array_entry.insert(0, ' '.join(map(str, sorted_arr)))
-            self.status_var.set("Массив успешно отсортирован")
-        except ValueError:
-            messagebox.showerror("Ошибка", "Введите только целые числа, разделенные пробелами!")
-            self.status_var.set("Ошибка ввода данных")
+        """Сортировка введенного массива (в фоновом потоке)"""
+        self.runner.submit("Сортировка", self.sort_job, self.array_entry.get(),
+                           on_done=self.on_sorted,
+                           on_error=lambda exc: self.on_job_error(
+                               exc, "Введите только целые числа, разделенные пробелами!", "Ошибка ввода данных"))
+        self.status_var.set("Сортировка...")
+
+    def sort_job(self, job, text):
+        """Фоновая задача: разбор и сортировка массива"""
+        with METRICS.timer("parse"):
+            arr = parse_ints(text)
+        job.check_cancelled()
+        return self.sort_cache.sort(arr, progress=job.report)
+
+    def on_sorted(self, sorted_arr):
+        self.array_entry.delete(0, tk.END)
+        self.array_entry.insert(0, ' '.join(map(str, sorted_arr)))
+        self.status_var.set(f"Массив успешно отсортирован (кэш: {self.sort_cache.format_stats()})")
 
     def save_to_db(self):
-        """Сохранение массива в БД с автоматической сортировкой"""
+        """Сохранение массива в БД с автоматической сортировкой (в фоновом потоке)"""
         array_data = self.array_entry.get()
         if not array_data:
             messagebox.showwarning("Предупреждение", "Введите массив для сохранения!")
             return
 
-        try:
-            # Преобразуем в массив чисел
-            arr = list(map(int, array_data.split()))
-
-            # Сортируем массив
-            sorted_arr = msd_radix_sort(arr)
-            sorted_data = ' '.join(map(str, sorted_arr))
-
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "INSERT INTO arrays (array_data, sorted_array_data, is_sorted) VALUES (?, ?, ?)",
-                (array_data, sorted_data, 1)  # Устанавливаем флаг is_sorted в 1
-            )
-            self.conn.commit()
-            self.status_var.set(f"Массив сохранен в БД. ID: {cursor.lastrowid}")
-            self.refresh_db_view()
-        except ValueError:
-            messagebox.showerror("Ошибка", "Массив должен содержать только целые числа!")
-            self.status_var.set("Ошибка: неверный формат массива")
+        # Несколько сохранений могут стоять в очереди одновременно
+        self.runner.submit("Сохранение", self.save_job, array_data,
+                           on_done=self.on_saved,
+                           on_error=lambda exc: self.on_job_error(
+                               exc, "Массив должен содержать только целые числа!", "Ошибка: неверный формат массива"))
+        self.status_var.set("Сохранение...")
+
+    def save_job(self, job, text):
+        """Фоновая задача: разбор, сортировка и запись массива в БД"""
+        # Преобразуем в массив чисел
+        with METRICS.timer("parse"):
+            arr = parse_ints(text)
+        job.check_cancelled()
+
+        # Сортируем массив
+        sorted_arr = self.sort_cache.sort(arr, progress=job.report)
+        job.check_cancelled()
+
+        return self.storage.insert(arr, sorted_arr)
+
+    def on_saved(self, array_id):
+        self.status_var.set(f"Массив сохранен в БД. ID: {array_id}")
+        self.refresh_db_view()
+
+    def on_job_error(self, exc, message, status):
+        """Обработка ошибки фоновой задачи в потоке Tk"""
+        if isinstance(exc, JobCancelled):
+            self.status_var.set(f"Отменено: {exc}")
+        elif isinstance(exc, ValueError):
+            messagebox.showerror("Ошибка", message)
+            self.status_var.set(status)
+        else:
+            messagebox.showerror("Ошибка", str(exc))
+            self.status_var.set(f"Ошибка: {exc}")
+
+    def update_progress(self):
+        """Обновление полосы прогресса по активным фоновым задачам"""
+        done, total = self.runner.progress()
+        self.progress_var.set(100 * done / total if total else 0)
+        active = len(self.runner.jobs)
+        self.jobs_var.set(f"Выполняется задач: {active}" if active else "")
 
     def load_from_db(self):
         """Загрузка массива из БД в поле ввода"""
@@ -142,13 +194,25 @@ class ArraySorterApp:
             return
 
         item = self.tree.item(selected_item[0])
-        array_data = item['values'][1]  # Берем исходный массив
+        try:
+            stored = self.storage.get(item['values'][0])
+        except ValueError as e:
+            # Текст строки старой схемы, который не удалось разобрать при миграции
+            messagebox.showerror("Ошибка", f"Массив ID {item['values'][0]} поврежден: {e}")
+            self.status_var.set(f"Ошибка: массив ID {item['values'][0]} поврежден")
+            return
+        if stored is None:
+            messagebox.showwarning("Предупреждение", "Массив не найден в БД!")
+            self.refresh_db_view()
+            return
+
+        array_data = ' '.join(map(str, stored[0]))  # Берем исходный массив
         self.array_entry.delete(0, tk.END)
         self.array_entry.insert(0, array_data)
         self.status_var.set(f"Массив ID {item['values'][0]} загружен")
 
     def edit_selected(self):
-        """Редактирование выбранного массива"""
+        """Редактирование выбранного массива (сортировка и запись - в фоновом потоке)"""
         selected_item = self.tree.selection()
         if not selected_item:
             messagebox.showwarning("Предупреждение", "Выберите массив для редактирования!")
@@ -163,31 +227,31 @@ class ArraySorterApp:
             messagebox.showwarning("Предупреждение", "Введите новые данные массива!")
             return
 
-        try:
-            # Проверяем корректность ввода
-            arr = list(map(int, current_data.split()))
-
-            # Сортируем новый массив
-            sorted_arr = msd_radix_sort(arr)
-            sorted_data = ' '.join(map(str, sorted_arr))
-
-            # Обновляем запись в БД
-            cursor = self.conn.cursor()
-            cursor.execute(
-                "UPDATE arrays SET array_data = ?, sorted_array_data = ?, is_sorted = 1 WHERE id = ?",
-                (current_data, sorted_data, array_id)
-            )
-            self.conn.commit()
-
-            self.status_var.set(f"Массив ID {array_id} успешно обновлен")
-            self.refresh_db_view()
-
-            # Очищаем поле ввода
-            self.array_entry.delete(0, tk.END)
+        self.runner.submit(f"Редактирование ID {array_id}", self.edit_job, array_id, current_data,
+                           on_done=self.on_edited,
+                           on_error=lambda exc: self.on_job_error(
+                               exc, "Массив должен содержать только целые числа!", "Ошибка: неверный формат массива"))
+        self.status_var.set(f"Обновление массива ID {array_id}...")
+
+    def edit_job(self, job, array_id, text):
+        """Фоновая задача: разбор, сортировка и обновление массива в БД"""
+        # Проверяем корректность ввода
+        with METRICS.timer("parse"):
+            arr = parse_ints(text)
+        job.check_cancelled()
+
+        # Сортируется только разность с сохраненным массивом; при большом
+        # изменении - весь массив через кэш
+        self.storage.update_incremental(array_id, arr,
+                                        sort_func=lambda values: self.sort_cache.sort(values, progress=job.report))
+        return array_id
+
+    def on_edited(self, array_id):
+        self.status_var.set(f"Массив ID {array_id} успешно обновлен")
+        self.refresh_db_view()
 
-        except ValueError:
-            messagebox.showerror("Ошибка", "Массив должен содержать только целые числа!")
-            self.status_var.set("Ошибка: неверный формат массива")
+        # Очищаем поле ввода
+        self.array_entry.delete(0, tk.END)
 
     def delete_from_db(self):
         """Удаление массива из БД"""
@@ -198,30 +262,96 @@ class ArraySorterApp:
 
         if messagebox.askyesno("Подтверждение", "Удалить выбранный массив из БД?"):
             item = self.tree.item(selected_item[0])
-            cursor = self.conn.cursor()
-            cursor.execute("DELETE FROM arrays WHERE id = ?", (item['values'][0],))
-            self.conn.commit()
+            self.storage.delete(item['values'][0])
             self.status_var.set(f"Массив ID {item['values'][0]} удален")
             self.refresh_db_view()
 
     def refresh_db_view(self):
-        """Обновление отображения данных из БД"""
+        """Обновление отображения данных из БД (загружается только видимая страница)"""
+        self.total_rows = self.storage.count()
+        if self.view_offset and self.view_keys:
+            # Остаемся на месте: страница от первой видимой строки
+            rows = self.storage.page(self.page_rows, self.view_keys[0], inclusive=True)
+        else:
+            self.view_offset = 0
+            rows = self.storage.page(self.page_rows)
+        self.show_rows(rows)
+
+    def show_rows(self, rows):
+        """Вывод страницы строк в таблицу и обновление ползунка"""
         for row in self.tree.get_children():
             self.tree.delete(row)
 
-        cursor = self.conn.cursor()
-        cursor.execute(
-            "SELECT id, array_data, sorted_array_data, is_sorted, created_at FROM arrays ORDER BY created_at DESC")
-
-        for row in cursor.fetchall():
+        for row in rows:
             # Форматируем данные для отображения
-            original_data = row[1] if len(row[1]) <= 20 else row[1][:17] + "..."
-            sorted_data = row[2] if row[2] and len(row[2]) <= 20 else (row[2][:17] + "..." if row[2] else "")
+            original_data = format_preview(row[1])
+            sorted_data = format_preview(row[2])
             is_sorted = "Да" if row[3] else "Нет"
             created_at = row[4].split('.')[0]  # Убираем миллисекунды
 
             self.tree.insert("", tk.END, values=(row[0], original_data, sorted_data, is_sorted, created_at))
 
+        self.view_keys = [(row[4], row[0]) for row in rows]
+        if self.total_rows:
+            self.scrollbar.set(self.view_offset / self.total_rows,
+                               min(self.view_offset + len(rows), self.total_rows) / self.total_rows)
+        else:
+            self.scrollbar.set(0, 1)
+
+    def scroll_view(self, *args):
+        """Обработка команд ползунка: ("moveto", доля) или ("scroll", шаг, "units"/"pages")"""
+        if args[0] == "moveto":
+            self.move_view(int(float(args[1]) * self.total_rows))
+        elif args[0] == "scroll":
+            self.scroll_rows(int(args[1]) * (self.page_rows if args[2] == "pages" else 1))
+
+    def move_view(self, offset):
+        """Переход к строке с номером offset (переход по ползунку)"""
+        self.view_offset = max(min(offset, self.total_rows - self.page_rows), 0)
+        self.show_rows(self.storage.page_at(self.view_offset, self.page_rows))
+
+    def scroll_rows(self, step):
+        """Прокрутка на step строк (вниз - положительный шаг)"""
+        if step > 0:
+            step = min(step, self.total_rows - self.page_rows - self.view_offset)
+            if step <= 0 or not self.view_keys:
+                return
+            if step > len(self.view_keys):
+                self.move_view(self.view_offset + step)
+                return
+            rows = self.storage.page(self.page_rows, self.view_keys[step - 1])
+        else:
+            if step == 0 or not self.view_keys:
+                return
+            if -step > self.page_rows:
+                self.move_view(self.view_offset + step)
+                return
+            key, moved = self.storage.key_before(self.view_keys[0], -step)
+            if moved == 0:
+                self.view_offset = 0
+                return
+            rows = self.storage.page(self.page_rows, key, inclusive=True)
+            step = -moved
+        self.view_offset = max(self.view_offset + step, 0)
+        self.show_rows(rows)
+
+    def on_mouse_wheel(self, event):
+        """Прокрутка колесом мыши (<MouseWheel> - Windows/macOS, <Button-4/5> - X11)"""
+        if event.num == 4 or getattr(event, "delta", 0) > 0:
+            self.scroll_rows(-WHEEL_ROWS)
+        else:
+            self.scroll_rows(WHEEL_ROWS)
+        return "break"
+
+    def on_tree_resize(self, event):
+        """Подстройка размера страницы под высоту таблицы"""
+        rowheight = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        # Одна строка высоты уходит на заголовки столбцов
+        rows = max(event.height // rowheight - 1, 1)
+        if rows != self.page_rows:
+            self.page_rows = rows
+            self.refresh_db_view()
+
     def show_help(self):
         """Отображение справки"""
         help_text = """MSD Radix Sort - GUI\n
@@ -235,6 +365,8 @@ class ArraySorterApp:
            - Нажмите 'Редактировать' для обновления выбранного массива
            - Нажмите 'Удалить выбранное' для удаления
         5. Используйте 'Обновить список' для актуализации данных
+        6. Сортировка и сохранение выполняются в фоне: ход работы
+           показывает полоса прогресса, 'Отмена' прерывает все задачи
 
         В таблице отображаются:
         - Исходный массив
@@ -247,8 +379,12 @@ class ArraySorterApp:
 
     def __del__(self):
         """Закрытие соединения с БД при завершении"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if hasattr(self, 'runner'):
+            self.runner.shutdown()
+        if getattr(self, 'metrics_table', None) is not None:
+            self.metrics_table.close()
+        if hasattr(self, 'storage'):
+            self.storage.close()
 
 
 if __name__ == "__main__":
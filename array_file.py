@@ -0,0 +1,177 @@
+import mmap
+import struct
+import sys
+from array import array
+from itertools import islice
+
+from vector_sort import is_numpy_array, np
+
+# Двоичный формат массива: заголовок HEADER и числа little-endian подряд.
+# Заголовок: сигнатура, версия формата, тип элементов (код array),
+# флаги, выравнивающий байт и количество элементов - всего 16 байт,
+# поэтому числа в отображенном файле выровнены по 8 байтам
+MAGIC = b"MSDA"
+VERSION = 1
+HEADER = struct.Struct("<4sBcBxQ")
+
+# Флаги заголовка
+FLAG_SORTED = 1
+
+# Допустимые типы элементов и их размер в байтах
+TYPECODES = {"b": 1, "h": 2, "i": 4, "q": 8}
+
+# Количество чисел, упаковываемых за одну запись
+WRITE_BLOCK = 65536
+
+
+def is_array_file(filename):
+    """Начинается ли файл с сигнатуры двоичного формата"""
+    with open(filename, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+def write_array_record(arr, f, is_sorted=False, typecode="q"):
+    """
+    Запись массива в двоичном формате в открытый двоичный файл.
+    Числа упаковываются блоками по WRITE_BLOCK, поэтому arr может быть
+    генератором: для файла с произвольным доступом количество элементов
+    дописывается в заголовок в конце, иначе генератор сначала собирается в array
+    :param arr: последовательность или итерируемый объект с целыми числами
+    :param f: двоичный файл (или sys.stdout.buffer); несколько записей подряд
+        читаются iter_array_records
+    :param is_sorted: установить в заголовке флаг "отсортирован"
+    :param typecode: тип элементов (см. TYPECODES)
+    :return: количество записанных чисел
+    """
+    if typecode not in TYPECODES:
+        raise ValueError(f"Неподдерживаемый тип элементов: {typecode}")
+    flags = FLAG_SORTED if is_sorted else 0
+
+    if is_numpy_array(arr):
+        arr = _pack_numpy(arr, typecode)
+        f.write(HEADER.pack(MAGIC, VERSION, typecode.encode(), flags, len(arr)))
+        f.write(arr.tobytes())
+        return len(arr)
+
+    length = len(arr) if hasattr(arr, "__len__") else None
+    if length is None and not f.seekable():
+        arr = _pack(arr, typecode)
+        length = len(arr)
+    start = f.tell() if length is None else None
+    f.write(HEADER.pack(MAGIC, VERSION, typecode.encode(), flags, length or 0))
+
+    count = 0
+    if isinstance(arr, array) and arr.typecode == typecode:
+        blocks = [arr]
+    else:
+        values = iter(arr)
+        blocks = iter(lambda: _pack(islice(values, WRITE_BLOCK), typecode), array(typecode))
+    for block in blocks:
+        if sys.byteorder == "big":
+            block = array(typecode, block)
+            block.byteswap()
+        f.write(block.tobytes())
+        count += len(block)
+
+    if length is None:
+        end = f.tell()
+        f.seek(start)
+        f.write(HEADER.pack(MAGIC, VERSION, typecode.encode(), flags, count))
+        f.seek(end)
+    elif count != length:
+        raise ValueError("Количество записанных чисел не совпадает с длиной массива")
+    return count
+
+
+def _pack(values, typecode):
+    """Упаковка чисел в array с понятной ошибкой переполнения"""
+    try:
+        return array(typecode, values)
+    except OverflowError:
+        raise ValueError(f"Числа не помещаются в тип элементов '{typecode}'") from None
+
+
+def _pack_numpy(arr, typecode):
+    """
+    Приведение массива numpy к типу элементов с той же проверкой, что у _pack:
+    astype молча отбрасывает дробную часть и старшие разряды
+    """
+    if arr.dtype.kind not in "iu":
+        raise ValueError(f"Записываются только целые числа, а не {arr.dtype}")
+    bits = 8 * TYPECODES[typecode]
+    if len(arr) and (int(arr.min()) < -(1 << bits - 1) or int(arr.max()) >= 1 << bits - 1):
+        raise ValueError(f"Числа не помещаются в тип элементов '{typecode}'")
+    return arr.astype(f"<i{TYPECODES[typecode]}", copy=False)
+
+
+def write_array_file(arr, filename, is_sorted=False, typecode="q"):
+    """
+    Сохранение массива в файл двоичного формата (см. write_array_record)
+    :return: количество записанных чисел
+    """
+    with open(filename, 'wb') as f:
+        return write_array_record(arr, f, is_sorted, typecode)
+
+
+def iter_array_records(buffer, use_numpy=False):
+    """
+    Разбор записей двоичного формата без копирования данных
+    :param buffer: объект с буферным протоколом (bytes, mmap, memoryview)
+    :param use_numpy: возвращать массивы numpy (если установлен)
+    :return: генератор пар (числа, отсортирован ли): memoryview нужного
+        типа (на big-endian платформе - array с переставленными байтами)
+        или массив numpy
+    """
+    view = memoryview(buffer).cast('B')
+    pos = 0
+    while pos < len(view):
+        if len(view) - pos < HEADER.size:
+            raise ValueError("Неполный заголовок двоичного массива")
+        magic, version, typecode, flags, length = HEADER.unpack_from(view, pos)
+        typecode = typecode.decode('latin-1')
+        if magic != MAGIC:
+            raise ValueError("Неверная сигнатура двоичного массива")
+        if version != VERSION:
+            raise ValueError(f"Неподдерживаемая версия двоичного формата: {version}")
+        if typecode not in TYPECODES:
+            raise ValueError(f"Неподдерживаемый тип элементов: {typecode}")
+        start = pos + HEADER.size
+        pos = start + length * TYPECODES[typecode]
+        if pos > len(view):
+            raise ValueError("Двоичный массив обрезан")
+
+        payload = view[start:pos]
+        if use_numpy and np is not None:
+            values = np.frombuffer(payload, dtype=f"<i{TYPECODES[typecode]}")
+        elif sys.byteorder == "little":
+            values = payload.cast(typecode)
+        else:
+            values = array(typecode)
+            values.frombytes(payload)
+            values.byteswap()
+        yield values, bool(flags & FLAG_SORTED)
+
+
+def map_array_file(filename):
+    """
+    Отображение файла в память (только чтение)
+    :return: mmap; данные остаются доступны, пока на него есть ссылки
+    """
+    with open(filename, 'rb') as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def read_array_file(filename, use_numpy=False):
+    """
+    Загрузка массива двоичного формата через mmap без копирования: числа
+    читаются с диска по мере обращения, а представление ссылается на
+    отображение файла
+    :param filename: имя файла
+    :param use_numpy: вернуть массив numpy (если установлен)
+    :return: (числа, отсортирован ли), см. iter_array_records
+    """
+    with open(filename, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"Файл {filename} не является двоичным массивом")
+    for record in iter_array_records(map_array_file(filename), use_numpy):
+        return record
@@ -0,0 +1,120 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Период опроса фоновых задач из потока Tk, мс
+POLL_INTERVAL = 50
+
+# Количество фоновых потоков по умолчанию
+DEFAULT_WORKERS = 2
+
+
+class JobCancelled(Exception):
+    """Задача отменена пользователем"""
+
+
+class Job:
+    """Фоновая задача: прогресс и флаг отмены, общие для потока Tk и рабочего потока"""
+
+    def __init__(self, description):
+        self.description = description
+        self.done = 0
+        self.total = 0
+        self.future = None
+        self._cancel = threading.Event()
+
+    def report(self, done, total):
+        """
+        Функция прогресса для msd_radix_sort (вызывается в рабочем потоке).
+        Прерывает сортировку исключением JobCancelled, если задача отменена
+        """
+        if self._cancel.is_set():
+            raise JobCancelled(self.description)
+        self.done, self.total = done, total
+
+    def check_cancelled(self):
+        """Проверка отмены между этапами задачи (вызывается в рабочем потоке)"""
+        if self._cancel.is_set():
+            raise JobCancelled(self.description)
+
+    def cancel(self):
+        """Отмена: задача из очереди не запустится, запущенная прервется на ближайшем report"""
+        self._cancel.set()
+        self.future.cancel()
+
+
+class BackgroundRunner:
+    """
+    Выполнение задач в пуле потоков, чтобы не блокировать интерфейс Tk.
+    Рабочие потоки не обращаются к виджетам: поток Tk опрашивает задачи через
+    root.after и сам вызывает обработчики результатов и обновления прогресса
+    """
+
+    def __init__(self, root, workers=DEFAULT_WORKERS):
+        """
+        :param root: корневое окно Tk
+        :param workers: количество рабочих потоков
+        """
+        self.root = root
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="background")
+        self.jobs = []  # (задача, on_done, on_error) в порядке запуска
+        self.on_update = None  # Вызывается в потоке Tk после каждого опроса
+        self._polling = False
+
+    def submit(self, description, func, *args, on_done=None, on_error=None):
+        """
+        Запуск func(job, *args) в рабочем потоке
+        :param description: описание задачи для строки состояния
+        :param on_done: обработчик результата on_done(result) в потоке Tk
+        :param on_error: обработчик исключения on_error(exc) в потоке Tk
+            (для отмененной задачи - JobCancelled)
+        :return: Job
+        """
+        job = Job(description)
+        job.future = self.executor.submit(func, job, *args)
+        self.jobs.append((job, on_done, on_error))
+        if not self._polling:
+            self._polling = True
+            self.root.after(POLL_INTERVAL, self._poll)
+        return job
+
+    def _poll(self):
+        """Передача результатов завершенных задач в поток Tk"""
+        pending = []
+        finished = []
+        for entry in self.jobs:
+            (finished if entry[0].future.done() else pending).append(entry)
+        self.jobs = pending
+
+        for job, on_done, on_error in finished:
+            exc = JobCancelled(job.description) if job.future.cancelled() else job.future.exception()
+            if exc is None:
+                if on_done is not None:
+                    on_done(job.future.result())
+            elif on_error is not None:
+                on_error(exc)
+
+        if self.on_update is not None:
+            self.on_update()
+        if self.jobs:
+            self.root.after(POLL_INTERVAL, self._poll)
+        else:
+            self._polling = False
+
+    def progress(self):
+        """
+        Суммарный прогресс активных задач
+        :return: (готово, всего) в элементах
+        """
+        done = sum(job.done for job, _, _ in self.jobs)
+        total = sum(job.total for job, _, _ in self.jobs)
+        return done, total
+
+    def cancel_all(self):
+        """Отмена всех активных и ожидающих задач"""
+        for job, _, _ in self.jobs:
+            job.cancel()
+
+    def shutdown(self):
+        """Отмена задач и остановка пула без ожидания"""
+        self.cancel_all()
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,277 @@
+import argparse
+import glob
+import os
+import sys
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+
+from array_file import iter_array_records, map_array_file, write_array_record
+from main import msd_radix_sort, write_ints
+from parsing import parse_ints, read_ints
+
+# Форматы ввода и вывода: text - целые числа через пробел,
+# binary - записи двоичного формата array_file подряд (по одной на массив)
+FORMATS = ("text", "binary")
+
+ENGINES = ("auto", "lists", "iterative", "inplace", "numpy")
+
+# Сколько строк стандартного ввода в режиме --lines передается процессу одной задачей
+LINES_PER_TASK = 1000
+
+# Сколько задач в среднем приходится на один процесс: задачи передаются
+# в пул пачками, чтобы тысячи мелких файлов не стоили отдельного обмена каждый
+TASKS_PER_WORKER = 4
+
+# Имя стандартного ввода в сообщениях и в --output-dir
+STDIN_NAME = "stdin"
+
+
+def expand_inputs(patterns):
+    """
+    Раскрытие шаблонов имен файлов (для оболочек, которые их не раскрывают)
+    :param patterns: имена файлов, шаблоны glob или '-' (стандартный ввод)
+    :return: список имен; шаблон без совпадений остается как есть,
+        чтобы ошибка открытия попала в отчет
+    """
+    paths = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern)) if pattern != '-' and glob.has_magic(pattern) else []
+        paths.extend(matches or [pattern])
+    return paths
+
+
+def output_names(paths):
+    """
+    Имена файлов результатов в --output-dir
+    :return: словарь {путь: имя}
+    :raise ValueError: у двух входов одинаковое имя файла (вход повторен, файлы
+        из разных каталогов или стандартный ввод и файл stdin) - результаты
+        затерли бы друг друга
+    """
+    names = {}
+    owners = {}
+    for path in paths:
+        name = STDIN_NAME if path == '-' else os.path.basename(path)
+        if name in owners:
+            raise ValueError(f"Результаты {owners[name]} и {path} попали бы в один файл {name}")
+        owners[name] = path
+        names[path] = name
+    return names
+
+
+def make_tasks(paths, options):
+    """
+    Задачи сортировки: по одной на файл; стандартный ввод читается здесь
+    и в режиме --lines делится на задачи по LINES_PER_TASK строк
+    :return: генератор кортежей (имя, путь или None, содержимое или None, настройки)
+    """
+    for path in paths:
+        if path != '-':
+            yield path, path, None, options
+            continue
+        if options["input_format"] == "binary":
+            yield STDIN_NAME, None, sys.stdin.buffer.read(), options
+        elif options["lines"]:
+            lines = sys.stdin.readlines()
+            for start in range(0, max(len(lines), 1), LINES_PER_TASK):
+                yield STDIN_NAME, None, ''.join(lines[start:start + LINES_PER_TASK]), options
+        else:
+            yield STDIN_NAME, None, sys.stdin.read(), options
+
+
+def read_arrays(path, content, input_format, lines):
+    """
+    Чтение массивов одного входа
+    :param path: имя файла (если content is None)
+    :param content: содержимое входа (str для text, bytes для binary) или None
+    :param lines: каждая строка текста - отдельный массив
+    :return: список массивов
+    """
+    if input_format == "binary":
+        buffer = map_array_file(path) if content is None else content
+        return [values for values, _ in iter_array_records(buffer)]
+    if content is None:
+        if not lines:
+            return [read_ints(path)]
+        with open(path, 'r') as f:
+            content = f.read()
+    if lines:
+        return [parse_ints(line) for line in content.splitlines() if line.strip()]
+    return [parse_ints(content)]
+
+
+def write_array(arr, f, output_format):
+    """Запись отсортированного массива: для text - одной строкой, для binary - записью в двоичный файл f"""
+    if output_format == "binary":
+        write_array_record(arr, f, is_sorted=True)
+    else:
+        write_ints(arr, f)
+        f.write('\n')
+
+
+def sort_task(task):
+    """
+    Выполнение задачи (в процессе пула или в основном процессе)
+    :param task: (имя, путь или None, содержимое или None, настройки)
+    :return: (имя, количество массивов, количество чисел, пары (массив или None,
+        отсортированный массив) для записи в основном процессе, ошибка или None);
+        результат файла при заданном output_dir уже записан процессом пула
+    """
+    name, path, content, options = task
+    try:
+        arrays = read_arrays(path, content, options["input_format"], options["lines"])
+        # msd_radix_sort возвращает массив из 0-1 чисел как есть - тоже представлением файла
+        pairs = [(_owned(arr) if options["keep_input"] else None,
+                  _owned(msd_radix_sort(arr, engine=options["engine"])))
+                 for arr in arrays]
+        numbers = sum(len(arr) for arr in arrays)
+        if options["output_dir"] is not None and path is not None:
+            # Результат файла пишется прямо в процессе пула; стандартный ввод
+            # может быть разделен на несколько задач - его пишет основной процесс
+            target = os.path.join(options["output_dir"], os.path.basename(name))
+            binary = options["output_format"] == "binary"
+            with open(target, 'wb' if binary else 'w') as f:
+                for _, sorted_arr in pairs:
+                    write_array(sorted_arr, f, options["output_format"])
+            if not options["keep_input"]:
+                pairs = []
+        return name, len(arrays), numbers, pairs, None
+    except (OSError, ValueError) as e:
+        return name, 0, 0, [], str(e)
+
+
+def _owned(arr):
+    """
+    Копия представления отображенного файла: memoryview нельзя передать
+    между процессами, а результат задачи может попасть в основной процесс
+    """
+    return array(arr.format, arr) if isinstance(arr, memoryview) else arr
+
+
+def run_tasks(tasks, jobs):
+    """
+    Выполнение задач в jobs процессах (при jobs == 1 - в текущем)
+    :return: итератор результатов sort_task в порядке задач
+    """
+    tasks = list(tasks)
+    if jobs <= 1 or len(tasks) <= 1:
+        yield from map(sort_task, tasks)
+        return
+    chunksize = max(len(tasks) // (jobs * TASKS_PER_WORKER), 1)
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        yield from pool.map(sort_task, tasks, chunksize=chunksize)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog="main.py",
+        description="Пакетная поразрядная сортировка файлов и стандартного ввода. "
+                    "Без аргументов main.py запускает интерактивное меню"
+    )
+    parser.add_argument("inputs", nargs="*",
+                        help="файлы или шаблоны (например data/*.txt); '-' - стандартный ввод")
+    parser.add_argument("-o", "--output",
+                        help="файл для результатов всех входов по порядку ('-' - стандартный вывод, "
+                             "по умолчанию, если не задан --to-db)")
+    parser.add_argument("--output-dir", help="каталог: результат каждого файла пишется в файл с тем же именем")
+    parser.add_argument("-j", "--jobs", type=int, default=1, help="количество процессов (0 - число ядер)")
+    parser.add_argument("--input-format", choices=FORMATS, default="text")
+    parser.add_argument("--output-format", choices=FORMATS, default="text")
+    parser.add_argument("--lines", action="store_true", help="каждая строка текстового входа - отдельный массив")
+    parser.add_argument("--engine", choices=ENGINES, default="auto", help="движок сортировки (см. msd_radix_sort)")
+    parser.add_argument("--to-db", metavar="PATH",
+                        help="добавить исходные и отсортированные массивы в БД (например arrays.db) "
+                             "одной транзакцией")
+    return parser
+
+
+def main(argv=None):
+    """
+    Пакетный режим main.py
+    :param argv: аргументы командной строки (по умолчанию sys.argv[1:])
+    :return: код завершения: 0 - все входы отсортированы, 1 - были ошибки
+    """
+    args = build_parser().parse_args(argv)
+    if not args.inputs:
+        args.inputs = ['-']
+    if args.output is None and args.output_dir is None and args.to_db is None:
+        args.output = '-'
+    paths = expand_inputs(args.inputs)
+    stdin_output = None
+    if args.output_dir is not None:
+        try:
+            names = output_names(paths)
+        except ValueError as e:
+            build_parser().error(str(e))
+        os.makedirs(args.output_dir, exist_ok=True)
+        if '-' in names:
+            # Все задачи стандартного ввода пишутся в один файл по порядку
+            stdin_output = open(os.path.join(args.output_dir, STDIN_NAME),
+                                'wb' if args.output_format == "binary" else 'w')
+    options = {
+        "input_format": args.input_format,
+        "output_format": args.output_format,
+        "lines": args.lines,
+        "engine": args.engine,
+        "output_dir": args.output_dir,
+        "keep_input": args.to_db is not None,
+    }
+
+    binary = args.output_format == "binary"
+    if args.output is None:
+        output = None
+    elif args.output == '-':
+        output = sys.stdout.buffer if binary else sys.stdout
+    else:
+        output = open(args.output, 'wb' if binary else 'w')
+
+    totals = {"arrays": 0, "numbers": 0, "errors": 0}
+    results = run_tasks(make_tasks(paths, options), args.jobs or os.cpu_count() or 1)
+
+    def pairs():
+        """Пары для БД; попутно пишется вывод и считаются итоги"""
+        for name, arrays, numbers, result, error in results:
+            if error is not None:
+                print(f"{name}: {error}", file=sys.stderr)
+                totals["errors"] += 1
+                continue
+            totals["arrays"] += arrays
+            totals["numbers"] += numbers
+            for arr, sorted_arr in result:
+                if output is not None:
+                    write_array(sorted_arr, output, args.output_format)
+                if stdin_output is not None and name == STDIN_NAME:
+                    write_array(sorted_arr, stdin_output, args.output_format)
+                if arr is not None:
+                    yield arr, sorted_arr
+
+    try:
+        if args.to_db is not None:
+            from storage import ArrayStorage
+            storage = ArrayStorage(args.to_db)
+            try:
+                added = storage.bulk_insert_sorted(pairs())
+            finally:
+                storage.close()
+        else:
+            for _ in pairs():
+                pass
+    finally:
+        if stdin_output is not None:
+            stdin_output.close()
+        if output is not None and args.output != '-':
+            output.close()
+        elif output is not None:
+            output.flush()
+
+    summary = f"Отсортировано массивов: {totals['arrays']}, чисел: {totals['numbers']}"
+    if args.to_db is not None:
+        summary += f", добавлено в БД: {added}"
+    if totals["errors"]:
+        summary += f", ошибок: {totals['errors']}"
+    print(summary, file=sys.stderr)
+    return 1 if totals["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,716 @@
+import argparse
+import heapq
+import itertools
+import json
+import os
+import platform
+import random
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from itertools import islice
+from operator import itemgetter
+
+from main import SortStats, msd_radix_argsort, msd_radix_sort, msd_radix_sort_many
+from partial_sort import msd_radix_iter, msd_radix_select, msd_radix_topk
+from string_sort import msd_string_sort
+from storage import ArrayStorage, encode_row
+from vector_sort import NUMPY_CUTOFF, np
+
+# Размеры входа и ширина ключей (в битах), для которых подбирается основание
+CALIBRATION_SIZES = (100, 1000, 10000, 100000)
+CALIBRATION_BITS = (10, 16, 32, 63)
+CALIBRATION_RADIXES = (10, 16, 64, 256, 1024, 65536)
+
+# Пороги досортировки мелких корзин
+CUTOFFS = (1, 4, 8, 16, 32, 64, 128)
+
+# Количество строк, как в тестах вставки testRPS3
+INSERT_COUNTS = (100, 1000, 10000)
+
+# Размеры наборов записей для сравнения сортировки по ключу
+KEY_SIZES = (1000, 10000, 100000, 1000000)
+
+# Размеры наборов строк
+STRING_SIZES = (1000, 10000, 100000)
+
+# Количества маленьких массивов для сравнения msd_radix_sort_many с поштучной сортировкой
+MANY_COUNTS = (1000, 10000, 100000)
+
+# Размеры входа для замеров на упорядоченных данных
+PRESORTED_SIZES = (10000, 100000, 1000000)
+
+# Размеры входа и количество первых чисел для замеров частичной сортировки
+PARTIAL_SIZES = (100000, 1000000)
+PARTIAL_K = (10, 1000)
+
+# Набор замеров suite: размеры входа (до 10^8 - через --size),
+# распределения и количества массивов в БД
+SUITE_SIZES = (10, 1000, 100000)
+SUITE_DISTRIBUTIONS = ("uniform", "zipf", "sorted", "few-unique", "wide")
+SUITE_DB_COUNTS = (100, 1000, 10000)
+
+# Движки на чистом Python замеряются только до этого размера входа
+SUITE_PURE_PYTHON_LIMIT = 10 ** 6
+
+# Относительное замедление, которое compare считает регрессией
+REGRESSION_THRESHOLD = 0.10
+
+
+def measure(func, repeats=3):
+    """
+    Минимальное время выполнения func из нескольких запусков
+    :param func: функция без аргументов
+    :param repeats: количество запусков
+    :return: время в секундах
+    """
+    best = float("inf")
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def measure_runs(func, repeats=3, warmup=1, setup=None):
+    """
+    Времена нескольких запусков func после прогревочных
+    :param func: функция без аргументов, а при заданном setup - с результатом setup()
+    :param repeats: количество замеряемых запусков
+    :param warmup: количество прогревочных запусков (не замеряются)
+    :param setup: подготовка перед каждым запуском, не входящая в замер
+    :return: список времен в секундах
+    """
+    times = []
+    for run in range(warmup + repeats):
+        args = () if setup is None else (setup(),)
+        start = time.perf_counter()
+        func(*args)
+        elapsed = time.perf_counter() - start
+        if run >= warmup:
+            times.append(elapsed)
+    return times
+
+
+def summarize(times):
+    """Сводка времен запусков для JSON-отчета"""
+    return {
+        "min": min(times),
+        "median": statistics.median(times),
+        "mean": statistics.fmean(times),
+        "times": times,
+    }
+
+
+def calibrate(engines=None, repeats=3, seed=0):
+    """
+    Подбор лучшего основания для каждой пары (размер входа, ширина ключа).
+    Для numpy размеры не больше NUMPY_CUTOFF не замеряются: такой вход
+    движок целиком сортирует numpy.sort, и основание на время не влияет
+    :param engines: движки для калибровки (по умолчанию все доступные)
+    :param repeats: количество запусков каждого замера
+    :param seed: зерно генератора случайных чисел
+    :return: список строк (движок, макс. размер, макс. бит, основание)
+    """
+    if engines is None:
+        engines = ("lists", "inplace") + (("numpy",) if np is not None else ())
+    rng = random.Random(seed)
+
+    rows = []
+    for engine in engines:
+        for size in CALIBRATION_SIZES:
+            if engine == "numpy" and size <= NUMPY_CUTOFF:
+                continue
+            for bits in CALIBRATION_BITS:
+                arr = [rng.getrandbits(bits) for _ in range(size)]
+                # Основания больше 1024 имеют смысл только для numpy: остальные
+                # движки выделяют счетчики или корзины на каждый вызов
+                radixes = [r for r in CALIBRATION_RADIXES if engine == "numpy" or r <= 1024]
+                timings = {
+                    radix: measure(lambda: msd_radix_sort(arr, radix, engine), repeats)
+                    for radix in radixes
+                }
+                best = min(timings, key=timings.get)
+                print(f"{engine:8} n={size:<7} bits={bits:<3} лучшее основание: {best}", flush=True)
+                rows.append((engine, size, bits, best))
+    return rows
+
+
+def small_arrays(count, rng):
+    """Массивы как в testRPS3.DatabaseTester.generate_random_array: 5-50 чисел от 0 до 1000"""
+    return [[rng.randint(0, 1000) for _ in range(rng.randint(5, 50))] for _ in range(count)]
+
+
+def tune_cutoff(count=2000, large_size=100000, repeats=3, seed=0):
+    """
+    Замер порога досортировки мелких корзин
+    :param count: количество маленьких массивов (5-50 элементов)
+    :param large_size: размер большого массива для сравнения
+    :param repeats: количество запусков каждого замера
+    :param seed: зерно генератора случайных чисел
+    :return: словарь {(движок, досортировка, набор): {порог: время}}
+    """
+    rng = random.Random(seed)
+    workloads = {
+        "5-50": small_arrays(count, rng),
+        f"n={large_size}": [[rng.getrandbits(32) for _ in range(large_size)]],
+    }
+
+    results = {}
+    for engine in ("lists", "inplace"):
+        for small_sort in ("insertion", "timsort"):
+            for name, arrays in workloads.items():
+                timings = {}
+                for cutoff in CUTOFFS:
+                    def run():
+                        for arr in arrays:
+                            msd_radix_sort(arr, engine=engine, cutoff=cutoff, small_sort=small_sort)
+                    timings[cutoff] = measure(run, repeats)
+                best = min(timings, key=timings.get)
+                row = "  ".join(f"{cutoff}:{t * 1000:.1f}" for cutoff, t in timings.items())
+                print(f"{engine:8} {small_sort:9} {name:9} {row}  лучший порог: {best}", flush=True)
+                results[(engine, small_sort, name)] = timings
+    return results
+
+
+def _insert_per_row_commit(storage, arrays):
+    """Вставка с фиксацией каждой строки, как ArraySorterApp.save_to_db"""
+    for arr in arrays:
+        storage.insert(arr, msd_radix_sort(arr))
+
+
+def _insert_per_row_execute(storage, arrays):
+    """Вставка отдельным execute на строку с одной фиксацией в конце"""
+    cursor = storage.conn.cursor()
+    for arr in arrays:
+        cursor.execute(
+            "INSERT INTO arrays (array_data, sorted_array_data, is_sorted, content_hash) VALUES (?, ?, 1, ?)",
+            encode_row(arr, msd_radix_sort(arr))
+        )
+    storage.conn.commit()
+
+
+# Способ вставки: (функция, настройки ArrayStorage)
+INSERT_METHODS = {
+    "commit на строку": (_insert_per_row_commit, {"journal_mode": None, "synchronous": None, "cache_size": None}),
+    "commit на строку+WAL": (_insert_per_row_commit, {}),
+    "execute на строку": (_insert_per_row_execute, {"journal_mode": None, "synchronous": None, "cache_size": None}),
+    "bulk_insert": (ArrayStorage.bulk_insert, {"journal_mode": None, "synchronous": None, "cache_size": None}),
+    "bulk_insert+WAL": (ArrayStorage.bulk_insert, {}),
+}
+
+
+def bench_insert(counts=INSERT_COUNTS, repeats=3, seed=0):
+    """
+    Замер вставки массивов в БД разными способами
+    :param counts: количества вставляемых массивов (5-50 чисел)
+    :param repeats: количество запусков каждого замера
+    :param seed: зерно генератора случайных чисел
+    :return: словарь {(способ, количество): время}
+    """
+    rng = random.Random(seed)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        files = itertools.count()
+        for count in counts:
+            arrays = small_arrays(count, rng)
+            for name, (insert, options) in INSERT_METHODS.items():
+                def run():
+                    # Каждый запуск пишет в новую БД, чтобы размер файла не влиял на замер
+                    storage = ArrayStorage(os.path.join(tmp, f"bench_{next(files)}.db"), **options)
+                    try:
+                        insert(storage, arrays)
+                    finally:
+                        storage.close()
+                results[(name, count)] = measure(run, repeats)
+                print(f"{name:20} n={count:<6} {results[(name, count)]:.4f} сек", flush=True)
+    return results
+
+
+def bench_key(sizes=KEY_SIZES, bits=32, repeats=3, seed=0):
+    """
+    Сравнение сортировки записей по ключу с sorted(key=...)
+    :param sizes: количества записей (ключ, данные)
+    :param bits: ширина ключей в битах
+    :param repeats: количество запусков каждого замера
+    :param seed: зерно генератора случайных чисел
+    :return: словарь {(способ, размер): время}
+    """
+    rng = random.Random(seed)
+    by_key = itemgetter(0)
+    results = {}
+    for size in sizes:
+        keys = [rng.getrandbits(bits) for _ in range(size)]
+        records = [(k, f"запись {i}") for i, k in enumerate(keys)]
+        # Столбцовое хранение: ключи и два столбца данных
+        names = [record[1] for record in records]
+        weights = [float(i) for i in range(size)]
+
+        def sort_columns_builtin():
+            perm = sorted(range(size), key=keys.__getitem__)
+            return [names[i] for i in perm], [weights[i] for i in perm]
+
+        def sort_columns_argsort():
+            perm = msd_radix_argsort(keys)
+            return [names[i] for i in perm], [weights[i] for i in perm]
+
+        methods = {
+            "sorted(key=)": lambda: sorted(records, key=by_key),
+            "msd(key=)": lambda: msd_radix_sort(records, key=by_key),
+            "столбцы sorted": sort_columns_builtin,
+            "столбцы argsort": sort_columns_argsort,
+        }
+        for name, func in methods.items():
+            results[(name, size)] = measure(func, repeats)
+            print(f"{name:16} n={size:<8} {results[(name, size)]:.4f} сек", flush=True)
+    return results
+
+
+def string_workloads(size, rng):
+    """Наборы строк: URL с длинным общим префиксом, идентификаторы, случайные слова"""
+    hosts = [f"https://shop{i}.example.com/catalog/category-{i % 7}/" for i in range(20)]
+    return {
+        "url": [f"{rng.choice(hosts)}item/{rng.getrandbits(32):08x}?ref=campaign-{rng.randint(0, 99)}"
+                for _ in range(size)],
+        "id": [f"user-{rng.randint(0, size * 10):012d}" for _ in range(size)],
+        "слова": ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 12)))
+                  for _ in range(size)],
+    }
+
+
+def bench_strings(sizes=STRING_SIZES, repeats=3, seed=0):
+    """
+    Сравнение msd_string_sort с sorted() на строках str и bytes
+    :param sizes: количества строк
+    :param repeats: количество запусков каждого замера
+    :param seed: зерно генератора случайных чисел
+    :return: словарь {(набор, тип, способ, размер): время}
+    """
+    rng = random.Random(seed)
+    results = {}
+    for size in sizes:
+        for name, strings in string_workloads(size, rng).items():
+            for kind, items in (("str", strings), ("bytes", [s.encode() for s in strings])):
+                methods = {
+                    "sorted": sorted,
+                    "msd": msd_string_sort,
+                    "msd+mkqs": lambda items: msd_string_sort(items, small_sort="mkqs"),
+                }
+                for method, func in methods.items():
+                    results[(name, kind, method, size)] = measure(lambda: func(items), repeats)
+                row = "  ".join(f"{method}: {results[(name, kind, method, size)]:.4f}" for method in methods)
+                print(f"{name:6} {kind:5} n={size:<7} {row} сек", flush=True)
+    return results
+
+
+def bench_many(counts=MANY_COUNTS, repeats=3, seed=0):
+    """
+    Сортировка множества маленьких массивов (5-50 чисел, как в testRPS3):
+    поштучно msd_radix_sort и sorted() в сравнении с msd_radix_sort_many
+    :param counts: количества массивов
+    :param repeats: количество запусков каждого замера
+    :param seed: зерно генератора случайных чисел
+    :return: словарь {(способ, количество): время}
+    """
+    rng = random.Random(seed)
+    results = {}
+    for count in counts:
+        arrays = small_arrays(count, rng)
+        methods = {
+            "msd поштучно": lambda: [msd_radix_sort(arr) for arr in arrays],
+            "sorted поштучно": lambda: [sorted(arr) for arr in arrays],
+            "msd_radix_sort_many": lambda: msd_radix_sort_many(arrays),
+        }
+        for method, func in methods.items():
+            results[(method, count)] = measure(func, repeats)
+        row = "  ".join(f"{method}: {results[(method, count)]:.4f}" for method in methods)
+        print(f"n={count:<7} {row} сек", flush=True)
+    return results
+
+
+def bench_partial(sizes=PARTIAL_SIZES, ks=PARTIAL_K, repeats=3, seed=0):
+    """
+    Частичная сортировка: k наименьших чисел, медиана и первые k чисел
+    ленивой сортировки в сравнении с heapq.nsmallest и полной сортировкой
+    :param sizes: размеры входа
+    :param ks: количества первых чисел
+    :param repeats: количество запусков каждого замера
+    :param seed: зерно генератора случайных чисел
+    :return: словарь {(способ, размер, k): время}
+    """
+    rng = random.Random(seed)
+    results = {}
+    for size in sizes:
+        arr = [rng.getrandbits(32) for _ in range(size)]
+        for k in ks:
+            methods = {
+                "sorted": lambda: sorted(arr)[:k],
+                "nsmallest": lambda: heapq.nsmallest(k, arr),
+                "topk": lambda: msd_radix_topk(arr, k),
+                "iter": lambda: list(islice(msd_radix_iter(arr), k)),
+                "select": lambda: msd_radix_select(arr, size // 2),
+            }
+            for method, func in methods.items():
+                results[(method, size, k)] = measure(func, repeats)
+            row = "  ".join(f"{method}: {results[(method, size, k)]:.4f}" for method in methods)
+            print(f"n={size:<8} k={k:<6} {row} сек", flush=True)
+    return results
+
+
+def presorted_workloads(size, rng):
+    """Входы с разной упорядоченностью: случайный, упорядоченный, обратный, почти упорядоченный, мало значений"""
+    ordered = sorted(rng.getrandbits(32) for _ in range(size))
+    nearly = list(ordered)
+    for _ in range(size // 1000 + 1):
+        i, j = rng.randrange(size), rng.randrange(size)
+        nearly[i], nearly[j] = nearly[j], nearly[i]
+    return {
+        "случайный": [rng.getrandbits(32) for _ in range(size)],
+        "упорядоченный": ordered,
+        "обратный": ordered[::-1],
+        "почти": nearly,
+        "мало значений": [rng.choice((3, 1 << 20, 1 << 40, 7)) for _ in range(size)],
+    }
+
+
+def bench_presorted(sizes=PRESORTED_SIZES, repeats=3, seed=0):
+    """
+    Сортировка входов с разной упорядоченностью движками "auto" и "lists"
+    в сравнении с sorted()
+    :param sizes: размеры входа
+    :param repeats: количество запусков каждого замера
+    :param seed: зерно генератора случайных чисел
+    :return: словарь {(вход, способ, размер): время}
+    """
+    rng = random.Random(seed)
+    methods = {
+        "sorted": sorted,
+        "auto": msd_radix_sort,
+        "lists": lambda arr: msd_radix_sort(arr, engine="lists"),
+    }
+    results = {}
+    for size in sizes:
+        for name, arr in presorted_workloads(size, rng).items():
+            for method, func in methods.items():
+                results[(name, method, size)] = measure(lambda: func(arr), repeats)
+            row = "  ".join(f"{method}: {results[(name, method, size)]:.4f}" for method in methods)
+            print(f"{name:14} n={size:<8} {row} сек", flush=True)
+    return results
+
+
+def suite_distribution(name, size, rng):
+    """
+    Входной массив набора suite
+    :param name: "uniform" - равномерные 32-битные числа; "zipf" - значения
+        с частотами по закону Ципфа (s = 1.1); "sorted" - упорядоченные;
+        "few-unique" - 16 различных значений; "wide" - 96-битные числа
+        со знаком (шире int64, numpy не применим)
+    :param size: размер массива
+    :param rng: генератор случайных чисел
+    :return: список целых чисел
+    """
+    if name == "uniform":
+        return [rng.getrandbits(32) for _ in range(size)]
+    if name == "zipf":
+        ranks = min(size, 100000)
+        values = [rng.getrandbits(32) for _ in range(ranks)]
+        weights = list(itertools.accumulate(1 / (rank ** 1.1) for rank in range(1, ranks + 1)))
+        return rng.choices(values, cum_weights=weights, k=size)
+    if name == "sorted":
+        return sorted(rng.getrandbits(32) for _ in range(size))
+    if name == "few-unique":
+        values = [rng.getrandbits(32) for _ in range(16)]
+        return [rng.choice(values) for _ in range(size)]
+    if name == "wide":
+        return [rng.getrandbits(96) - (1 << 95) for _ in range(size)]
+    raise ValueError(f"Неизвестное распределение: {name}")
+
+
+def suite_sort_methods(arr, size):
+    """
+    Способы сортировки для замера: sorted(), движки msd_radix_sort и numpy.sort.
+    Массив numpy для numpy.sort готовится заранее и в замер не входит
+    :return: словарь {способ: функция без аргументов}
+    """
+    fits_int64 = all(-(1 << 63) <= num < 1 << 63 for num in (min(arr), max(arr)))
+    engines = ["auto"]
+    if size <= SUITE_PURE_PYTHON_LIMIT:
+        engines += ["lists", "iterative", "inplace"]
+    if np is not None and fits_int64:
+        engines.append("numpy")
+
+    methods = {"sorted": lambda: sorted(arr)}
+    for engine in engines:
+        methods[f"msd:{engine}"] = lambda engine=engine: msd_radix_sort(arr, engine=engine)
+    if np is not None and fits_int64:
+        vector = np.array(arr, dtype=np.int64)
+        methods["numpy.sort"] = lambda: np.sort(vector)
+    return methods
+
+
+def bench_suite_sort(sizes=SUITE_SIZES, distributions=SUITE_DISTRIBUTIONS, repeats=3, warmup=1, seed=0):
+    """
+    Замеры сортировки для набора suite. Результат каждого способа один раз
+    сверяется с sorted() вне замера
+    :return: список записей для JSON-отчета
+    """
+    rng = random.Random(seed)
+    records = []
+    for size in sizes:
+        for name in distributions:
+            arr = suite_distribution(name, size, rng)
+            expected = sorted(arr)
+            for method, func in suite_sort_methods(arr, size).items():
+                result = func()
+                if list(result) != expected:
+                    raise AssertionError(f"{method}: неверный результат на {name}, n={size}")
+                del result
+                timing = summarize(measure_runs(func, repeats, warmup))
+                records.append({"group": "sort", "distribution": name, "size": size, "method": method, **timing})
+                print(f"{name:10} n={size:<9} {method:14} {timing['median']:.6f} сек", file=sys.stderr, flush=True)
+    return records
+
+
+def bench_suite_db(counts=SUITE_DB_COUNTS, repeats=3, warmup=1, seed=0):
+    """
+    Замеры БД для набора suite на временной БД с настройками по умолчанию:
+    вставка (bulk_insert в пустую БД), загрузка всех массивов через get
+    и очистка. Массивы - как в testRPS3 (5-50 чисел)
+    :return: список записей для JSON-отчета
+    """
+    rng = random.Random(seed)
+    records = []
+    with tempfile.TemporaryDirectory() as tmp:
+        files = itertools.count()
+
+        def new_storage():
+            return ArrayStorage(os.path.join(tmp, f"suite_{next(files)}.db"))
+
+        for count in counts:
+            arrays = small_arrays(count, rng)
+
+            def empty():
+                return new_storage()
+
+            def filled():
+                storage = new_storage()
+                storage.bulk_insert(arrays)
+                return storage
+
+            def insert(storage):
+                storage.bulk_insert(arrays)
+                storage.close()
+
+            def load(storage):
+                ids = [row[0] for row in storage.conn.execute("SELECT id FROM arrays")]
+                for array_id in ids:
+                    storage.get(array_id)
+                storage.close()
+
+            def clear(storage):
+                storage.clear()
+                storage.close()
+
+            for operation, func, setup in (("insert", insert, empty), ("load", load, filled),
+                                           ("clear", clear, filled)):
+                timing = summarize(measure_runs(func, repeats, warmup, setup))
+                records.append({"group": "db", "operation": operation, "count": count, **timing})
+                print(f"{operation:8} n={count:<7} {timing['median']:.6f} сек", file=sys.stderr, flush=True)
+    return records
+
+
+def environment():
+    """Сведения об окружении для JSON-отчета: версии, платформа, коммит"""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "time": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "platform": platform.platform(),
+        "numpy": None if np is None else np.__version__,
+        "commit": commit,
+    }
+
+
+def run_suite(sizes=SUITE_SIZES, distributions=SUITE_DISTRIBUTIONS, db_counts=SUITE_DB_COUNTS,
+              repeats=3, warmup=1, seed=0):
+    """
+    Воспроизводимый набор замеров сортировки и БД: фиксированное зерно,
+    time.perf_counter, прогревочные запуски и несколько повторов
+    :return: отчет {"environment", "parameters", "results"} для json.dump
+    """
+    return {
+        "environment": environment(),
+        "parameters": {"sizes": list(sizes), "distributions": list(distributions), "db_counts": list(db_counts),
+                       "repeats": repeats, "warmup": warmup, "seed": seed},
+        "results": bench_suite_sort(sizes, distributions, repeats, warmup, seed)
+                   + bench_suite_db(db_counts, repeats, warmup, seed),
+    }
+
+
+def _record_key(record):
+    """Ключ записи отчета для сопоставления замеров двух отчетов"""
+    if record["group"] == "sort":
+        return "sort", record["distribution"], record["size"], record["method"]
+    return "db", record["operation"], record["count"]
+
+
+def compare_suites(old, new, threshold=REGRESSION_THRESHOLD):
+    """
+    Сравнение двух отчетов run_suite по медианам общих замеров
+    :param old: отчет базовой версии
+    :param new: отчет проверяемой версии
+    :param threshold: относительное замедление, считающееся регрессией
+    :return: список (ключ, старая медиана, новая медиана) для регрессий
+    """
+    baseline = {_record_key(record): record["median"] for record in old["results"]}
+    regressions = []
+    for record in new["results"]:
+        key = _record_key(record)
+        if key not in baseline:
+            continue
+        before, after = baseline[key], record["median"]
+        ratio = after / before if before else float("inf")
+        mark = "  РЕГРЕССИЯ" if ratio > 1 + threshold else ""
+        print(f"{' '.join(map(str, key)):40} {before:.6f} -> {after:.6f} сек ({ratio:.2f}x){mark}")
+        if mark:
+            regressions.append((key, before, after))
+    return regressions
+
+
+def level_stats(size=100000, bits=32, radix=None, presorted=False, seed=0):
+    """
+    Счетчики итеративного движка по уровням для случайного массива
+    :param size: размер массива
+    :param bits: ширина ключей в битах
+    :param radix: основание системы счисления (по умолчанию - см. choose_radix)
+    :param presorted: отсортировать вход заранее
+    :param seed: зерно генератора случайных чисел
+    :return: SortStats
+    """
+    rng = random.Random(seed)
+    arr = [rng.getrandbits(bits) for _ in range(size)]
+    if presorted:
+        arr.sort()
+    stats = SortStats()
+    msd_radix_sort(arr, radix, "iterative", stats=stats)
+    print(stats.format())
+    return stats
+
+
+def format_calibration(rows):
+    """Форматирование калибровочной таблицы для вставки в main.py"""
+    lines = ["RADIX_CALIBRATION = ("]
+    lines += [f"    {row!r}," for row in rows]
+    lines.append(")")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замеры производительности MSD Radix Sort")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    calibrate_parser = subparsers.add_parser("calibrate", help="подбор основания системы счисления")
+    calibrate_parser.add_argument("--engine", action="append", help="движок для калибровки")
+    calibrate_parser.add_argument("--repeats", type=int, default=3)
+
+    cutoff_parser = subparsers.add_parser("cutoff", help="подбор порога досортировки мелких корзин (время в мс)")
+    cutoff_parser.add_argument("--count", type=int, default=2000, help="количество массивов из 5-50 чисел")
+    cutoff_parser.add_argument("--repeats", type=int, default=3)
+
+    insert_parser = subparsers.add_parser("insert", help="сравнение способов вставки массивов в БД")
+    insert_parser.add_argument("--count", type=int, action="append", help="количество массивов (можно несколько)")
+    insert_parser.add_argument("--repeats", type=int, default=3)
+
+    key_parser = subparsers.add_parser("key", help="сортировка записей по ключу в сравнении с sorted(key=...)")
+    key_parser.add_argument("--size", type=int, action="append", help="количество записей (можно несколько)")
+    key_parser.add_argument("--bits", type=int, default=32, help="ширина ключей в битах")
+    key_parser.add_argument("--repeats", type=int, default=3)
+
+    strings_parser = subparsers.add_parser("strings", help="сортировка строк в сравнении с sorted()")
+    strings_parser.add_argument("--size", type=int, action="append", help="количество строк (можно несколько)")
+    strings_parser.add_argument("--repeats", type=int, default=3)
+
+    many_parser = subparsers.add_parser("many", help="сортировка множества маленьких массивов")
+    many_parser.add_argument("--count", type=int, action="append", help="количество массивов (можно несколько)")
+    many_parser.add_argument("--repeats", type=int, default=3)
+
+    presorted_parser = subparsers.add_parser("presorted", help="сортировка упорядоченных и почти упорядоченных входов")
+    presorted_parser.add_argument("--size", type=int, action="append", help="размер входа (можно несколько)")
+    presorted_parser.add_argument("--repeats", type=int, default=3)
+
+    partial_parser = subparsers.add_parser("partial", help="первые k чисел и медиана без полной сортировки")
+    partial_parser.add_argument("--size", type=int, action="append", help="размер входа (можно несколько)")
+    partial_parser.add_argument("-k", type=int, action="append", help="количество первых чисел (можно несколько)")
+    partial_parser.add_argument("--repeats", type=int, default=3)
+
+    suite_parser = subparsers.add_parser("suite", help="набор замеров сортировки и БД с отчетом в JSON")
+    suite_parser.add_argument("--size", type=int, action="append", help="размер входа (можно несколько, до 10^8)")
+    suite_parser.add_argument("--distribution", action="append", choices=SUITE_DISTRIBUTIONS,
+                              help="распределение (можно несколько)")
+    suite_parser.add_argument("--db-count", type=int, action="append",
+                              help="количество массивов в БД (можно несколько)")
+    suite_parser.add_argument("--repeats", type=int, default=5)
+    suite_parser.add_argument("--warmup", type=int, default=1)
+    suite_parser.add_argument("--seed", type=int, default=0)
+    suite_parser.add_argument("--output", help="файл для отчета (по умолчанию - стандартный вывод)")
+
+    compare_parser = subparsers.add_parser("compare", help="сравнение двух отчетов suite")
+    compare_parser.add_argument("old", help="отчет базовой версии")
+    compare_parser.add_argument("new", help="отчет проверяемой версии")
+    compare_parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD,
+                                help="относительное замедление, считающееся регрессией (по умолчанию 0.1)")
+
+    levels_parser = subparsers.add_parser("levels", help="счетчики итеративного движка по уровням")
+    levels_parser.add_argument("--size", type=int, default=100000)
+    levels_parser.add_argument("--bits", type=int, default=32, help="ширина ключей в битах")
+    levels_parser.add_argument("--radix", type=int)
+    levels_parser.add_argument("--presorted", action="store_true", help="отсортировать вход заранее")
+
+    args = parser.parse_args()
+    if args.command == "calibrate":
+        rows = calibrate(args.engine, args.repeats)
+        print()
+        print(format_calibration(rows))
+    elif args.command == "cutoff":
+        tune_cutoff(args.count, repeats=args.repeats)
+    elif args.command == "insert":
+        bench_insert(args.count or INSERT_COUNTS, args.repeats)
+    elif args.command == "key":
+        bench_key(args.size or KEY_SIZES, args.bits, args.repeats)
+    elif args.command == "strings":
+        bench_strings(args.size or STRING_SIZES, args.repeats)
+    elif args.command == "many":
+        bench_many(args.count or MANY_COUNTS, args.repeats)
+    elif args.command == "presorted":
+        bench_presorted(args.size or PRESORTED_SIZES, args.repeats)
+    elif args.command == "partial":
+        bench_partial(args.size or PARTIAL_SIZES, args.k or PARTIAL_K, args.repeats)
+    elif args.command == "suite":
+        report = run_suite(args.size or SUITE_SIZES, args.distribution or SUITE_DISTRIBUTIONS,
+                           args.db_count or SUITE_DB_COUNTS, args.repeats, args.warmup, args.seed)
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                json.dump(report, f, ensure_ascii=False, indent=1)
+        else:
+            json.dump(report, sys.stdout, ensure_ascii=False, indent=1)
+            print()
+    elif args.command == "compare":
+        with open(args.old, encoding='utf-8') as f:
+            old = json.load(f)
+        with open(args.new, encoding='utf-8') as f:
+            new = json.load(f)
+        if compare_suites(old, new, args.threshold):
+            sys.exit(1)
+    elif args.command == "levels":
+        level_stats(args.size, args.bits, args.radix, args.presorted)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,210 @@
+import argparse
+import os
+import tempfile
+from array import array
+from itertools import repeat
+
+from main import _top_digit, msd_radix_sort_inplace, save_to_file
+from parsing import iter_int_chunks
+
+# Ограничение памяти под данные по умолчанию
+DEFAULT_MEMORY_LIMIT = 256 * 1024 * 1024
+
+# Основание для раскладки по файлам-корзинам: по одному файлу на цифру
+SPILL_RADIX = 256
+
+# Байт на число в буферах и файлах-корзинах (array('Q'))
+ITEM_SIZE = 8
+
+# Байт на число в промежуточном списке Python (объект int и указатель на него)
+PY_INT_SIZE = 40
+
+
+def external_sort_file(input_path, output_path, memory_limit=DEFAULT_MEMORY_LIMIT, tmp_dir=None):
+    """
+    Внешняя поразрядная сортировка (MSD) текстового файла, не помещающегося в память.
+    Первый проход находит диапазон значений, второй раскладывает числа
+    по файлам-корзинам старшего разряда. Корзина, помещающаяся в память,
+    сортируется на месте, а слишком большая раскладывается дальше по следующему
+    разряду. Результат потоком записывается в output_path через save_to_file.
+
+    Объем данных в памяти (без учета самого интерпретатора и блока записи
+    main.WRITE_BLOCK) не превышает memory_limit: входной текст читается
+    кусками по memory_limit / 32 символов (с учетом промежуточных строк и
+    чисел Python), в памяти сортируется не больше memory_limit / 2 байт чисел,
+    а буферы корзин сбрасываются на диск при заполнении memory_limit / 4 байт.
+    Ключи корзины перед сортировкой смещаются на ее минимум блоками не больше
+    memory_limit / 8 байт (иначе смещение выполнила бы msd_radix_sort_inplace
+    блоками main.SHIFT_BLOCK, размер которых не зависит от memory_limit).
+    :param input_path: входной файл с целыми числами через пробел
+    :param output_path: файл для отсортированного результата
+    :param memory_limit: ограничение памяти под данные в байтах
+    :param tmp_dir: каталог для временных файлов (по умолчанию - системный)
+    :return: количество отсортированных чисел
+    """
+    chunk_chars = max(memory_limit // 32, 4096)
+
+    # Первый проход: количество чисел и диапазон значений
+    count = 0
+    min_val = max_val = None
+    for chunk in _read_int_chunks(input_path, chunk_chars):
+        if chunk:
+            count += len(chunk)
+            chunk_min, chunk_max = min(chunk), max(chunk)
+            min_val = chunk_min if min_val is None else min(min_val, chunk_min)
+            max_val = chunk_max if max_val is None else max(max_val, chunk_max)
+
+    if count == 0 or min_val == max_val:
+        # Нечего сортировать: файл пуст или все числа равны
+        save_to_file(repeat(min_val, count), output_path)
+        return count
+    if max_val - min_val >= 1 << (8 * ITEM_SIZE):
+        raise ValueError("Диапазон значений не помещается в 64 бита")
+
+    # Ключи смещаются на минимум, чтобы быть неотрицательными
+    def keys():
+        for chunk in _read_int_chunks(input_path, chunk_chars):
+            yield array("Q", [num - min_val for num in chunk])
+
+    with tempfile.TemporaryDirectory(dir=tmp_dir) as tmp:
+        sorter = _ExternalSorter(tmp, memory_limit)
+        if count <= sorter.capacity:
+            buf = array("Q")
+            for chunk in keys():
+                buf.extend(chunk)
+            keys_sorted = sorter.sort_buffer(buf)
+        else:
+            digit = _top_digit(max_val - min_val, SPILL_RADIX)
+            keys_sorted = sorter.sort_buckets(sorter.spill(keys(), digit), digit)
+        save_to_file((key + min_val for key in keys_sorted) if min_val else keys_sorted, output_path)
+    return count
+
+
+def _read_int_chunks(filename, chunk_chars):
+    """Потоковое чтение чисел из текстового файла кусками по chunk_chars символов"""
+    with open(filename, 'r') as f:
+        yield from iter_int_chunks(f, chunk_chars)
+
+
+class _ExternalSorter:
+    def __init__(self, directory, memory_limit):
+        self.directory = directory
+        # Сколько чисел можно отсортировать в памяти и сколько держать в буферах корзин
+        self.capacity = max(memory_limit // (2 * ITEM_SIZE), 1)
+        self.buffer_limit = max(memory_limit // (4 * ITEM_SIZE), SPILL_RADIX)
+        self.shift_block = max(memory_limit // (8 * PY_INT_SIZE), 1)
+        self.file_counter = 0
+
+    def spill(self, chunks, digit):
+        """
+        Раскладка чисел по файлам-корзинам разряда digit
+        :param chunks: итерируемый объект с кусками array('Q')
+        :param digit: вес разряда
+        :return: список (путь, количество) для непустых корзин по возрастанию цифры
+        """
+        buffers = [array("Q") for _ in range(SPILL_RADIX)]
+        counts = [0] * SPILL_RADIX
+        paths = [None] * SPILL_RADIX
+        shift = digit.bit_length() - 1
+        mask = SPILL_RADIX - 1
+        buffered = 0
+
+        for chunk in chunks:
+            for key in chunk:
+                buffers[(key >> shift) & mask].append(key)
+            buffered += len(chunk)
+            if buffered >= self.buffer_limit:
+                self._flush(buffers, counts, paths)
+                buffered = 0
+        self._flush(buffers, counts, paths)
+
+        return [(path, count) for path, count in zip(paths, counts) if count]
+
+    def _flush(self, buffers, counts, paths):
+        """Дозапись буферов корзин в их файлы"""
+        for d, buffer in enumerate(buffers):
+            if not buffer:
+                continue
+            if paths[d] is None:
+                paths[d] = os.path.join(self.directory, f"bucket_{self.file_counter}.bin")
+                self.file_counter += 1
+            with open(paths[d], 'ab') as f:
+                buffer.tofile(f)
+            counts[d] += len(buffer)
+            del buffer[:]
+
+    def sort_buffer(self, buf):
+        """
+        Сортировка ключей в памяти на месте. Ключи одной корзины часто
+        собраны далеко от нуля; их смещение на минимум выполняется здесь
+        блоками shift_block, поэтому msd_radix_sort_inplace смещения не делает
+        :param buf: array('Q') с ключами
+        :return: генератор отсортированных ключей
+        """
+        low = min(buf)
+        if low:
+            for start in range(0, len(buf), self.shift_block):
+                buf[start:start + self.shift_block] = array(
+                    "Q", [key - low for key in buf[start:start + self.shift_block]])
+        msd_radix_sort_inplace(buf)
+        yield from (key + low for key in buf) if low else buf
+
+    def sort_buckets(self, buckets, digit):
+        """
+        Последовательная сортировка файлов-корзин
+        :param buckets: список (путь, количество) в порядке цифр
+        :param digit: вес разряда, по которому выполнена раскладка
+        :return: генератор отсортированных ключей
+        """
+        for path, count in buckets:
+            if digit // SPILL_RADIX == 0:
+                # Все ключи в корзине равны - переписываем как есть
+                for chunk in self._read_chunks(path):
+                    yield from chunk
+                os.remove(path)
+            elif count <= self.capacity:
+                buf = array("Q")
+                with open(path, 'rb') as f:
+                    buf.fromfile(f, count)
+                os.remove(path)
+                yield from self.sort_buffer(buf)
+            else:
+                sub_buckets = self.spill(self._read_chunks(path), digit // SPILL_RADIX)
+                os.remove(path)
+                yield from self.sort_buckets(sub_buckets, digit // SPILL_RADIX)
+
+    def _read_chunks(self, path):
+        """Чтение файла-корзины кусками не больше buffer_limit чисел"""
+        with open(path, 'rb') as f:
+            while True:
+                chunk = array("Q")
+                chunk.frombytes(f.read(self.buffer_limit * ITEM_SIZE))
+                if not chunk:
+                    break
+                yield chunk
+
+
+def parse_size(text):
+    """Разбор размера памяти вида 512M, 2G или числа байт"""
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3}
+    text = text.strip().upper().rstrip("B")
+    if text and text[-1] in units:
+        return int(float(text[:-1]) * units[text[-1]])
+    return int(text)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Внешняя сортировка файла с целыми числами")
+    parser.add_argument("input", help="входной файл с целыми числами через пробел")
+    parser.add_argument("output", help="файл для отсортированного результата")
+    parser.add_argument("--memory", type=parse_size, default=DEFAULT_MEMORY_LIMIT,
+                        help="ограничение памяти под данные, например 512M (по умолчанию 256M)")
+    parser.add_argument("--tmp-dir", help="каталог для временных файлов")
+    args = parser.parse_args()
+
+    count = external_sort_file(args.input, args.output, args.memory, args.tmp_dir)
+    print(f"Отсортировано чисел: {count}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+from array import array
+from bisect import bisect_left
+from collections import Counter
+
+from main import msd_radix_sort
+from sequences import common_prefix, common_suffix
+
+# Если изменилось больше len(new) / INCREMENTAL_RATIO элементов,
+# массив выгоднее отсортировать заново
+INCREMENTAL_RATIO = 4
+
+# До стольких различных удаляемых значений каждое вырезается из
+# отсортированного массива по двоичному поиску, больше - одним проходом
+REMOVE_BISECT_LIMIT = 64
+
+
+def array_diff(old, new, limit=None):
+    """
+    Разность массивов как мультимножеств. Общее начало и общий конец
+    отбрасываются сравнением срезов (на C); конец сравнивается и с концом
+    new, и с его первыми len(old) числами - тогда дописанные в конец числа
+    не мешают найти совпадение. В оставшейся середине взаимно сокращаются
+    одинаковые числа - так дописывание, правка и перестановка нескольких
+    чисел дают короткую разность
+    :param old: прежний массив
+    :param new: новый массив
+    :param limit: наибольший суммарный размер середин; для больших середин
+        подсчет чисел стоит столько же, сколько сортировка
+    :return: (удаленные числа, добавленные числа) - списки, или None,
+        если середины длиннее limit
+    """
+    old, new = _same_type(old, new)
+    prefix = common_prefix(old, new)
+    # Середина new - new[prefix:end], дописанная часть - new[end:]
+    end = len(new)
+    suffix = common_suffix(old, len(old), new, end, min(len(old), end) - prefix)
+    if len(old) < len(new):
+        appended_suffix = common_suffix(old, len(old), new, len(old), len(old) - prefix)
+        if appended_suffix > suffix:
+            end, suffix = len(old), appended_suffix
+
+    if limit is not None and len(old) - suffix + end - suffix - 2 * prefix > limit:
+        return None
+    removed = list(old[prefix:len(old) - suffix])
+    added = list(new[prefix:end - suffix])
+    if removed and added:
+        removed_counts, added_counts = Counter(removed), Counter(added)
+        removed = list((removed_counts - added_counts).elements())
+        added = list((added_counts - removed_counts).elements())
+    added.extend(new[end:])
+    return removed, added
+
+
+def _same_type(old, new):
+    """
+    old и new одного типа: срезы memoryview (массивы из ArrayStorage.get),
+    array и списка не равны друг другу даже при одинаковых числах, а срезы
+    массивов numpy сравниваются поэлементно
+    :return: (old, new) как есть или, если их типы различаются, как списки
+        (tolist у memoryview и array быстрее, чем упаковка списка в array)
+    """
+    if type(old) is type(new) and isinstance(old, (list, array, memoryview)):
+        return old, new
+    return _as_list(old), _as_list(new)
+
+
+def _as_list(arr):
+    if isinstance(arr, list):
+        return arr
+    return arr.tolist() if hasattr(arr, "tolist") else list(arr)
+
+
+def merge_sorted(sorted_arr, removed=(), added=(), sort_func=msd_radix_sort):
+    """
+    Обновление отсортированного массива без полной сортировки: удаленные
+    числа вырезаются, сортируются только добавленные, и два упорядоченных
+    отрезка сливаются. Слияние выполняет list.sort: Timsort находит оба
+    отрезка и сливает их за линейное время (с галопом по длинным совпадениям)
+    :param sorted_arr: отсортированный массив
+    :param removed: числа, которые нужно удалить (каждое должно быть в sorted_arr)
+    :param added: числа, которые нужно добавить
+    :param sort_func: сортировка добавленных чисел
+    :return: новый отсортированный список
+    :raise ValueError: удаляемого числа нет в sorted_arr
+    """
+    result = list(sorted_arr)
+    counts = Counter(removed)
+    if len(counts) <= REMOVE_BISECT_LIMIT:
+        for num, count in counts.items():
+            start = bisect_left(result, num)
+            if result[start:start + count] != [num] * count:
+                raise ValueError(f"Числа {num} нет в отсортированном массиве")
+            del result[start:start + count]
+    else:
+        kept = []
+        for num in result:
+            if counts.get(num):
+                counts[num] -= 1
+            else:
+                kept.append(num)
+        if +counts:
+            raise ValueError("Удаляемых чисел нет в отсортированном массиве")
+        result = kept
+
+    if added:
+        result.extend(sort_func(list(added)))
+        result.sort()
+    return result
+
+
+def incremental_resort(old, old_sorted, new, sort_func=msd_radix_sort):
+    """
+    Отсортированная версия измененного массива по прежней отсортированной версии
+    :param old: прежний массив
+    :param old_sorted: прежний отсортированный массив
+    :param new: новый массив
+    :param sort_func: сортировка добавленных чисел
+    :return: отсортированный список или None, если изменение слишком велико
+        (или old_sorted не соответствует old) и new нужно отсортировать целиком
+    """
+    limit = len(new) // INCREMENTAL_RATIO
+    diff = array_diff(old, new, limit)
+    if diff is None or len(diff[0]) + len(diff[1]) > limit:
+        return None
+    removed, added = diff
+    try:
+        return merge_sorted(old_sorted, removed, added, sort_func)
+    except ValueError:
+        return None
@@ -0,0 +1,187 @@
+import argparse
+import asyncio
+import json
+import random
+import statistics
+import sys
+import time
+
+from sort_service import DEFAULT_HOST, DEFAULT_PORT, MAX_LINE
+
+# Операции, которые может нагружать клиент (см. протокол в sort_service)
+OPERATIONS = ("sort", "store")
+
+
+class Connection:
+    """Соединение с сервисом: запросы отправляются без ожидания ответов, ответы сопоставляются по id"""
+
+    def __init__(self, reader, writer):
+        self.reader = reader
+        self.writer = writer
+        self._next_id = 0
+        self._waiting = {}
+        self._receiver = asyncio.ensure_future(self._receive())
+
+    @classmethod
+    async def open(cls, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        if unix_path is not None:
+            reader, writer = await asyncio.open_unix_connection(unix_path, limit=MAX_LINE)
+        else:
+            reader, writer = await asyncio.open_connection(host, port, limit=MAX_LINE)
+        return cls(reader, writer)
+
+    async def request(self, op, **fields):
+        """
+        Запрос к сервису
+        :return: словарь ответа
+        """
+        self._next_id += 1
+        request_id = self._next_id
+        future = asyncio.get_running_loop().create_future()
+        self._waiting[request_id] = future
+        self.writer.write(json.dumps({"id": request_id, "op": op, **fields}).encode() + b"\n")
+        await self.writer.drain()
+        return await future
+
+    async def _receive(self):
+        try:
+            while True:
+                line = await self.reader.readline()
+                if not line:
+                    break
+                response = json.loads(line)
+                future = self._waiting.pop(response.get("id"), None)
+                if future is not None and not future.done():
+                    future.set_result(response)
+        finally:
+            error = ConnectionError("Соединение с сервисом закрыто")
+            for future in self._waiting.values():
+                if not future.done():
+                    future.set_exception(error)
+
+    async def close(self):
+        self.writer.close()
+        await self._receiver
+
+
+def percentile(sorted_values, q):
+    """Процентиль q (0-100) отсортированного списка (ближайший ранг)"""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+async def run_load(requests, concurrency, size, op="sort", host=DEFAULT_HOST, port=DEFAULT_PORT,
+                   unix_path=None, connections=None, seed=0):
+    """
+    Нагрузка сервиса: concurrency одновременных клиентов, каждый отправляет
+    следующий запрос после ответа на предыдущий
+    :param requests: общее количество запросов
+    :param concurrency: количество одновременно ожидающих запросов
+    :param size: длина массива в запросе
+    :param op: операция (см. OPERATIONS)
+    :param connections: количество соединений, между которыми делятся клиенты
+        (по умолчанию - по соединению на клиента)
+    :param seed: зерно генератора случайных чисел
+    :return: словарь со сводкой: количество, ошибки, время, запросов в секунду,
+        задержки (мс) и счетчики сервиса
+    """
+    rng = random.Random(seed)
+    connections = [await Connection.open(host, port, unix_path) for _ in range(connections or concurrency)]
+    payloads = [[rng.getrandbits(32) for _ in range(size)] for _ in range(min(requests, 100))]
+    latencies = []
+    errors = 0
+    remaining = requests
+
+    async def client(number):
+        nonlocal errors, remaining
+        connection = connections[number % len(connections)]
+        while remaining > 0:
+            remaining -= 1
+            values = payloads[remaining % len(payloads)]
+            start = time.perf_counter()
+            try:
+                response = await connection.request(op, values=values)
+            except ConnectionError:
+                errors += 1
+                break
+            latencies.append(time.perf_counter() - start)
+            if not response.get("ok"):
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(client(number) for number in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    stats = (await connections[0].request("stats")) if errors < requests else {}
+    for connection in connections:
+        await connection.close()
+
+    latencies.sort()
+    to_ms = 1000
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "seconds": elapsed,
+        "throughput": len(latencies) / elapsed if elapsed else 0.0,
+        "latency_ms": {
+            "p50": percentile(latencies, 50) * to_ms,
+            "p99": percentile(latencies, 99) * to_ms,
+            "max": (latencies[-1] if latencies else 0.0) * to_ms,
+            "mean": (statistics.fmean(latencies) if latencies else 0.0) * to_ms,
+        },
+        "service": stats,
+    }
+
+
+def format_report(report):
+    """Текстовая сводка run_load"""
+    latency = report["latency_ms"]
+    lines = [
+        f"Запросов: {report['requests']}, ошибок: {report['errors']}, время: {report['seconds']:.3f} сек",
+        f"Пропускная способность: {report['throughput']:.0f} запросов/сек",
+        f"Задержка, мс: p50 {latency['p50']:.2f}  p99 {latency['p99']:.2f}  "
+        f"макс. {latency['max']:.2f}  средняя {latency['mean']:.2f}",
+    ]
+    service = report["service"]
+    if service.get("sort_batches"):
+        lines.append(f"Пачек сортировки: {service['sort_batches']}, "
+                     f"в среднем {service['sort_batched'] / service['sort_batches']:.1f} запросов в пачке")
+    if service.get("store_batches"):
+        lines.append(f"Транзакций записи: {service['store_batches']}, "
+                     f"в среднем {service['store_batched'] / service['store_batches']:.1f} массивов в транзакции")
+    return "\n".join(lines)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Нагрузочный клиент сервиса сортировки (sort_service.py)")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="подключаться к Unix-сокету")
+    parser.add_argument("-n", "--requests", type=int, default=10000, help="общее количество запросов")
+    parser.add_argument("-c", "--concurrency", type=int, default=64, help="одновременных запросов")
+    parser.add_argument("--connections", type=int, help="соединений (по умолчанию - по одному на запрос)")
+    parser.add_argument("--size", type=int, default=50, help="длина массива в запросе")
+    parser.add_argument("--op", choices=OPERATIONS, default="sort")
+    parser.add_argument("--json", action="store_true", help="вывести сводку в JSON")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        report = asyncio.run(run_load(args.requests, args.concurrency, args.size, args.op,
+                                      args.host, args.port, args.unix, args.connections))
+    except OSError as e:
+        print(f"Не удалось подключиться к сервису: {e}", file=sys.stderr)
+        return 1
+    if args.json:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=1)
+        print()
+    else:
+        print(format_report(report))
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,45 +1,943 @@
-def msd_radix_sort(arr, radix=10):
+import sys
+import time
+from array import array
+from collections import Counter
+from itertools import chain, islice, repeat
+from operator import countOf, gt, le, lt
+
+from array_file import is_array_file, read_array_file, write_array_file
+from metrics import METRICS
+from parsing import parse_ints, read_ints
+from string_sort import STRING_CUTOFF, msd_string_sort
+from vector_sort import NUMPY_CUTOFF, is_numpy_array, np, numpy_msd_radix_sort, to_int64
+
+# Начиная с этого размера движок "auto" сортирует списки через numpy
+NUMPY_MIN_SIZE = 1000
+
+# Количество чисел, преобразуемых в текст за одну запись в save_to_file
+WRITE_BLOCK = 65536
+
+# Количество чисел, смещаемых за один шаг при переводе буфера в ключи
+# num - bias и обратно: промежуточный список занимает O(SHIFT_BLOCK), а не O(n)
+SHIFT_BLOCK = 65536
+
+# Корзины не больше этого размера досортировываются без рекурсии.
+# Подобрано командой `python benchmark.py cutoff`
+SMALL_BUCKET_CUTOFF = 64
+
+# Примерное количество вызовов функции прогресса за одну сортировку
+PROGRESS_STEPS = 100
+
+# Начиная с этого числа разрядов движок "auto" не использует рекурсию
+# ("iterative" вместо "lists"), чтобы длинные числа не упирались в предел рекурсии
+MAX_RECURSIVE_LEVELS = 200
+
+# Длина начального отрезка, по которому оценивается упорядоченность входа
+PRESORTED_SAMPLE = 1024
+
+# Вход, в котором спусков (a[i] > a[i + 1]) не больше n / NEARLY_SORTED_RATIO,
+# считается почти упорядоченным: Timsort сливает его готовые отрезки
+# за O(n log r), где r - число отрезков
+NEARLY_SORTED_RATIO = 32
+
+# Размер выборки для оценки числа различных значений
+CARDINALITY_SAMPLE = 1024
+
+# Если в выборке не больше стольких различных значений, движок "auto"
+# сортирует подсчетом (см. _counting_sort)
+LOW_CARDINALITY = 64
+
+
+def msd_radix_sort(arr, radix=None, engine="auto", cutoff=None, small_sort="timsort", parallel=False,
+                   workers=None, progress=None, key=None, stats=None):
     """
-    Поразрядная сортировка (MSD - Most Significant Digit)
-    :param arr: список элементов для сортировки
-    :param radix: основание системы счисления (по умолчанию 10)
-    :return: отсортированный список
+    Поразрядная сортировка (MSD - Most Significant Digit).
+    Отрицательные числа и значения, далекие от нуля, сортируются как ключи
+    num - min(arr), поэтому количество разрядов определяется диапазоном
+    max - min, а не максимумом (см. _key_bias).
+    Перед раскладкой вход проверяется за линейное время: упорядоченный
+    (в том числе по убыванию) возвращается без сортировки, почти
+    упорядоченный досортировывается Timsort, а вход с малым числом
+    различных значений движок "auto" сортирует подсчетом
+    :param arr: список целых чисел для сортировки; список строк str или
+        bytes сортируется string_sort.msd_string_sort (из параметров
+        используется только cutoff)
+    :param radix: основание системы счисления; для степеней двойки
+        (256, 65536) цифры выделяются сдвигом и маской. По умолчанию
+        выбирается по размеру входа и диапазону ключей, см. choose_radix
+    :param engine: реализация сортировки:
+        "auto" - "numpy" для массивов numpy и больших списков, если numpy
+        установлен, иначе "lists";
+        "lists" - рекурсивное распределение по спискам-корзинам;
+        "iterative" - распределение по корзинам без рекурсии: диапазоны
+        (start, end, digit) общего буфера обрабатываются из явного стека,
+        уже упорядоченные диапазоны пропускаются, см. _iterative_msd_sort;
+        "inplace" - перестановка на месте в компактном буфере array
+        (American flag sort), см. msd_radix_sort_inplace. Кроме результата
+        выделяется только буфер n * itemsize байт (1-8 байт на элемент),
+        O(radix * D) на счетчики, где D - число разрядов, и O(SHIFT_BLOCK)
+        на смещение ключей;
+        "numpy" - векторизованная сортировка, см. vector_sort
+    :param cutoff: размер корзины, начиная с которого рекурсия заменяется
+        досортировкой small_sort (по умолчанию SMALL_BUCKET_CUTOFF,
+        для numpy - vector_sort.NUMPY_CUTOFF)
+    :param small_sort: досортировка мелких корзин: "insertion" - вставками,
+        "timsort" - встроенной сортировкой
+    :param parallel: сортировать корзины старшего разряда в нескольких
+        процессах, см. parallel_sort (параметр engine при этом не используется)
+    :param workers: количество процессов (по умолчанию - число ядер)
+    :param progress: функция progress(готово, всего), вызываемая в начале,
+        примерно после каждых 1/PROGRESS_STEPS элементов, занявших свои
+        окончательные места, и в конце (при parallel - только в начале и
+        в конце). Исключение из нее прерывает сортировку - так сортировку
+        можно отменить
+    :param key: функция, возвращающая целый ключ элемента: элементы
+        (записи, кортежи, объекты) упорядочиваются устойчиво по ключу,
+        см. msd_radix_argsort
+    :param stats: SortStats для счетчиков по уровням (заполняется всеми
+        движками, кроме parallel). С переданным stats вход не проверяется
+        на упорядоченность и не сортируется подсчетом - счетчики описывают
+        раскладку по разрядам. При включенном сборе метрик (metrics.METRICS)
+        счетчики собираются всегда и передаются в событии "sort"
+    :return: отсортированный список (для массива numpy без key - массив numpy)
     """
+    if key is not None:
+        if len(arr) <= 1:
+            return list(arr)
+        perm = msd_radix_argsort([key(item) for item in arr], radix, engine, cutoff, small_sort, parallel, workers,
+                                 progress)
+        return [arr[i] for i in perm]
+
+    if engine not in ("auto", "lists", "iterative", "inplace", "numpy"):
+        raise ValueError(f"Неизвестный движок сортировки: {engine}")
+    if radix is not None and radix < 2:
+        raise ValueError("Основание системы счисления должно быть не меньше 2")
+    if small_sort not in _SMALL_SORTS:
+        raise ValueError(f"Неизвестный способ досортировки: {small_sort}")
+
     if len(arr) <= 1:
         return arr
 
-    # Находим максимальное число для определения количества разрядов
-    max_val = max(arr)
+    if isinstance(arr[0], (str, bytes)):
+        return msd_string_sort(arr, STRING_CUTOFF if cutoff is None else cutoff)
+
+    shortcuts = stats is None
+    measured = METRICS.enabled
+    if measured:
+        started = time.perf_counter()
+        if stats is None:
+            stats = SortStats()
+
+    if progress is None:
+        result = _sort(arr, radix, engine, cutoff, small_sort, parallel, workers, None, stats, shortcuts)
+    else:
+        progress(0, len(arr))
+        result = _sort(arr, radix, engine, cutoff, small_sort, parallel, workers,
+                       _Progress(progress, len(arr)).advance, stats, shortcuts)
+        progress(len(arr), len(arr))
+
+    if measured:
+        METRICS.record("sort", time.perf_counter() - started, size=len(arr), **stats.summary())
+    return result
+
+
+def msd_radix_argsort(keys, radix=None, engine="auto", cutoff=None, small_sort="timsort", parallel=False,
+                      workers=None, progress=None):
+    """
+    Устойчивая сортировка индексов: перестановка perm, для которой
+    keys[perm[0]] <= keys[perm[1]] <= ..., а равные ключи идут в исходном
+    порядке. Данные, упорядочиваемые по ключам, не перемещаются, и одной
+    перестановкой можно упорядочить несколько столбцов.
+    Ключ и индекс упаковываются в одно число (key - min) << b | index,
+    где b - число бит индекса, и сортируются msd_radix_sort: индекс в младших
+    битах делает сортировку устойчивой
+    :param keys: список (или массив numpy) целых ключей
+    :param radix, engine, cutoff, small_sort, parallel, workers, progress:
+        параметры сортировки упакованных чисел, см. msd_radix_sort
+    :return: array('q') индексов (для массива numpy - массив numpy.int64)
+    """
+    n = len(keys)
+    shift = max(n - 1, 0).bit_length()
+    mask = (1 << shift) - 1
+    numpy_input = is_numpy_array(keys)
+    if n == 0:
+        return np.arange(0, dtype=np.int64) if numpy_input else array('q')
+
+    if numpy_input:
+        min_val, max_val = int(keys.min()), int(keys.max())
+    else:
+        min_val, max_val = min(keys), max(keys)
+
+    # Упаковка средствами numpy, если сами ключи и упакованные числа помещаются
+    # в int64 и движок это допускает (для больших списков "auto" и так выбирает numpy)
+    vectorized = np is not None and _fits_int64(min_val, max_val) and (max_val - min_val) << shift < 1 << 63 and (
+        numpy_input or engine == "numpy" or engine == "auto" and not parallel and n >= NUMPY_MIN_SIZE)
+    if vectorized:
+        packed = ((to_int64(keys, copy=False) - min_val) << shift) | np.arange(n, dtype=np.int64)
+        packed = msd_radix_sort(packed, radix, engine, cutoff, small_sort, parallel, workers, progress)
+        perm = np.asarray(packed, dtype=np.int64) & mask
+        if numpy_input:
+            return perm
+        result = array('q')
+        result.frombytes(perm.tobytes())
+        return result
+
+    if numpy_input:
+        keys = keys.tolist()
+    if engine == "numpy":
+        engine = "auto"  # Упакованные числа шире int64
+    packed = [(k - min_val) << shift | i for i, k in enumerate(keys)]
+    packed = msd_radix_sort(packed, radix, engine, cutoff, small_sort, parallel, workers, progress)
+    return array('q', [p & mask for p in packed])
+
+
+def msd_radix_sort_many(arrays):
+    """
+    Сортировка множества массивов за один проход: накладные расходы вызова
+    msd_radix_sort (проверки, поиск min/max, выделение корзин) делятся на
+    все массивы сразу.
+    С numpy массивы склеиваются в один буфер int64 со смещениями сегментов,
+    и каждый элемент получает составной ключ (номер сегмента) << b | (num - min),
+    где b - ширина диапазона значений. После одной сортировки ключей сегменты
+    оказываются упорядочены каждый внутри себя и остаются на своих местах.
+    Если все сегменты не длиннее vector_sort.NUMPY_CUTOFF, ключи сортируются
+    numpy.sort (так же движок "numpy" досортировывает такие сегменты),
+    иначе - векторизованной поразрядной сортировкой.
+    Без numpy, для малого общего размера и для чисел шире int64 массивы
+    сортируются по одному: мелкие - встроенной сортировкой, как это делает
+    msd_radix_sort, остальные - msd_radix_sort
+    :param arrays: последовательность массивов целых чисел (списки, array, массивы numpy)
+    :return: список отсортированных массивов в том же порядке: представления
+        (views) одного массива numpy.int64 без копирования или списки
+    :raise ValueError: массив numpy нецелого типа или с числами вне int64
+        длиннее SMALL_BUCKET_CUTOFF (см. vector_sort.to_int64)
+    """
+    measured = METRICS.enabled
+    if measured:
+        started = time.perf_counter()
+    lengths = [len(arr) for arr in arrays]
+    total = sum(lengths)
+
+    result = None
+    if np is not None and total >= NUMPY_MIN_SIZE:
+        result = _numpy_sort_many(arrays, lengths, total)
+    if result is None:
+        result = [sorted(arr) if len(arr) <= SMALL_BUCKET_CUTOFF else list(msd_radix_sort(arr)) for arr in arrays]
+
+    if measured:
+        METRICS.record("sort_many", time.perf_counter() - started, segments=len(arrays), size=total)
+    return result
+
+
+def _numpy_sort_many(arrays, lengths, total):
+    """
+    Векторизованная часть msd_radix_sort_many
+    :return: список представлений или None, если числа или составные ключи
+        не помещаются в int64 (или массивы numpy не целого типа)
+    """
+    try:
+        if all(is_numpy_array(arr) for arr in arrays):
+            # astype молча испортил бы uint64 от 2^63 и дробные числа
+            flat = to_int64(np.concatenate(arrays), copy=False)
+        else:
+            flat = np.fromiter(chain.from_iterable(arrays), dtype=np.int64, count=total)
+    except (OverflowError, ValueError):
+        return None  # Числа шире int64 - массивы сортируются по одному
+
+    min_val = int(flat.min())
+    shift = (int(flat.max()) - min_val).bit_length()
+    if shift + (len(arrays) - 1).bit_length() > 63:
+        return None
+
+    counts = np.asarray(lengths, dtype=np.int64)
+    offsets = np.zeros(len(arrays) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    keys = np.repeat(np.arange(len(arrays), dtype=np.int64), counts) << shift
+    keys |= flat - min_val
+    if max(lengths) <= NUMPY_CUTOFF:
+        keys.sort()
+    else:
+        keys = numpy_msd_radix_sort(keys, choose_radix(total, int(keys[-1]), "numpy"))
+    keys &= (1 << shift) - 1
+    keys += min_val
+
+    bounds = offsets.tolist()
+    return [keys[start:end] for start, end in zip(bounds, bounds[1:])]
+
+
+def _sort(arr, radix, engine, cutoff, small_sort, parallel, workers, advance, stats=None, shortcuts=True):
+    """
+    Выбор движка и сортировка (параметры проверены в msd_radix_sort)
+    :param advance: функция advance(количество), получающая число элементов,
+        занявших окончательные места, или None
+    :param stats: SortStats или None
+    :param shortcuts: проверять упорядоченность и сортировать подсчетом
+    """
+    if is_numpy_array(arr) and (parallel or engine not in ("auto", "numpy")):
+        # Движки на числах Python: скаляры numpy переполнялись бы при смещении
+        # ключей и не принимали бы маску разряда шире своего типа
+        result = _sort(to_int64(arr).tolist(), radix, engine, cutoff, small_sort, parallel, workers, advance, stats,
+                       shortcuts)
+        return np.array(result, dtype=np.int64)
+
+    # Упорядоченный и почти упорядоченный вход не раскладывается по разрядам
+    result = _presorted(arr) if shortcuts else None
+    if result is not None:
+        if stats is not None:
+            stats.shortcut = "presorted"
+            stats.level(0).presorted += 1
+            stats.level(0).presorted_elements += len(arr)
+        return result
+
+    if parallel:
+        from parallel_sort import parallel_msd_radix_sort
+        return parallel_msd_radix_sort(arr, radix, workers, SMALL_BUCKET_CUTOFF if cutoff is None else cutoff,
+                                       small_sort)
+
+    # Маленький массив сразу досортировываем, не вычисляя разрядов
+    if not is_numpy_array(arr) and len(arr) <= (SMALL_BUCKET_CUTOFF if cutoff is None else cutoff):
+        result = list(arr)
+        _SMALL_SORTS[small_sort](result, 0, len(result))
+        return result
+
+    if shortcuts and engine == "auto" and not is_numpy_array(arr):
+        result = _counting_sort(arr)
+        if result is not None:
+            if stats is not None:
+                stats.shortcut = "counting"
+            return result
+
+    # Диапазон значений определяет количество разрядов;
+    # совпадающие у всех ключей старшие разряды убирает смещение (см. _key_bias)
+    if is_numpy_array(arr):
+        min_val, max_val = int(arr.min()), int(arr.max())
+    else:
+        min_val, max_val = min(arr), max(arr)
+
+    auto = engine == "auto"
+    if auto:
+        engine = "lists"
+        if is_numpy_array(arr) or np is not None and len(arr) >= NUMPY_MIN_SIZE and _fits_int64(min_val, max_val):
+            engine = "numpy"
+
+    if radix is None:
+        # Итеративный движок раскладывает по тем же спискам-корзинам, что и "lists"
+        radix = choose_radix(len(arr), max_val - min_val, "lists" if engine == "iterative" else engine)
+
+    if engine == "numpy":
+        result = numpy_msd_radix_sort(arr, radix, NUMPY_CUTOFF if cutoff is None else cutoff, advance, stats)
+        return result if is_numpy_array(arr) else result.tolist()
+
+    bias = _key_bias(min_val, max_val, radix)
+    digit = _top_digit(max_val - bias, radix)
+    cutoff = max(SMALL_BUCKET_CUTOFF if cutoff is None else cutoff, 1)
+    if auto and engine == "lists" and digit >= radix ** MAX_RECURSIVE_LEVELS:
+        engine = "iterative"
+
+    if engine == "inplace":
+        # Ключи пишутся в буфер и читаются из него блоками, без списка на весь вход
+        buf = _make_buffer(arr, max_val - bias, bias)
+        _american_flag_sort(buf, 0, len(buf), digit, radix, cutoff, _SMALL_SORTS[small_sort], advance, stats)
+        return _restore_keys(buf, bias)
+
+    keys = [num - bias for num in arr] if bias else arr
+    if engine == "iterative":
+        result = list(keys)
+        _iterative_msd_sort(result, digit, radix, cutoff, _SMALL_SORTS[small_sort], advance, stats)
+    else:
+        result = _msd_radix_sort(keys, digit, radix, cutoff, _SMALL_SORTS[small_sort], advance, stats)
+    return [key + bias for key in result] if bias else result
+
+
+def _presorted(arr):
+    """
+    Линейная проверка упорядоченности входа перед раскладкой.
+    Спуски (a[i] > a[i + 1]) сначала считаются на начальном отрезке длиной
+    PRESORTED_SAMPLE, и только если их там мало (или почти все соседние пары -
+    спуски) - по всему входу. Сравнения выполняются на C (countOf(map(gt, ...))),
+    поэтому для неупорядоченного входа проверка стоит O(PRESORTED_SAMPLE)
+    :param arr: список, array или массив numpy длиной больше 1
+    :return: отсортированный список (для массива numpy - массив numpy),
+        если вход упорядочен по неубыванию или невозрастанию либо почти
+        упорядочен, иначе None
+    """
+    if is_numpy_array(arr):
+        # Для numpy только полная проверка: сравнение векторизовано
+        if arr[0] <= arr[-1] and (arr[:-1] <= arr[1:]).all():
+            return arr.copy()
+        if arr[0] >= arr[-1] and (arr[:-1] >= arr[1:]).all():
+            return arr[::-1].copy()
+        return None
+
+    head = arr[:PRESORTED_SAMPLE]
+    limit = len(head) // NEARLY_SORTED_RATIO
+    descents = countOf(map(gt, head, islice(head, 1, None)), True)
+    if descents <= limit:
+        descents = countOf(map(gt, arr, islice(arr, 1, None)), True)
+        if descents == 0:
+            return list(arr)
+        if descents <= len(arr) // NEARLY_SORTED_RATIO:
+            return sorted(arr)
+    elif descents >= len(head) - 1 - limit:
+        ascents = countOf(map(lt, arr, islice(arr, 1, None)), True)
+        if ascents == 0:
+            return list(reversed(arr))
+        if ascents <= len(arr) // NEARLY_SORTED_RATIO:
+            return sorted(arr)
+    return None
+
+
+def _counting_sort(arr):
+    """
+    Сортировка подсчетом для входа с малым числом различных значений.
+    Число различных значений оценивается по равномерной выборке из
+    CARDINALITY_SAMPLE элементов; если их не больше LOW_CARDINALITY,
+    значения подсчитываются Counter (на C), упорядочиваются только
+    различные значения, и каждое повторяется в результате нужное число раз
+    :return: отсортированный список или None, если различных значений много
+    """
+    step = max(len(arr) // CARDINALITY_SAMPLE, 1)
+    if len(set(arr[::step])) > LOW_CARDINALITY:
+        return None
+    counts = Counter(arr)
+    return list(chain.from_iterable(repeat(num, counts[num]) for num in sorted(counts)))
+
+
+def _key_bias(min_val, max_val, radix):
+    """
+    Смещение ключей: сортируются неотрицательные ключи num - bias.
+    Смещение на минимум нужно для отрицательных чисел и выгодно, когда
+    оно уменьшает количество разрядов (значения далеко от нуля); иначе
+    лишний проход на преобразование ключей не окупается
+    :return: min_val или 0
+    """
+    if min_val < 0 or _top_digit(max_val, radix) > _top_digit(max_val - min_val, radix):
+        return min_val
+    return 0
+
+
+def _fits_int64(min_val, max_val):
+    """Помещаются ли значения в знаковое 64-битное целое"""
+    return -(1 << 63) <= min_val and max_val < 1 << 63
+
+
+class _Progress:
+    """Подсчет элементов, занявших окончательные места, с редким вызовом callback"""
+
+    def __init__(self, callback, total):
+        self.callback = callback
+        self.total = total
+        self.done = 0
+        self.step = max(total // PROGRESS_STEPS, 1)
+        self.next_report = self.step
+
+    def advance(self, count):
+        self.done += count
+        if self.done >= self.next_report:
+            self.next_report = self.done + self.step
+            self.callback(self.done, self.total)
+
+
+# Калибровочная таблица выбора основания: (движок, макс. размер входа,
+# макс. число бит ключа, основание). Используется первая подходящая строка.
+# Для numpy размеры до vector_sort.NUMPY_CUTOFF не замеряются - их сортирует
+# numpy.sort. Получена командой `python benchmark.py calibrate --repeats 9`
+RADIX_CALIBRATION = (
+    ('lists', 100, 10, 16),
+    ('lists', 100, 16, 10),
+    ('lists', 100, 32, 64),
+    ('lists', 100, 63, 16),
+    ('lists', 1000, 10, 16),
+    ('lists', 1000, 16, 1024),
+    ('lists', 1000, 32, 10),
+    ('lists', 1000, 63, 256),
+    ('lists', 10000, 10, 1024),
+    ('lists', 10000, 16, 256),
+    ('lists', 10000, 32, 256),
+    ('lists', 10000, 63, 64),
+    ('lists', 100000, 10, 1024),
+    ('lists', 100000, 16, 16),
+    ('lists', 100000, 32, 1024),
+    ('lists', 100000, 63, 1024),
+    ('inplace', 100, 10, 16),
+    ('inplace', 100, 16, 10),
+    ('inplace', 100, 32, 64),
+    ('inplace', 100, 63, 16),
+    ('inplace', 1000, 10, 1024),
+    ('inplace', 1000, 16, 1024),
+    ('inplace', 1000, 32, 16),
+    ('inplace', 1000, 63, 256),
+    ('inplace', 10000, 10, 1024),
+    ('inplace', 10000, 16, 256),
+    ('inplace', 10000, 32, 256),
+    ('inplace', 10000, 63, 64),
+    ('inplace', 100000, 10, 1024),
+    ('inplace', 100000, 16, 256),
+    ('inplace', 100000, 32, 1024),
+    ('inplace', 100000, 63, 1024),
+    ('numpy', 10000, 10, 64),
+    ('numpy', 10000, 16, 16),
+    ('numpy', 10000, 32, 16),
+    ('numpy', 10000, 63, 64),
+    ('numpy', 100000, 10, 256),
+    ('numpy', 100000, 16, 1024),
+    ('numpy', 100000, 32, 256),
+    ('numpy', 100000, 63, 256),
+)
+
+
+def choose_radix(size, max_val, engine="lists"):
+    """
+    Выбор основания системы счисления по калибровочной таблице.
+    Размеры и ширина ключей за пределами таблицы приводятся к ее границам
+    :param size: количество сортируемых элементов
+    :param max_val: максимальный ключ
+    :param engine: движок сортировки ("lists", "inplace" или "numpy")
+    :return: основание системы счисления
+    """
+    rows = [row for row in RADIX_CALIBRATION if row[0] == engine]
+    if not rows:
+        return 256
+
+    size = min(size, max(row[1] for row in rows))
+    bits = min(max_val.bit_length(), max(row[2] for row in rows))
+    for _, max_size, max_bits, radix in rows:
+        if size <= max_size and bits <= max_bits:
+            return radix
+    return 256
+
+
+def _top_digit(max_val, radix):
+    """Вес старшего разряда числа max_val в системе счисления radix"""
     digit = 1
     while max_val // digit > 0:
         digit *= radix
-    digit //= radix  # Возвращаемся к старшему разряду
+    return digit // radix  # Возвращаемся к старшему разряду
 
-    return _msd_radix_sort(arr, digit, radix)
 
+def _split_buckets(arr, digit, radix):
+    """
+    Распределение чисел по корзинам в соответствии с разрядом digit
+    (движок "lists" и partial_sort)
+    :return: список корзин по возрастанию цифры: все radix корзин (в том числе
+        пустые), если чисел не меньше radix, иначе только непустые
+    """
+    pow2 = radix & (radix - 1) == 0
+    shift = digit.bit_length() - 1
+    mask = radix - 1
 
-def _msd_radix_sort(arr, digit, radix):
-    if len(arr) <= 1 or digit == 0:
-        return arr
+    if len(arr) >= radix:
+        # Создаем корзины для каждой цифры
+        buckets = [[] for _ in range(radix)]
+        if pow2:
+            # Для степени двойки цифра выделяется сдвигом и маской
+            for num in arr:
+                buckets[(num >> shift) & mask].append(num)
+        else:
+            for num in arr:
+                current_digit = (num // digit) % radix
+                buckets[current_digit].append(num)
+        return buckets
+
+    # Цифр больше, чем элементов: создаем только непустые корзины
+    if pow2:
+        digits = [(num >> shift) & mask for num in arr]
+    else:
+        digits = [(num // digit) % radix for num in arr]
+    sparse = {}
+    for current_digit, num in zip(digits, arr):
+        bucket = sparse.get(current_digit)
+        if bucket is None:
+            sparse[current_digit] = [num]
+        else:
+            bucket.append(num)
+    return [sparse[d] for d in sorted(sparse)]
 
-    # Создаем корзины для каждой цифры
-    buckets = [[] for _ in range(radix)]
+
+def _msd_radix_sort(arr, digit, radix, cutoff, small_sort, advance=None, stats=None, depth=0):
+    if digit == 0 or len(arr) <= cutoff:
+        if digit:
+            small_sort(arr, 0, len(arr))
+        if advance is not None:
+            advance(len(arr))
+        if stats is not None:
+            level = stats.level(depth)
+            level.small += 1
+            level.small_elements += len(arr)
+        return arr
 
     # Распределяем числа по корзинам в соответствии с текущим разрядом
-    for num in arr:
-        current_digit = (num // digit) % radix
-        buckets[current_digit].append(num)
+    buckets = _split_buckets(arr, digit, radix)
+
+    if stats is not None:
+        level = stats.level(depth)
+        level.ranges += 1
+        level.elements += len(arr)
+        level.buckets += len(buckets) - buckets.count([])
 
     # Рекурсивно сортируем каждую корзину со следующим разрядом
     result = []
     for bucket in buckets:
-        if len(bucket) > 0:
-            sorted_bucket = _msd_radix_sort(bucket, digit // radix, radix)
-            result.extend(sorted_bucket)
+        if len(bucket) > 1:
+            result.extend(_msd_radix_sort(bucket, digit // radix, radix, cutoff, small_sort, advance, stats,
+                                          depth + 1))
+        elif bucket:
+            result.append(bucket[0])
+            if advance is not None:
+                advance(1)
+
+    return result
+
+
+class LevelStats:
+    """Счетчики одного уровня (разряда) итеративного движка"""
+
+    def __init__(self):
+        self.ranges = 0  # Разложено диапазонов
+        self.elements = 0  # Разложено (перемещено) элементов
+        self.buckets = 0  # Создано непустых корзин
+        self.presorted = 0  # Пропущено уже упорядоченных диапазонов
+        self.presorted_elements = 0
+        self.small = 0  # Диапазонов, отданных досортировке
+        self.small_elements = 0
+        self.seconds = 0.0  # Время обработки диапазонов уровня (только "iterative")
+
+
+class SortStats:
+    """
+    Счетчики движка по уровням: уровень 0 - старший разряд.
+    Пустые корзины не учитываются
+    """
+
+    def __init__(self):
+        self.levels = []
+        # Вход отсортирован без раскладки: "presorted" - уже упорядочен,
+        # "counting" - подсчетом (см. _presorted и _counting_sort)
+        self.shortcut = None
+
+    def level(self, index):
+        """Счетчики уровня index (создаются при первом обращении)"""
+        while len(self.levels) <= index:
+            self.levels.append(LevelStats())
+        return self.levels[index]
+
+    def summary(self):
+        """
+        Итоги по всем уровням
+        :return: словарь: levels - глубина (число уровней), ranges - обработано
+            диапазонов, buckets - создано непустых корзин, moved - перемещено
+            элементов при раскладке, shortcut - см. атрибут shortcut
+        """
+        return {
+            "levels": len(self.levels),
+            "ranges": sum(level.ranges + level.presorted + level.small for level in self.levels),
+            "buckets": sum(level.buckets for level in self.levels),
+            "moved": sum(level.elements for level in self.levels),
+            "shortcut": self.shortcut,
+        }
+
+    def format(self):
+        """Таблица счетчиков для вывода"""
+        lines = ["уровень  диапазонов  элементов  упорядочено (эл.)  досортировка (эл.)  время, с"]
+        for index, level in enumerate(self.levels):
+            lines.append(f"{index:7}  {level.ranges:10}  {level.elements:9}  "
+                         f"{level.presorted:6} ({level.presorted_elements:8})  "
+                         f"{level.small:7} ({level.small_elements:8})  {level.seconds:8.4f}")
+        return "\n".join(lines)
+
+
+def _iterative_msd_sort(buf, digit, radix, cutoff, small_sort, advance=None, stats=None):
+    """
+    Поразрядная сортировка списка buf на месте без рекурсии.
+    Диапазоны (start, end, digit) берутся из явного стека: диапазон
+    копируется срезом, раскладывается по корзинам цифры digit, корзины
+    записываются обратно одним присваиванием среза, а непустые корзины
+    из нескольких элементов кладутся в стек со следующим разрядом.
+    Перед раскладкой диапазон проверяется на упорядоченность (на C,
+    через map(le, ...), с выходом на первой инверсии)
+    :param buf: список неотрицательных целых чисел
+    :param digit: вес старшего разряда
+    :param stats: SortStats или None
+    """
+    pow2 = radix & (radix - 1) == 0
+    mask = radix - 1
+    # Номер уровня по весу разряда - для счетчиков
+    levels = {}
+    weight, index = digit, 0
+    while weight:
+        levels[weight] = index
+        weight //= radix
+        index += 1
+
+    stack = [(0, len(buf), digit)]
+    while stack:
+        start, end, digit = stack.pop()
+        if stats is not None:
+            level = stats.level(levels.get(digit, len(levels)))
+            started = time.perf_counter()
+
+        if digit == 0 or end - start <= cutoff:
+            if digit:
+                small_sort(buf, start, end)
+            if advance is not None:
+                advance(end - start)
+            if stats is not None:
+                level.small += 1
+                level.small_elements += end - start
+                level.seconds += time.perf_counter() - started
+            continue
+
+        seg = buf[start:end]
+        if all(map(le, seg, islice(seg, 1, None))):
+            # Диапазон уже упорядочен
+            if advance is not None:
+                advance(end - start)
+            if stats is not None:
+                level.presorted += 1
+                level.presorted_elements += end - start
+                level.seconds += time.perf_counter() - started
+            continue
+
+        shift = digit.bit_length() - 1
+        if end - start >= radix:
+            buckets = [[] for _ in range(radix)]
+            if pow2:
+                for num in seg:
+                    buckets[(num >> shift) & mask].append(num)
+            else:
+                for num in seg:
+                    buckets[(num // digit) % radix].append(num)
+        else:
+            # Цифр больше, чем элементов: создаем только непустые корзины
+            sparse = {}
+            for num in seg:
+                current_digit = (num >> shift) & mask if pow2 else (num // digit) % radix
+                bucket = sparse.get(current_digit)
+                if bucket is None:
+                    sparse[current_digit] = [num]
+                else:
+                    bucket.append(num)
+            buckets = [sparse[d] for d in sorted(sparse)]
+
+        buf[start:end] = list(chain.from_iterable(buckets))
+        if stats is not None:
+            level.buckets += len(buckets) - buckets.count([])
+        next_digit = digit // radix
+        pos = start
+        singles = 0
+        for bucket in buckets:
+            count = len(bucket)
+            if count > 1:
+                stack.append((pos, pos + count, next_digit))
+            elif count:
+                singles += 1
+            pos += count
+        if advance is not None and singles:
+            advance(singles)
+        if stats is not None:
+            level.ranges += 1
+            level.elements += end - start
+            level.seconds += time.perf_counter() - started
+
+
+def _insertion_sort(buf, start, end):
+    """Сортировка вставками диапазона buf[start:end] на месте"""
+    for i in range(start + 1, end):
+        num = buf[i]
+        j = i - 1
+        while j >= start and buf[j] > num:
+            buf[j + 1] = buf[j]
+            j -= 1
+        buf[j + 1] = num
+
+
+def _timsort(buf, start, end):
+    """Сортировка диапазона buf[start:end] встроенной сортировкой (Timsort)"""
+    ordered = sorted(buf[start:end])
+    if isinstance(buf, array):
+        ordered = array(buf.typecode, ordered)
+    buf[start:end] = ordered
+
+
+_SMALL_SORTS = {"insertion": _insertion_sort, "timsort": _timsort}
+
 
+# Типы элементов array по возрастанию ширины (только беззнаковые ключи)
+_TYPECODES = ("B", "H", "I", "Q")
+
+
+def _make_buffer(arr, max_val, bias=0):
+    """
+    Копирование ключей num - bias в самый узкий подходящий буфер array
+    (со смещением - блоками по SHIFT_BLOCK)
+    :param arr: последовательность целых чисел, не меньших bias
+    :param max_val: максимальный ключ
+    :param bias: смещение ключей
+    :return: array, а если ключи не помещаются в 64 бита - обычный список
+    """
+    for typecode in _TYPECODES:
+        if max_val < 1 << (8 * array(typecode).itemsize):
+            if not bias:
+                return array(typecode, arr)
+            buf = array(typecode)
+            values = iter(arr)
+            for block in iter(lambda: [num - bias for num in islice(values, SHIFT_BLOCK)], []):
+                buf.extend(array(typecode, block))
+            return buf
+    return [num - bias for num in arr] if bias else list(arr)
+
+
+def _restore_keys(buf, bias):
+    """Список чисел key + bias из буфера ключей (со смещением - блоками по SHIFT_BLOCK)"""
+    if not isinstance(buf, array):
+        return [key + bias for key in buf] if bias else buf
+    if not bias:
+        return buf.tolist()
+    result = []
+    for start in range(0, len(buf), SHIFT_BLOCK):
+        result.extend([key + bias for key in buf[start:start + SHIFT_BLOCK]])
     return result
 
 
+def msd_radix_sort_inplace(buf, radix=None, cutoff=SMALL_BUCKET_CUTOFF):
+    """
+    Поразрядная сортировка на месте (American flag sort).
+    На каждом уровне выполняется подсчет цифр, по префиксным суммам
+    вычисляются границы корзин, после чего элементы переставляются
+    циклами ("cycle leader") без вспомогательного массива.
+
+    Дополнительная память: O(radix * D) на счетчики и границы корзин,
+    где D - число разрядов диапазона max - min (глубина рекурсии),
+    и не зависит от длины buf. Отрицательные и далекие от нуля значения
+    сортируются как ключи num - min (см. _key_bias): ключи записываются
+    в тот же buf блоками по SHIFT_BLOCK (еще O(SHIFT_BLOCK) памяти), а если
+    не помещаются в его тип (знаковый array с диапазоном шире половины
+    типа) - во временный буфер array('Q') того же размера, что и buf.
+    :param buf: изменяемая последовательность (array, bytearray, list)
+    :param radix: основание системы счисления (по умолчанию выбирается
+        по калибровочной таблице, см. choose_radix)
+    :param cutoff: диапазоны не длиннее cutoff досортировываются встроенной
+        сортировкой (дополнительно O(cutoff) памяти)
+    :return: тот же buf, отсортированный по возрастанию
+    """
+    if len(buf) <= 1 or all(map(le, buf, islice(buf, 1, None))):
+        return buf  # Уже упорядочен
+
+    min_val, max_val = min(buf), max(buf)
+    if radix is None:
+        radix = choose_radix(len(buf), max_val - min_val, "inplace")
+    bias = _key_bias(min_val, max_val, radix)
+    digit = _top_digit(max_val - bias, radix)
+    cutoff = max(cutoff, 1)
+
+    if not bias:
+        _american_flag_sort(buf, 0, len(buf), digit, radix, cutoff, _timsort)
+        return buf
+    if not _keys_fit(buf, max_val - bias):
+        keys = _make_buffer(buf, max_val - bias, bias)
+        _american_flag_sort(keys, 0, len(keys), digit, radix, cutoff, _timsort)
+        for start in range(0, len(buf), SHIFT_BLOCK):
+            buf[start:start + SHIFT_BLOCK] = array(
+                buf.typecode, [key + bias for key in keys[start:start + SHIFT_BLOCK]])
+        return buf
+    _shift_keys(buf, bias)
+    _american_flag_sort(buf, 0, len(buf), digit, radix, cutoff, _timsort)
+    _shift_keys(buf, -bias)
+    return buf
+
+
+def _keys_fit(buf, max_key):
+    """Помещается ли ключ max_key в тип элементов buf"""
+    if isinstance(buf, array):
+        # Строчные коды типов array - знаковые
+        return max_key < 1 << (8 * buf.itemsize - buf.typecode.islower())
+    return True  # Список; bytearray: ключи не больше его элементов
+
+
+def _shift_keys(buf, bias):
+    """
+    Замена каждого элемента buf на num - bias на месте блоками по SHIFT_BLOCK
+    (результат должен помещаться в тип элементов buf, см. _keys_fit)
+    """
+    for start in range(0, len(buf), SHIFT_BLOCK):
+        block = [num - bias for num in buf[start:start + SHIFT_BLOCK]]
+        buf[start:start + SHIFT_BLOCK] = array(buf.typecode, block) if isinstance(buf, array) else block
+
+
+def _american_flag_sort(buf, start, end, digit, radix, cutoff, small_sort, advance=None, stats=None, depth=0):
+    if digit == 0 or end - start <= cutoff:
+        if digit:
+            small_sort(buf, start, end)
+        if advance is not None:
+            advance(end - start)
+        if stats is not None:
+            level = stats.level(depth)
+            level.small += 1
+            level.small_elements += end - start
+        return
+
+    counts = _american_flag_partition(buf, start, end, digit, radix)
+    if stats is not None:
+        level = stats.level(depth)
+        level.ranges += 1
+        level.elements += end - start
+        level.buckets += radix - counts.count(0)
+
+    # Рекурсивно сортируем каждую корзину со следующим разрядом
+    pos = start
+    for count in counts:
+        if count > 1:
+            _american_flag_sort(buf, pos, pos + count, digit // radix, radix, cutoff, small_sort, advance, stats,
+                                depth + 1)
+        elif count and advance is not None:
+            advance(1)
+        pos += count
+
+
+def _american_flag_partition(buf, start, end, digit, radix):
+    """
+    Один уровень American flag sort: раскладка buf[start:end] по корзинам
+    текущего разряда на месте
+    :return: список размеров корзин для каждой цифры
+    """
+    # Для степени двойки цифра выделяется сдвигом и маской
+    mask = radix - 1 if radix & (radix - 1) == 0 else 0
+    shift = digit.bit_length() - 1
+
+    # Подсчитываем количество элементов для каждой цифры
+    counts = [0] * radix
+    if mask:
+        for i in range(start, end):
+            counts[(buf[i] >> shift) & mask] += 1
+    else:
+        for i in range(start, end):
+            counts[(buf[i] // digit) % radix] += 1
+
+    # Префиксные суммы: heads - следующая свободная позиция корзины, tails - ее конец
+    heads = [0] * radix
+    tails = [0] * radix
+    pos = start
+    for d in range(radix):
+        heads[d] = pos
+        pos += counts[d]
+        tails[d] = pos
+
+    # Переставляем элементы циклами, пока каждая корзина не заполнится
+    for d in range(radix):
+        while heads[d] < tails[d]:
+            num = buf[heads[d]]
+            current_digit = (num >> shift) & mask if mask else (num // digit) % radix
+            while current_digit != d:
+                target = heads[current_digit]
+                heads[current_digit] += 1
+                buf[target], num = num, buf[target]
+                current_digit = (num >> shift) & mask if mask else (num // digit) % radix
+            buf[heads[d]] = num
+            heads[d] += 1
+
+    return counts
+
+
 def input_array():
     """
     Функция для ввода массива с клавиатуры
@@ -47,7 +945,7 @@ def input_array():
     """
     print("Введите элементы массива через пробел:")
     try:
-        arr = list(map(int, input().split()))
+        arr = parse_ints(input())
         return arr
     except ValueError:
         print("Ошибка: введите только целые числа!")
@@ -66,29 +964,59 @@ def generate_random_array(size=10, min_val=0, max_val=100):
     return [random.randint(min_val, max_val) for _ in range(size)]
 
 
-def save_to_file(arr, filename="output.txt"):
+def save_to_file(arr, filename="output.txt", file_format="text", is_sorted=False):
     """
-    Сохранение массива в файл
-    :param arr: массив для сохранения
+    Сохранение массива в файл. Числа записываются блоками по WRITE_BLOCK,
+    поэтому arr может быть и генератором, не помещающимся в память
+    :param arr: массив (или любой итерируемый объект) для сохранения
     :param filename: имя файла
+    :param file_format: "text" - числа через пробел; "binary" - заголовок
+        и int64 little-endian (см. array_file), в несколько раз компактнее
+        и читается без разбора
+    :param is_sorted: отметить в заголовке двоичного файла, что массив отсортирован
     """
-    with open(filename, 'w') as f:
-        f.write(' '.join(map(str, arr)))
+    if file_format == "binary":
+        write_array_file(arr, filename, is_sorted)
+    elif file_format == "text":
+        with open(filename, 'w') as f:
+            write_ints(arr, f)
+    else:
+        raise ValueError(f"Неизвестный формат файла: {file_format}")
     print(f"Массив сохранен в файл {filename}")
 
 
-def load_from_file(filename="input.txt"):
+def write_ints(arr, f):
+    """
+    Запись чисел через пробел в открытый текстовый файл блоками по WRITE_BLOCK
+    :param arr: итерируемый объект с целыми числами
+    :param f: текстовый файл (или sys.stdout)
+    """
+    values = iter(arr)
+    block = list(islice(values, WRITE_BLOCK))
+    while block:
+        f.write(' '.join(map(str, block)))
+        block = list(islice(values, WRITE_BLOCK))
+        if block:
+            f.write(' ')
+
+
+def load_from_file(filename="input.txt", file_format="auto", use_numpy=False):
     """
     Загрузка массива из файла
     :param filename: имя файла
-    :return: загруженный массив
+    :param file_format: "text", "binary" или "auto" - по сигнатуре в начале файла
+    :param use_numpy: вернуть массив numpy (если установлен)
+    :return: загруженный массив: для текста - array('q') или список для чисел
+        шире 64 бит; для двоичного файла - memoryview отображенного в память
+        файла без копирования (см. array_file.read_array_file)
     """
     try:
-        with open(filename, 'r') as f:
-            content = f.read()
-            arr = list(map(int, content.split()))
-            print(f"Массив загружен из файла {filename}")
-            return arr
+        if file_format == "binary" or file_format == "auto" and is_array_file(filename):
+            arr = read_array_file(filename, use_numpy)[0]
+        else:
+            arr = read_ints(filename, use_numpy)
+        print(f"Массив загружен из файла {filename}")
+        return arr
     except FileNotFoundError:
         print(f"Файл {filename} не найден!")
         return []
@@ -98,6 +1026,14 @@ def load_from_file(filename="input.txt"):
 
 
 def main():
+    """Пакетный режим при аргументах командной строки (см. batch), иначе интерактивное меню"""
+    if len(sys.argv) > 1:
+        from batch import main as batch_main
+        sys.exit(batch_main(sys.argv[1:]))
+    interactive()
+
+
+def interactive():
     print("Программа для поразрядной сортировки (MSD Radix Sort)")
     print("Выберите способ ввода данных:")
     print("1 - Ввод с клавиатуры")
@@ -124,7 +1060,7 @@ def main():
             print("Неверный выбор!")
 
         print("\nИсходный массив:")
-        print(arr)
+        print(list(arr))
 
         # Сортируем массив
         sorted_arr = msd_radix_sort(arr)
@@ -136,7 +1072,11 @@ def main():
         save_choice = input("Хотите сохранить результат? (y/n): ").lower()
         if save_choice == 'y':
             filename = input("Введите имя файла (по умолчанию output.txt): ") or "output.txt"
-            save_to_file(sorted_arr, filename)
+            file_format = input("Формат: text или binary (по умолчанию text): ").strip().lower() or "text"
+            if file_format in ("text", "binary"):
+                save_to_file(sorted_arr, filename, file_format, is_sorted=True)
+            else:
+                print("Неизвестный формат!")
 
         print("Выберите способ ввода данных:")
         print("1 - Ввод с клавиатуры")
@@ -0,0 +1,138 @@
+import functools
+import os
+import threading
+import time
+from contextlib import nullcontext
+
+# Переменная окружения, включающая сбор метрик в RPS3 (см. enable_from_env)
+ENV_VAR = "RPS3_METRICS"
+
+# Общий пустой контекст для выключенного сбора: без выделения памяти на вызов
+_DISABLED = nullcontext()
+
+
+class Metrics:
+    """
+    Реестр метрик: время этапов (разбор, сортировка, упаковка, запросы к БД)
+    и подробности вызовов. Сбор включается явно; пока он выключен, timer
+    возвращает общий пустой контекст, а вызывающий код проверяет только
+    атрибут enabled, поэтому накладные расходы - одна проверка на вызов.
+    Каждое событие суммируется в реестре и передается подписчикам
+    callback(имя, секунды, подробности) в том потоке, где оно произошло
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self._callbacks = []
+        self._totals = {}  # имя -> [вызовов, суммарное время, максимальное время]
+        self._lock = threading.Lock()
+
+    def enable(self, callback=None):
+        """Включение сбора; callback, если задан, подписывается на события"""
+        if callback is not None:
+            self.subscribe(callback)
+        self.enabled = True
+
+    def disable(self):
+        """Выключение сбора (накопленные значения и подписчики сохраняются)"""
+        self.enabled = False
+
+    def subscribe(self, callback):
+        """Подписка callback(имя, секунды, подробности) на события"""
+        with self._lock:
+            self._callbacks.append(callback)
+
+    def unsubscribe(self, callback):
+        with self._lock:
+            self._callbacks.remove(callback)
+
+    def timer(self, name, **details):
+        """
+        Контекстный менеджер замера этапа name
+        :param details: подробности события для подписчиков
+        """
+        if not self.enabled:
+            return _DISABLED
+        return _Timer(self, name, details)
+
+    def record(self, name, seconds, **details):
+        """
+        Учет события
+        :param name: имя этапа, например "sort" или "db.insert"
+        :param seconds: длительность в секундах
+        :param details: подробности события (размер входа, счетчики сортировки)
+        """
+        with self._lock:
+            total = self._totals.get(name)
+            if total is None:
+                self._totals[name] = [1, seconds, seconds]
+            else:
+                total[0] += 1
+                total[1] += seconds
+                total[2] = max(total[2], seconds)
+            callbacks = list(self._callbacks)
+        for callback in callbacks:
+            callback(name, seconds, details)
+
+    def snapshot(self):
+        """
+        Накопленные значения
+        :return: словарь {имя: {"count", "total", "max"}}
+        """
+        with self._lock:
+            return {name: {"count": count, "total": total, "max": longest}
+                    for name, (count, total, longest) in self._totals.items()}
+
+    def reset(self):
+        """Сброс накопленных значений"""
+        with self._lock:
+            self._totals.clear()
+
+    def format(self):
+        """Таблица накопленных значений для вывода"""
+        lines = ["этап                  вызовов   всего, с  макс., с"]
+        for name, total in sorted(self.snapshot().items()):
+            lines.append(f"{name:20}  {total['count']:7}  {total['total']:9.4f}  {total['max']:8.4f}")
+        return "\n".join(lines)
+
+
+class _Timer:
+    def __init__(self, metrics, name, details):
+        self.metrics = metrics
+        self.name = name
+        self.details = details
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.metrics.record(self.name, time.perf_counter() - self.started, **self.details)
+        return False
+
+
+# Общий реестр приложения
+METRICS = Metrics()
+
+
+def timed(name):
+    """Декоратор: замер каждого вызова функции как этапа name реестра METRICS"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return func(*args, **kwargs)
+            with _Timer(METRICS, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def enable_from_env():
+    """
+    Включение сбора, если задана переменная окружения ENV_VAR (не "0")
+    :return: включен ли сбор
+    """
+    if os.environ.get(ENV_VAR, "0") not in ("", "0"):
+        METRICS.enable()
+    return METRICS.enabled
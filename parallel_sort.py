@@ -0,0 +1,208 @@
+import os
+from array import array
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from multiprocessing import shared_memory
+
+from main import (SMALL_BUCKET_CUTOFF, _SMALL_SORTS, _american_flag_partition, _key_bias, _make_buffer,
+                  _msd_radix_sort, _top_digit, choose_radix, msd_radix_sort)
+
+# Массивы меньше этого размера сортируются в одном процессе
+PARALLEL_MIN_SIZE = 100000
+
+# Сколько задач в среднем приходится на один процесс: мелкие задачи
+# выравнивают загрузку, но каждая стоит копирования и вызова в пуле
+TASKS_PER_WORKER = 4
+
+
+def parallel_msd_radix_sort(arr, radix=None, workers=None, cutoff=SMALL_BUCKET_CUTOFF, small_sort="timsort"):
+    """
+    Параллельная поразрядная сортировка (MSD) на нескольких процессах.
+    Данные передаются через разделяемую память (multiprocessing.shared_memory):
+    1. процессы параллельно считают цифры старшего разряда в своих кусках;
+    2. по префиксным суммам каждый процесс раскладывает свой кусок
+       во второй буфер сразу на итоговые позиции корзин;
+    3. корзины сортируются независимо; слишком большие корзины сначала
+       разбиваются по следующему разряду, чтобы задачи были соразмерны.
+    Как и в msd_radix_sort, отрицательные и далекие от нуля значения
+    сортируются как ключи num - min.
+    :param arr: список целых чисел
+    :param radix: основание системы счисления (по умолчанию - см. choose_radix)
+    :param workers: количество процессов (по умолчанию - число ядер)
+    :param cutoff: порог досортировки мелких корзин
+    :param small_sort: досортировка мелких корзин ("insertion" или "timsort")
+    :return: отсортированный список
+    """
+    workers = workers or os.cpu_count() or 1
+    if len(arr) < max(PARALLEL_MIN_SIZE, 2) or workers < 2:
+        return msd_radix_sort(arr, radix, "lists", cutoff, small_sort)
+
+    min_val, max_val = min(arr), max(arr)
+    if max_val - min_val >= 1 << 64:
+        # Ключи не помещаются в 64 бита - разделяемый буфер невозможен
+        return msd_radix_sort(arr, radix, "lists", cutoff, small_sort)
+
+    if radix is None:
+        radix = choose_radix(len(arr), max_val - min_val, "inplace")
+    bias = _key_bias(min_val, max_val, radix)
+    digit = _top_digit(max_val - bias, radix)
+    if digit == 0:
+        return [min_val] * len(arr)  # Все элементы равны
+    buf = _make_buffer(arr, max_val - bias, bias)
+
+    typecode, n = buf.typecode, len(buf)
+    src = shared_memory.SharedMemory(create=True, size=n * buf.itemsize)
+    dst = shared_memory.SharedMemory(create=True, size=n * buf.itemsize)
+    try:
+        src.buf[:n * buf.itemsize] = memoryview(buf).cast("B")
+        del buf
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # Гистограммы старшего разряда по кускам исходного массива
+            chunks = [(n * i // workers, n * (i + 1) // workers) for i in range(workers)]
+            futures = [pool.submit(_count_digits, src.name, typecode, start, end, digit, radix)
+                       for start, end in chunks]
+            histograms = [future.result() for future in futures]
+
+            # Начало каждой корзины и смещение каждого куска внутри нее
+            bucket_counts = [sum(histogram[d] for histogram in histograms) for d in range(radix)]
+            running = []
+            pos = 0
+            for count in bucket_counts:
+                running.append(pos)
+                pos += count
+            offsets = []
+            for histogram in histograms:
+                offsets.append(running)
+                running = [offset + count for offset, count in zip(running, histogram)]
+
+            futures = [pool.submit(_scatter_chunk, src.name, dst.name, typecode, start, end, digit, radix, chunk_offsets)
+                       for (start, end), chunk_offsets in zip(chunks, offsets)]
+            for future in futures:
+                future.result()
+
+            task_size = max(n // (workers * TASKS_PER_WORKER), cutoff)
+            _sort_buckets(pool, dst.name, typecode, 0, bucket_counts, digit // radix, radix, task_size,
+                          cutoff, small_sort)
+
+        view = dst.buf.cast(typecode)
+        try:
+            return [key + bias for key in view] if bias else view.tolist()
+        finally:
+            view.release()
+    finally:
+        src.close()
+        src.unlink()
+        dst.close()
+        dst.unlink()
+
+
+def _sort_buckets(pool, name, typecode, start, counts, digit, radix, task_size, cutoff, small_sort):
+    """
+    Планирование сортировки корзин в пуле процессов: соседние мелкие корзины
+    объединяются в одну задачу, крупные сначала разбиваются по следующему разряду
+    """
+    pending = set()
+
+    def schedule(start, counts, digit):
+        if digit == 0:
+            return  # Внутри корзин все элементы равны
+        batch = []
+        batch_size = 0
+        pos = start
+        for count in counts:
+            if count > task_size:
+                pending.add(pool.submit(_partition_range, name, typecode, pos, pos + count, digit, radix))
+            elif count > 1:
+                if batch_size + count > task_size:
+                    pending.add(pool.submit(_sort_ranges, name, typecode, batch, digit, radix, cutoff, small_sort))
+                    batch, batch_size = [], 0
+                batch.append((pos, pos + count))
+                batch_size += count
+            pos += count
+        if batch:
+            pending.add(pool.submit(_sort_ranges, name, typecode, batch, digit, radix, cutoff, small_sort))
+
+    schedule(start, counts, digit)
+    while pending:
+        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+        for future in done:
+            result = future.result()
+            if result is not None:
+                # Крупная корзина разбита: планируем ее части со следующим разрядом
+                range_start, range_counts, range_digit = result
+                schedule(range_start, range_counts, range_digit // radix)
+
+
+def _attach(name, typecode):
+    """Подключение к разделяемой памяти в дочернем процессе"""
+    shm = shared_memory.SharedMemory(name=name)
+    return shm, shm.buf.cast(typecode)
+
+
+def _count_digits(name, typecode, start, end, digit, radix):
+    """Гистограмма цифр разряда digit для куска [start, end) разделяемого массива"""
+    shm, view = _attach(name, typecode)
+    try:
+        counts = [0] * radix
+        if radix & (radix - 1) == 0:
+            shift, mask = digit.bit_length() - 1, radix - 1
+            for num in view[start:end]:
+                counts[(num >> shift) & mask] += 1
+        else:
+            for num in view[start:end]:
+                counts[(num // digit) % radix] += 1
+        return counts
+    finally:
+        view.release()
+        shm.close()
+
+
+def _scatter_chunk(src_name, dst_name, typecode, start, end, digit, radix, offsets):
+    """Раскладка куска [start, end) по корзинам буфера dst начиная с позиций offsets"""
+    src, src_view = _attach(src_name, typecode)
+    dst, dst_view = _attach(dst_name, typecode)
+    try:
+        pow2 = radix & (radix - 1) == 0
+        shift, mask = digit.bit_length() - 1, radix - 1
+        for num in src_view[start:end]:
+            current_digit = (num >> shift) & mask if pow2 else (num // digit) % radix
+            dst_view[offsets[current_digit]] = num
+            offsets[current_digit] += 1
+    finally:
+        src_view.release()
+        dst_view.release()
+        src.close()
+        dst.close()
+
+
+def _partition_range(name, typecode, start, end, digit, radix):
+    """Разбиение крупной корзины по разряду digit на месте"""
+    shm, view = _attach(name, typecode)
+    try:
+        local = array(typecode)
+        local.frombytes(view[start:end].cast("B"))
+        counts = _american_flag_partition(local, 0, len(local), digit, radix)
+        view[start:end] = local
+        return start, counts, digit
+    finally:
+        view.release()
+        shm.close()
+
+
+def _sort_ranges(name, typecode, ranges, digit, radix, cutoff, small_sort):
+    """Сортировка группы соседних корзин, начиная с разряда digit"""
+    shm, view = _attach(name, typecode)
+    try:
+        span_start, span_end = ranges[0][0], ranges[-1][1]
+        local = array(typecode)
+        local.frombytes(view[span_start:span_end].cast("B"))
+        # Задача ограничена task_size элементами, поэтому корзины сортируются
+        # более быстрым движком на списках
+        for start, end in ranges:
+            start, end = start - span_start, end - span_start
+            bucket = _msd_radix_sort(local[start:end].tolist(), digit, radix, cutoff, _SMALL_SORTS[small_sort])
+            local[start:end] = array(typecode, bucket)
+        view[span_start:span_end] = local
+    finally:
+        view.release()
+        shm.close()
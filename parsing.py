@@ -0,0 +1,103 @@
+import warnings
+from array import array
+
+from vector_sort import np
+
+# Количество символов, разбираемых за один шаг
+PARSE_CHUNK = 1 << 20
+
+
+def iter_int_chunks(source, chunk_chars=PARSE_CHUNK):
+    """
+    Потоковый разбор целых чисел, разделенных пробельными символами
+    :param source: строка или открытый текстовый файл
+    :param chunk_chars: количество символов, разбираемых за один шаг
+    :return: генератор списков чисел (каждый - не больше chunk_chars символов текста)
+    """
+    tail = ''
+    for block in _iter_blocks(source, chunk_chars):
+        tokens = (tail + block).split()
+        # Последнее число может продолжаться в следующем куске
+        tail = tokens.pop() if tokens and not block[-1].isspace() else ''
+        yield list(map(int, tokens))
+    if tail:
+        yield [int(tail)]
+
+
+def _iter_blocks(source, chunk_chars):
+    """Чтение текста кусками из строки или файла"""
+    if isinstance(source, str):
+        for start in range(0, len(source), chunk_chars):
+            yield source[start:start + chunk_chars]
+    else:
+        while True:
+            block = source.read(chunk_chars)
+            if not block:
+                break
+            yield block
+
+
+def collect_ints(chunks):
+    """
+    Сборка кусков чисел в компактный array('q') (8 байт на число)
+    :param chunks: итерируемый объект со списками чисел
+    :return: array('q'), а если числа не помещаются в 64 бита - список
+    """
+    result = array('q')
+    for chunk in chunks:
+        if isinstance(result, array):
+            try:
+                result.extend(array('q', chunk))
+                continue
+            except OverflowError:
+                result = result.tolist()
+        result.extend(chunk)
+    return result
+
+
+def parse_ints(text, use_numpy=False):
+    """
+    Разбор строки с целыми числами через пробел
+    :param text: строка
+    :param use_numpy: разобрать средствами numpy (если установлен)
+    :return: array('q') (список для чисел шире 64 бит, массив numpy при use_numpy)
+    """
+    if use_numpy and np is not None:
+        result = _numpy_parse(lambda: np.fromstring(text, dtype=np.int64, sep=' '))
+        if result is not None:
+            return result
+    return collect_ints(iter_int_chunks(text))
+
+
+def read_ints(filename, use_numpy=False):
+    """
+    Потоковая загрузка целых чисел из текстового файла
+    :param filename: имя файла
+    :param use_numpy: разобрать средствами numpy (если установлен)
+    :return: array('q') (список для чисел шире 64 бит, массив numpy при use_numpy)
+    """
+    if use_numpy and np is not None:
+        result = _numpy_parse(lambda: np.fromfile(filename, dtype=np.int64, sep=' '))
+        if result is not None:
+            return result
+    with open(filename, 'r') as f:
+        return collect_ints(iter_int_chunks(f))
+
+
+def _numpy_parse(parse):
+    """
+    Разбор средствами numpy с проверкой ошибок
+    :return: массив numpy или None, если нужен разбор на Python
+    """
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        try:
+            result = parse()
+        except (DeprecationWarning, ValueError):
+            raise ValueError("Ожидаются только целые числа, разделенные пробелами") from None
+    # numpy насыщает переполненные значения до границ int64, а пустой текст
+    # разбирает как [0] - такие данные перепроверяем разбором на Python
+    info = np.iinfo(np.int64)
+    if result.size == 1 and result[0] == 0 or ((result == info.max) | (result == info.min)).any():
+        return None
+    return result
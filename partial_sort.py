@@ -0,0 +1,134 @@
+from main import SMALL_BUCKET_CUTOFF, _key_bias, _split_buckets, _top_digit, choose_radix
+from vector_sort import is_numpy_array, np
+
+
+def msd_radix_iter(arr, radix=None, cutoff=SMALL_BUCKET_CUTOFF, reverse=False):
+    """
+    Ленивая поразрядная сортировка (MSD): генератор, выдающий числа
+    по возрастанию корзина за корзиной. Корзины старшего разряда
+    окончательны слева направо, поэтому первые числа выдаются после
+    одного прохода раскладки, а корзины, до которых потребитель
+    не дошел, так и не раскладываются дальше
+    :param arr: последовательность целых чисел
+    :param radix: основание системы счисления (по умолчанию - см. choose_radix)
+    :param cutoff: корзины не длиннее cutoff досортировываются встроенной сортировкой
+    :param reverse: выдавать числа по убыванию
+    :return: генератор чисел
+    """
+    if len(arr) == 0:
+        return
+    keys, bias, digit, radix = _prepare(arr, radix)
+    stack = [(keys, digit)]
+    while stack:
+        bucket, digit = stack.pop()
+        if digit == 0 or len(bucket) <= cutoff:
+            if digit:
+                bucket.sort(reverse=reverse)
+            if bias:
+                for num in bucket:
+                    yield num + bias
+            else:
+                yield from bucket
+            continue
+        buckets = _split(bucket, digit, radix)
+        # В стек корзины кладутся так, чтобы первой извлекалась выдаваемая первой
+        stack.extend((b, digit // radix) for b in (buckets if reverse else reversed(buckets)))
+
+
+def msd_radix_topk(arr, k, largest=False, radix=None, cutoff=SMALL_BUCKET_CUTOFF):
+    """
+    k наименьших (или наибольших) чисел по порядку. На каждом уровне
+    раскладываются дальше только корзины, в которые попадают первые k
+    рангов, остальные отбрасываются
+    :param arr: последовательность целых чисел (или массив numpy)
+    :param k: количество чисел
+    :param largest: выбрать наибольшие числа (по убыванию)
+    :param radix: основание системы счисления (по умолчанию - см. choose_radix)
+    :param cutoff: корзины не длиннее cutoff досортировываются встроенной сортировкой
+    :return: список из min(k, len(arr)) чисел
+    """
+    k = min(k, len(arr))
+    if k <= 0:
+        return []
+    if is_numpy_array(arr):
+        # Для numpy ранги отбирает np.partition
+        part = np.partition(arr, len(arr) - k if largest else k - 1)
+        part = np.sort(part[len(arr) - k:] if largest else part[:k])
+        return (part[::-1] if largest else part).tolist()
+
+    keys, bias, digit, radix = _prepare(arr, radix)
+    result = []
+    stack = [(keys, digit)]
+    while stack and len(result) < k:
+        bucket, digit = stack.pop()
+        need = k - len(result)
+        if digit == 0 or len(bucket) <= cutoff:
+            if digit:
+                bucket.sort(reverse=largest)
+            result.extend(bucket[:need])
+            continue
+        buckets = _split(bucket, digit, radix)
+        if largest:
+            buckets.reverse()
+        # Нужны только корзины, покрывающие need первых рангов
+        covered = 0
+        for count, b in enumerate(buckets, 1):
+            covered += len(b)
+            if covered >= need:
+                del buckets[count:]
+                break
+        stack.extend((b, digit // radix) for b in reversed(buckets))
+    return [num + bias for num in result] if bias else result
+
+
+def msd_radix_select(arr, index, radix=None, cutoff=SMALL_BUCKET_CUTOFF):
+    """
+    Число, стоящее на месте index в отсортированном массиве (порядковая
+    статистика), без сортировки: на каждом уровне раскладывается дальше
+    только корзина, содержащая ранг index. Медиана - index = len(arr) // 2,
+    процентиль p - index = p * (len(arr) - 1) // 100
+    :param arr: последовательность целых чисел (или массив numpy)
+    :param index: ранг от 0; отрицательный отсчитывается с конца, как у списков
+    :param radix: основание системы счисления (по умолчанию - см. choose_radix)
+    :param cutoff: корзины не длиннее cutoff досортировываются встроенной сортировкой
+    :return: число
+    """
+    n = len(arr)
+    if index < 0:
+        index += n
+    if not 0 <= index < n:
+        raise IndexError("Индекс вне диапазона массива")
+    if is_numpy_array(arr):
+        return int(np.partition(arr, index)[index])
+
+    bucket, bias, digit, radix = _prepare(arr, radix)
+    while digit and len(bucket) > cutoff:
+        for b in _split(bucket, digit, radix):
+            if index < len(b):
+                bucket = b
+                break
+            index -= len(b)
+        digit //= radix
+    if digit:
+        bucket.sort()
+    return bucket[index] + bias
+
+
+def _prepare(arr, radix):
+    """
+    Ключи для раскладки: неотрицательные num - bias (см. main._key_bias)
+    :return: (список ключей, bias, вес старшего разряда, основание)
+    """
+    min_val, max_val = min(arr), max(arr)
+    if radix is None:
+        radix = choose_radix(len(arr), max_val - min_val)
+    elif radix < 2:
+        raise ValueError("Основание системы счисления должно быть не меньше 2")
+    bias = _key_bias(min_val, max_val, radix)
+    keys = [num - bias for num in arr] if bias else list(arr)
+    return keys, bias, _top_digit(max_val - bias, radix), radix
+
+
+def _split(bucket, digit, radix):
+    """Раскладка по цифре разряда digit: непустые корзины по возрастанию цифры (см. main._split_buckets)"""
+    return [b for b in _split_buckets(bucket, digit, radix) if b]
@@ -0,0 +1,41 @@
+# Общие начало и окончание последовательностей (строк, bytes, списков, array)
+# сравниваются срезами на C: сначала блоками удвоенного размера, затем
+# двоичным поиском внутри блока - так длинные совпадения (URL, пути,
+# неизмененные части массивов) не проходятся поэлементно в Python
+
+
+def common_prefix(a, b, start=0):
+    """
+    Длина общего начала a и b
+    :param start: количество первых элементов, которые уже совпадают
+    :return: длина общего начала
+    """
+    limit = min(len(a), len(b))
+    length, step = start, 16
+    while length + step <= limit and a[length:length + step] == b[length:length + step]:
+        length += step
+        step *= 2
+    while step > 1:
+        step //= 2
+        if length + step <= limit and a[length:length + step] == b[length:length + step]:
+            length += step
+    return length
+
+
+def common_suffix(a, a_end, b, b_end, limit):
+    """
+    Длина общего окончания a[:a_end] и b[:b_end]
+    :param limit: наибольшая длина окончания
+    :return: длина общего окончания, не больше limit
+    """
+    length, step = 0, 16
+    while length + step <= limit and a[a_end - length - step:a_end - length] == \
+            b[b_end - length - step:b_end - length]:
+        length += step
+        step *= 2
+    while step > 1:
+        step //= 2
+        if length + step <= limit and a[a_end - length - step:a_end - length] == \
+                b[b_end - length - step:b_end - length]:
+            length += step
+    return length
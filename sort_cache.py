@@ -0,0 +1,81 @@
+import threading
+from collections import OrderedDict
+
+from main import msd_radix_sort
+from storage import content_hash, encode_array
+
+# Сколько отсортированных массивов хранится в памяти
+DEFAULT_CAPACITY = 1024
+
+
+class SortCache:
+    """
+    Кэш результатов сортировки по хешу содержимого массива.
+    Результат ищется сначала в памяти (вытеснение давно не использованных, LRU),
+    затем в БД среди сохраненных массивов, и только потом массив сортируется.
+    Возвращаемый массив общий для всех вызовов с тем же содержимым - его нельзя изменять.
+    Кэш можно использовать из нескольких потоков; сортировка при промахе идет
+    вне блокировки, поэтому одинаковые массивы в разных потоках могут
+    отсортироваться дважды.
+    """
+
+    def __init__(self, storage=None, capacity=DEFAULT_CAPACITY, sort_func=msd_radix_sort):
+        """
+        :param storage: ArrayStorage для поиска ранее сохраненных массивов (None - только память)
+        :param capacity: сколько результатов хранить в памяти
+        :param sort_func: функция сортировки при промахе
+        """
+        self.storage = storage
+        self.capacity = capacity
+        self.sort_func = sort_func
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0  # Найдено в памяти
+        self.db_hits = 0  # Найдено в БД
+        self.misses = 0  # Пришлось сортировать
+
+    def sort(self, arr, progress=None):
+        """
+        Сортировка с использованием кэша
+        :param arr: массив целых чисел
+        :param progress: функция прогресса для sort_func при промахе (см. msd_radix_sort)
+        :return: отсортированный массив (список, array('q') или memoryview)
+        """
+        digest = content_hash(encode_array(arr))
+        with self._lock:
+            result = self._memory.get(digest)
+            if result is not None:
+                self._memory.move_to_end(digest)
+                self.hits += 1
+                return result
+
+        if self.storage is not None:
+            result = self.storage.find_sorted(digest)
+        # Длина совпадает при любом верном результате - дешевая защита от коллизий
+        hit = result is not None and len(result) == len(arr)
+        if not hit:
+            result = self.sort_func(arr) if progress is None else self.sort_func(arr, progress=progress)
+
+        with self._lock:
+            if hit:
+                self.db_hits += 1
+            else:
+                self.misses += 1
+            self._memory[digest] = result
+            if len(self._memory) > self.capacity:
+                self._memory.popitem(last=False)
+        return result
+
+    def clear(self):
+        """Очистка кэша в памяти и счетчиков"""
+        with self._lock:
+            self._memory.clear()
+            self.hits = self.db_hits = self.misses = 0
+
+    def stats(self):
+        """Счетчики попаданий и промахов"""
+        return {"hits": self.hits, "db_hits": self.db_hits, "misses": self.misses, "size": len(self._memory)}
+
+    def format_stats(self):
+        """Счетчики для строки состояния"""
+        return f"в памяти {self.hits}, в БД {self.db_hits}, промахов {self.misses}"
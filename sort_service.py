@@ -0,0 +1,320 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from main import msd_radix_sort, msd_radix_sort_many
+from storage import POOL_READERS, ConnectionPool
+
+# Протокол: по одному JSON-объекту в строке в обе стороны.
+# Запрос: {"id": любое значение, "op": операция, ...}; ответ повторяет id
+# и содержит "ok": true и результат либо "ok": false и "error".
+# Операции:
+#   sort  {"values": [...]}   -> {"sorted": [...]}
+#   store {"values": [...]}   -> {"array_id": n} (массив сортируется и сохраняется в БД)
+#   get   {"array_id": n}     -> {"values": [...], "sorted": [...]}
+#   stats                     -> счетчики сервиса
+# Запросы одного соединения обрабатываются параллельно, ответы приходят
+# по готовности, поэтому клиент может отправлять запросы, не дожидаясь ответов
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+
+# Наибольшая длина строки запроса или ответа (массив 10^6 чисел в JSON - около 20 МБ)
+MAX_LINE = 64 * 1024 * 1024
+
+# Запросы, пришедшие в течение BATCH_WINDOW секунд, сортируются одним
+# вызовом msd_radix_sort_many (в сумме не больше BATCH_MAX_NUMBERS чисел -
+# пачка сортируется в цикле событий и не должна задерживать его надолго)
+BATCH_WINDOW = 0.002
+BATCH_MAX_NUMBERS = 50000
+
+# Массивы длиннее сортируются в пуле процессов, а не в пачках
+LARGE_REQUEST = 20000
+
+# Сохранения, пришедшие в течение STORE_WINDOW секунд, записываются
+# в БД одной транзакцией (не больше STORE_MAX_ARRAYS массивов)
+STORE_WINDOW = 0.005
+STORE_MAX_ARRAYS = 1000
+
+
+class MicroBatcher:
+    """
+    Объединение одновременных запросов в пачки: элементы, поданные submit
+    в течение window секунд (или пока их суммарный вес не достигнет max_weight),
+    обрабатываются одним вызовом process. Работает в цикле событий asyncio
+    """
+
+    def __init__(self, process, window, max_weight, weight=None):
+        """
+        :param process: сопрограмма process(элементы) -> результаты в том же порядке
+        :param window: наибольшее ожидание пачки в секундах
+        :param max_weight: вес, при котором пачка обрабатывается не дожидаясь window
+        :param weight: вес элемента (по умолчанию 1)
+        """
+        self.process = process
+        self.window = window
+        self.max_weight = max_weight
+        self.weight = weight or (lambda item: 1)
+        self.batches = 0
+        self.items = 0
+        self._pending = []
+        self._pending_weight = 0
+        self._timer = None
+        self._tasks = set()
+
+    def submit(self, item):
+        """
+        Постановка элемента в текущую пачку
+        :return: future с результатом обработки элемента
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future))
+        self._pending_weight += self.weight(item)
+        if self._pending_weight >= self.max_weight:
+            self.flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self.flush)
+        return future
+
+    def flush(self):
+        """Запуск обработки накопленной пачки"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending, self._pending_weight = self._pending, [], 0
+        if batch:
+            task = asyncio.ensure_future(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            results = await self.process([item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            if not future.done():
+                future.set_result(result)
+
+    async def close(self):
+        """Обработка оставшихся элементов и ожидание незавершенных пачек"""
+        self.flush()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+
+class SortService:
+    """
+    Локальный сервис сортировки: небольшие массивы из одновременных
+    запросов сортируются пачками (msd_radix_sort_many), большие - в пуле
+    процессов; сохранение идет через ConnectionPool: записи из одновременных
+    запросов объединяются в одну транзакцию единственного писателя,
+    чтение - через соединения-читатели WAL
+    """
+
+    def __init__(self, db_path='arrays.db', workers=None, readers=POOL_READERS,
+                 batch_window=BATCH_WINDOW, store_window=STORE_WINDOW):
+        """
+        :param db_path: путь к файлу БД
+        :param workers: количество процессов для больших массивов
+            (None - число ядер, 0 - сортировать их в потоке)
+        :param readers: количество соединений-читателей
+        :param batch_window: ожидание пачки сортировки в секундах
+        :param store_window: ожидание пачки записи в БД в секундах
+        """
+        self.db = ConnectionPool(db_path, readers)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.process_pool = ProcessPoolExecutor(max_workers=workers) if workers > 0 else None
+        # Писатель один - все записи выполняет один поток
+        self.write_executor = ThreadPoolExecutor(max_workers=1)
+        self.read_executor = ThreadPoolExecutor(max_workers=readers)
+        self.sort_batcher = MicroBatcher(self._sort_batch, batch_window, BATCH_MAX_NUMBERS, len)
+        self.store_batcher = MicroBatcher(self._store_batch, store_window, STORE_MAX_ARRAYS)
+        self.counters = {"requests": 0, "errors": 0, "large_sorts": 0}
+        self.server = None
+
+    async def start(self, host=DEFAULT_HOST, port=DEFAULT_PORT, unix_path=None):
+        """
+        Запуск сервера на localhost или на Unix-сокете unix_path
+        :return: asyncio.Server
+        """
+        if unix_path is not None:
+            self.server = await asyncio.start_unix_server(self.handle_client, unix_path, limit=MAX_LINE)
+        else:
+            self.server = await asyncio.start_server(self.handle_client, host, port, limit=MAX_LINE)
+        return self.server
+
+    async def close(self):
+        """Остановка приема соединений, завершение пачек и закрытие пулов"""
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        await self.sort_batcher.close()
+        await self.store_batcher.close()
+        if self.process_pool is not None:
+            self.process_pool.shutdown()
+        self.write_executor.shutdown()
+        self.read_executor.shutdown()
+        self.db.close()
+
+    async def handle_client(self, reader, writer):
+        """Обработка соединения: каждый запрос - отдельная задача"""
+        tasks = set()
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except (ConnectionError, ValueError):
+                    break  # Обрыв соединения или строка длиннее MAX_LINE
+                if not line:
+                    break
+                task = asyncio.ensure_future(self._respond(line, writer))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            if tasks:
+                await asyncio.gather(*tasks, return_exceptions=True)
+        finally:
+            writer.close()
+
+    async def _respond(self, line, writer):
+        response = await self.handle_request(line)
+        if not writer.is_closing():
+            writer.write(json.dumps(response, separators=(',', ':')).encode() + b"\n")
+            await writer.drain()
+
+    async def handle_request(self, line):
+        """
+        Выполнение одного запроса
+        :param line: строка запроса (JSON)
+        :return: словарь ответа
+        """
+        self.counters["requests"] += 1
+        request_id = None
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError("Запрос должен быть объектом JSON")
+            request_id = request.get("id")
+            op = request.get("op")
+            if op == "sort":
+                result = {"sorted": await self.sort(_values(request))}
+            elif op == "store":
+                result = {"array_id": await self.store(_values(request))}
+            elif op == "get":
+                result = await self.get(request.get("array_id"))
+            elif op == "stats":
+                result = self.stats()
+            else:
+                raise ValueError(f"Неизвестная операция: {op}")
+        except Exception as e:
+            self.counters["errors"] += 1
+            return {"id": request_id, "ok": False, "error": str(e) or type(e).__name__}
+        return {"id": request_id, "ok": True, **result}
+
+    async def sort(self, values):
+        """Сортировка массива: большого - в пуле процессов, небольшого - в пачке"""
+        if len(values) >= LARGE_REQUEST:
+            self.counters["large_sorts"] += 1
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self.process_pool, msd_radix_sort, values)
+        return await self.sort_batcher.submit(values)
+
+    async def _sort_batch(self, arrays):
+        return [_as_list(arr) for arr in msd_radix_sort_many(arrays)]
+
+    async def store(self, values):
+        """Сортировка и сохранение массива: :return: id записи"""
+        sorted_values = await self.sort(values)
+        return await self.store_batcher.submit((values, sorted_values))
+
+    async def _store_batch(self, pairs):
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.write_executor, self.db.writer.insert_many, pairs)
+
+    async def get(self, array_id):
+        """Загрузка массива через соединение-читатель"""
+        if type(array_id) is not int:
+            raise ValueError("array_id должен быть целым числом")
+        loop = asyncio.get_running_loop()
+        row = await loop.run_in_executor(self.read_executor, self._read, array_id)
+        if row is None:
+            raise ValueError(f"Массив с ID {array_id} не найден")
+        return {"values": _as_list(row[0]), "sorted": _as_list(row[1])}
+
+    def _read(self, array_id):
+        with self.db.reader() as storage:
+            return storage.get(array_id)
+
+    def stats(self):
+        """Счетчики сервиса: запросы, ошибки, пачки и средний размер пачки"""
+        return {
+            **self.counters,
+            "sort_batches": self.sort_batcher.batches,
+            "sort_batched": self.sort_batcher.items,
+            "store_batches": self.store_batcher.batches,
+            "store_batched": self.store_batcher.items,
+        }
+
+
+def _values(request):
+    """Проверенный массив целых чисел из поля values запроса"""
+    values = request.get("values")
+    if not isinstance(values, list) or not all(type(num) is int for num in values):
+        raise ValueError("values должен быть списком целых чисел")
+    return values
+
+
+def _as_list(arr):
+    """Список для JSON из результата сортировки (список, array, memoryview или массив numpy)"""
+    if arr is None or isinstance(arr, list):
+        return arr
+    return arr.tolist()
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        description="Локальный сервис поразрядной сортировки (JSON по строкам через TCP или Unix-сокет)"
+    )
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--unix", metavar="PATH", help="слушать Unix-сокет вместо TCP")
+    parser.add_argument("--db", default="arrays.db", help="файл БД (по умолчанию arrays.db)")
+    parser.add_argument("-j", "--workers", type=int,
+                        help="процессов для больших массивов (по умолчанию - число ядер, 0 - без пула)")
+    parser.add_argument("--readers", type=int, default=POOL_READERS, help="соединений-читателей БД")
+    parser.add_argument("--batch-window", type=float, default=BATCH_WINDOW * 1000,
+                        help="ожидание пачки сортировки в мс")
+    return parser
+
+
+async def serve(args):
+    """Запуск сервиса до прерывания"""
+    service = SortService(args.db, args.workers, args.readers, args.batch_window / 1000)
+    await service.start(args.host, args.port, args.unix)
+    where = args.unix or f"{args.host}:{args.port}"
+    print(f"Сервис сортировки слушает {where}", file=sys.stderr)
+    try:
+        await asyncio.Event().wait()
+    finally:
+        await service.close()
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        asyncio.run(serve(args))
+    except KeyboardInterrupt:
+        print("Сервис остановлен", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
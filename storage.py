@@ -0,0 +1,631 @@
+import hashlib
+import json
+import queue
+import sqlite3
+import sys
+import threading
+from array import array
+from contextlib import contextmanager
+from itertools import islice
+
+from incremental import incremental_resort, merge_sorted
+from main import msd_radix_sort, msd_radix_sort_many
+from metrics import METRICS, timed
+from parsing import parse_ints
+from vector_sort import is_numpy_array
+
+# Версия схемы БД (PRAGMA user_version):
+# 0/1 - массивы хранятся текстом через пробел
+# 2 - массивы хранятся упакованными BLOB (см. encode_array)
+# 3 - столбец content_hash с индексом для поиска одинаковых массивов
+# 4 - индекс по дате создания и счетчик строк, поддерживаемый триггерами
+SCHEMA_VERSION = 4
+
+# Формат BLOB задается первым байтом
+FORMAT_INT64 = 1  # int64 little-endian фиксированной ширины
+FORMAT_DELTA_VARINT = 2  # разности соседних чисел в zigzag-varint
+
+# Сколько строк конвертируется за один шаг миграции
+MIGRATION_BATCH = 1000
+
+# Размер хеша содержимого массива в байтах
+HASH_SIZE = 16
+
+# Сколько массивов сортируется и кодируется перед одним вызовом executemany
+BULK_BATCH = 1000
+
+# Сколько байт начала массива выбирается для предпросмотра: байт формата
+# и 20 чисел int64 (или не меньше 16 чисел varint), а format_preview
+# показывает не больше 20 символов - то есть не больше 10 чисел
+PREVIEW_BYTES = 1 + 8 * 20
+
+# Столбцы строки таблицы в окне просмотра; порядок строк - новые сверху
+PAGE_COLUMNS = "id, substr(array_data, 1, ?), substr(sorted_array_data, 1, ?), is_sorted, created_at"
+PAGE_ORDER = "ORDER BY created_at DESC, id DESC"
+
+# Настройки SQLite по умолчанию: журнал WAL с synchronous=NORMAL не теряет
+# целостность при сбое и не синхронизирует диск на каждой транзакции;
+# отрицательный cache_size задается в КиБ (64 МиБ)
+DEFAULT_JOURNAL_MODE = "WAL"
+DEFAULT_SYNCHRONOUS = "NORMAL"
+DEFAULT_CACHE_SIZE = -65536
+
+JOURNAL_MODES = ("DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF")
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+# Сколько событий метрик накапливается перед записью в таблицу metrics
+METRICS_BATCH = 100
+
+# Количество соединений-читателей в ConnectionPool по умолчанию
+POOL_READERS = 4
+
+
+def encode_array(arr, is_sorted=False):
+    """
+    Упаковка массива целых чисел в BLOB
+    :param arr: последовательность целых чисел
+    :param is_sorted: массив отсортирован - разности неотрицательны и малы,
+        поэтому выгоднее delta-varint
+    :return: bytes
+    """
+    if is_numpy_array(arr):
+        arr = arr.tolist()
+    if not is_sorted:
+        try:
+            buf = array('q', arr)
+        except OverflowError:
+            pass  # Числа шире 64 бит - только varint
+        else:
+            if sys.byteorder == 'big':
+                buf.byteswap()
+            return bytes([FORMAT_INT64]) + buf.tobytes()
+
+    out = bytearray([FORMAT_DELTA_VARINT])
+    prev = 0
+    for num in arr:
+        delta = num - prev
+        prev = num
+        # zigzag: 0, -1, 1, -2, 2 ... -> 0, 1, 2, 3, 4 ...
+        value = delta << 1 if delta >= 0 else (-delta << 1) - 1
+        while value >= 0x80:
+            out.append(value & 0x7F | 0x80)
+            value >>= 7
+        out.append(value)
+    return bytes(out)
+
+
+def decode_array(value):
+    """
+    Распаковка массива из BLOB (или из текста строк старой схемы)
+    :param value: bytes, str или None
+    :return: memoryview формата 'q' без копирования для FORMAT_INT64,
+        иначе array('q') (список для чисел шире 64 бит); None для None
+    """
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return parse_ints(value)
+
+    fmt = value[0]
+    if fmt == FORMAT_INT64:
+        if sys.byteorder == 'little':
+            return memoryview(value)[1:].cast('q')
+        buf = array('q')
+        buf.frombytes(value[1:])
+        buf.byteswap()
+        return buf
+    if fmt == FORMAT_DELTA_VARINT:
+        return _decode_delta_varint(value)
+    raise ValueError(f"Неизвестный формат массива: {fmt}")
+
+
+def content_hash(blob):
+    """
+    Хеш содержимого массива
+    :param blob: массив, упакованный encode_array (без флага is_sorted)
+    :return: bytes длиной HASH_SIZE
+    """
+    return hashlib.blake2b(blob, digest_size=HASH_SIZE).digest()
+
+
+@timed("serialize")
+def encode_row(arr, sorted_arr):
+    """Значения столбцов (array_data, sorted_array_data, content_hash) для записи массива"""
+    blob = encode_array(arr)
+    return blob, encode_array(sorted_arr, is_sorted=True), content_hash(blob)
+
+
+def _decode_delta_varint(blob):
+    result = []
+    prev = value = shift = 0
+    for byte in memoryview(blob)[1:]:
+        value |= (byte & 0x7F) << shift
+        if byte & 0x80:
+            shift += 7
+            continue
+        prev += value >> 1 if not value & 1 else -((value + 1) >> 1)
+        result.append(prev)
+        value = shift = 0
+    try:
+        return array('q', result)
+    except OverflowError:
+        return result
+
+
+def _sorted_pairs(arrays, batch_size, sort_func):
+    """Пары (массив, отсортированный массив) для bulk_insert"""
+    if sort_func is not None:
+        for arr in arrays:
+            yield arr, sort_func(arr)
+        return
+    arrays = iter(arrays)
+    batch = list(islice(arrays, batch_size))
+    while batch:
+        yield from zip(batch, msd_radix_sort_many(batch))
+        batch = list(islice(arrays, batch_size))
+
+
+class ArrayStorage:
+    """
+    Хранилище массивов в таблице arrays базы SQLite.
+    Методы можно вызывать из разных потоков: обращения к соединению
+    выполняются под блокировкой lock, а упаковка массивов - вне ее.
+    При включенном сборе метрик (metrics.METRICS) время запросов
+    учитывается как этапы "db.<метод>" и "db.commit"
+    """
+
+    def __init__(self, path='arrays.db', journal_mode=DEFAULT_JOURNAL_MODE,
+                 synchronous=DEFAULT_SYNCHRONOUS, cache_size=DEFAULT_CACHE_SIZE):
+        """
+        :param path: путь к файлу БД
+        :param journal_mode: режим журнала (PRAGMA journal_mode), None - не менять
+        :param synchronous: режим синхронизации (PRAGMA synchronous), None - не менять
+        :param cache_size: размер кэша страниц (PRAGMA cache_size): положительный -
+            в страницах, отрицательный - в КиБ; None - не менять
+        """
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.RLock()
+        self.configure(journal_mode, synchronous, cache_size)
+        self.ensure_schema()
+
+    def configure(self, journal_mode=None, synchronous=None, cache_size=None):
+        """Установка PRAGMA соединения (значения None не меняются)"""
+        if journal_mode is not None:
+            if journal_mode.upper() not in JOURNAL_MODES:
+                raise ValueError(f"Неизвестный режим журнала: {journal_mode}")
+            self.conn.execute(f"PRAGMA journal_mode = {journal_mode}")
+        if synchronous is not None:
+            if str(synchronous).upper() not in SYNCHRONOUS_MODES + ("0", "1", "2", "3"):
+                raise ValueError(f"Неизвестный режим синхронизации: {synchronous}")
+            self.conn.execute(f"PRAGMA synchronous = {synchronous}")
+        if cache_size is not None:
+            self.conn.execute(f"PRAGMA cache_size = {int(cache_size)}")
+
+    def ensure_schema(self):
+        """Создание таблицы и пошаговая миграция схемы до SCHEMA_VERSION"""
+        cursor = self.conn.cursor()
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS arrays (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                array_data BLOB NOT NULL,
+                sorted_array_data BLOB,
+                is_sorted BOOLEAN DEFAULT 0,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        version = cursor.execute("PRAGMA user_version").fetchone()[0]
+        for target in range(max(version, 1) + 1, SCHEMA_VERSION + 1):
+            getattr(self, f"_migrate_v{target}")(cursor)
+            cursor.execute(f"PRAGMA user_version = {target}")
+            self.conn.commit()
+
+    def _migrate_v2(self, cursor):
+        """Перевод текстовых строк в упакованные BLOB"""
+        last_id = 0
+        while True:
+            cursor.execute('''
+                SELECT id, array_data, sorted_array_data FROM arrays
+                WHERE id > ? AND (typeof(array_data) = 'text' OR typeof(sorted_array_data) = 'text')
+                ORDER BY id LIMIT ?
+            ''', (last_id, MIGRATION_BATCH))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            updates = []
+            for array_id, array_data, sorted_data in rows:
+                try:
+                    updates.append((
+                        encode_array(decode_array(array_data)),
+                        None if sorted_data is None else encode_array(decode_array(sorted_data), is_sorted=True),
+                        array_id,
+                    ))
+                except ValueError:
+                    pass  # Некорректный текст оставляем как есть
+            cursor.executemany("UPDATE arrays SET array_data = ?, sorted_array_data = ? WHERE id = ?", updates)
+            last_id = rows[-1][0]
+
+    def _migrate_v3(self, cursor):
+        """Добавление хеша содержимого исходного массива"""
+        cursor.execute("ALTER TABLE arrays ADD COLUMN content_hash BLOB")
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_arrays_content_hash ON arrays (content_hash)")
+        last_id = 0
+        while True:
+            cursor.execute('''
+                SELECT id, array_data FROM arrays
+                WHERE id > ? AND typeof(array_data) = 'blob'
+                ORDER BY id LIMIT ?
+            ''', (last_id, MIGRATION_BATCH))
+            rows = cursor.fetchall()
+            if not rows:
+                break
+            cursor.executemany("UPDATE arrays SET content_hash = ? WHERE id = ?",
+                               [(content_hash(array_data), array_id) for array_id, array_data in rows])
+            last_id = rows[-1][0]
+
+    def _migrate_v4(self, cursor):
+        """Индекс для постраничного просмотра и счетчик строк без COUNT(*)"""
+        cursor.execute("CREATE INDEX IF NOT EXISTS idx_arrays_created_at ON arrays (created_at DESC, id DESC)")
+        cursor.execute("CREATE TABLE IF NOT EXISTS arrays_count (n INTEGER NOT NULL)")
+        cursor.execute("DELETE FROM arrays_count")
+        cursor.execute("INSERT INTO arrays_count SELECT COUNT(*) FROM arrays")
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS arrays_count_insert AFTER INSERT ON arrays
+            BEGIN UPDATE arrays_count SET n = n + 1; END
+        ''')
+        cursor.execute('''
+            CREATE TRIGGER IF NOT EXISTS arrays_count_delete AFTER DELETE ON arrays
+            BEGIN UPDATE arrays_count SET n = n - 1; END
+        ''')
+
+    def insert(self, arr, sorted_arr):
+        """
+        Добавление массива вместе с отсортированной версией
+        :return: id новой записи
+        """
+        row = encode_row(arr, sorted_arr)
+        with self.lock:
+            cursor = self.conn.cursor()
+            with METRICS.timer("db.insert"):
+                cursor.execute(
+                    "INSERT INTO arrays (array_data, sorted_array_data, is_sorted, content_hash) VALUES (?, ?, 1, ?)",
+                    row
+                )
+            self._commit()
+            return cursor.lastrowid
+
+    def bulk_insert(self, arrays, batch_size=BULK_BATCH, sort_func=None):
+        """
+        Добавление множества массивов одной транзакцией. Массивы сортируются
+        и кодируются пачками по batch_size и вставляются через executemany;
+        при ошибке транзакция откатывается целиком.
+        :param arrays: итерируемый объект с массивами целых чисел
+        :param batch_size: количество массивов в одной пачке
+        :param sort_func: функция сортировки одного массива; по умолчанию
+            каждая пачка сортируется одним вызовом msd_radix_sort_many
+        :return: количество добавленных массивов
+        """
+        return self.bulk_insert_sorted(_sorted_pairs(arrays, batch_size, sort_func), batch_size)
+
+    def bulk_insert_sorted(self, pairs, batch_size=BULK_BATCH):
+        """
+        Добавление множества уже отсортированных массивов одной транзакцией
+        (см. bulk_insert)
+        :param pairs: итерируемый объект с парами (массив, отсортированный массив)
+        :param batch_size: количество массивов в одной пачке
+        :return: количество добавленных массивов
+        """
+        total = 0
+        batch = []
+        with self.lock, self.conn:
+            cursor = self.conn.cursor()
+            for arr, sorted_arr in pairs:
+                batch.append(encode_row(arr, sorted_arr))
+                if len(batch) >= batch_size:
+                    total += self._insert_batch(cursor, batch)
+                    batch = []
+            if batch:
+                total += self._insert_batch(cursor, batch)
+        return total
+
+    def insert_many(self, pairs):
+        """
+        Добавление нескольких уже отсортированных массивов одной транзакцией
+        с возвратом их id (bulk_insert_sorted id не возвращает: executemany
+        не сообщает lastrowid)
+        :param pairs: последовательность пар (массив, отсортированный массив)
+        :return: список id новых записей в порядке pairs
+        """
+        rows = [encode_row(arr, sorted_arr) for arr, sorted_arr in pairs]
+        ids = []
+        with self.lock, self.conn, METRICS.timer("db.insert_many", size=len(rows)):
+            cursor = self.conn.cursor()
+            for row in rows:
+                cursor.execute(
+                    "INSERT INTO arrays (array_data, sorted_array_data, is_sorted, content_hash) VALUES (?, ?, 1, ?)",
+                    row
+                )
+                ids.append(cursor.lastrowid)
+        return ids
+
+    @staticmethod
+    @timed("db.bulk_insert")
+    def _insert_batch(cursor, batch):
+        cursor.executemany(
+            "INSERT INTO arrays (array_data, sorted_array_data, is_sorted, content_hash) VALUES (?, ?, 1, ?)", batch
+        )
+        return len(batch)
+
+    def _commit(self):
+        """Фиксация транзакции (вызывается под lock)"""
+        with METRICS.timer("db.commit"):
+            self.conn.commit()
+
+    def update(self, array_id, arr, sorted_arr):
+        """Замена массива с указанным id"""
+        row = encode_row(arr, sorted_arr) + (array_id,)
+        with self.lock:
+            with METRICS.timer("db.update"):
+                self.conn.execute(
+                    "UPDATE arrays SET array_data = ?, sorted_array_data = ?, is_sorted = 1, content_hash = ? "
+                    "WHERE id = ?",
+                    row
+                )
+            self._commit()
+
+    def update_incremental(self, array_id, arr, sort_func=msd_radix_sort):
+        """
+        Замена массива с пересортировкой только измененной части: разность
+        с сохраненным массивом сливается с сохраненной отсортированной версией
+        (см. incremental.incremental_resort). При большом изменении массив
+        сортируется целиком. Чтение и запись - отдельные обращения к БД,
+        поэтому сортировка не блокирует других пользователей хранилища
+        :param sort_func: сортировка добавленных чисел или всего массива
+        :return: отсортированный массив (None, если записи с array_id нет)
+        """
+        stored = self.get(array_id)
+        if stored is None:
+            return None
+        sorted_arr = None
+        if stored[1] is not None:
+            sorted_arr = incremental_resort(stored[0], stored[1], arr, sort_func)
+        if sorted_arr is None:
+            sorted_arr = sort_func(arr)
+        self.update(array_id, arr, sorted_arr)
+        return sorted_arr
+
+    def append_to_array(self, array_id, values, sort_func=msd_radix_sort):
+        """
+        Дописывание чисел в конец сохраненного массива: сортируются только
+        новые числа и сливаются с сохраненной отсортированной версией
+        :param values: последовательность целых чисел
+        :param sort_func: сортировка новых чисел
+        :return: отсортированный массив (None, если записи с array_id нет)
+        """
+        stored = self.get(array_id)
+        if stored is None:
+            return None
+        arr = list(stored[0])
+        arr.extend(values)
+        if stored[1] is None:
+            sorted_arr = sort_func(arr)
+        else:
+            sorted_arr = merge_sorted(stored[1], added=values, sort_func=sort_func)
+        self.update(array_id, arr, sorted_arr)
+        return sorted_arr
+
+    def get(self, array_id):
+        """
+        Загрузка массива по id
+        :return: (исходный массив, отсортированный массив) или None, если записи нет
+        """
+        with self.lock, METRICS.timer("db.get"):
+            row = self.conn.execute(
+                "SELECT array_data, sorted_array_data FROM arrays WHERE id = ?", (array_id,)
+            ).fetchone()
+        if row is None:
+            return None
+        with METRICS.timer("deserialize"):
+            return decode_array(row[0]), decode_array(row[1])
+
+    def find_sorted(self, digest):
+        """
+        Поиск отсортированной версии массива по хешу содержимого
+        :param digest: хеш исходного массива (см. content_hash)
+        :return: отсортированный массив или None, если такого массива в БД нет
+        """
+        with self.lock, METRICS.timer("db.find_sorted"):
+            row = self.conn.execute(
+                "SELECT sorted_array_data FROM arrays WHERE content_hash = ? AND sorted_array_data IS NOT NULL LIMIT 1",
+                (digest,)
+            ).fetchone()
+        return None if row is None else decode_array(row[0])
+
+    def delete(self, array_id):
+        """Удаление массива по id"""
+        with self.lock:
+            with METRICS.timer("db.delete"):
+                self.conn.execute("DELETE FROM arrays WHERE id = ?", (array_id,))
+            self._commit()
+
+    def clear(self):
+        """Удаление всех массивов"""
+        with self.lock:
+            with METRICS.timer("db.clear"):
+                self.conn.execute("DELETE FROM arrays")
+            self._commit()
+
+    def count(self):
+        """Количество массивов в БД (за постоянное время, из arrays_count)"""
+        with self.lock, METRICS.timer("db.count"):
+            return self.conn.execute("SELECT n FROM arrays_count").fetchone()[0]
+
+    def page(self, limit, after=None, inclusive=False):
+        """
+        Страница строк для просмотра (новые сверху) с навигацией по ключу:
+        время выборки не зависит от размера таблицы
+        :param limit: количество строк
+        :param after: ключ (created_at, id) строки, после которой начинается страница;
+            None - с начала
+        :param inclusive: включить в страницу саму строку after
+        :return: список строк (id, начало array_data, начало sorted_array_data, is_sorted, created_at)
+        """
+        if after is None:
+            query = f"SELECT {PAGE_COLUMNS} FROM arrays {PAGE_ORDER} LIMIT ?"
+            params = (PREVIEW_BYTES, PREVIEW_BYTES, limit)
+        else:
+            op = "<=" if inclusive else "<"
+            query = f"SELECT {PAGE_COLUMNS} FROM arrays WHERE (created_at, id) {op} (?, ?) {PAGE_ORDER} LIMIT ?"
+            params = (PREVIEW_BYTES, PREVIEW_BYTES) + tuple(after) + (limit,)
+        with self.lock, METRICS.timer("db.page"):
+            return self.conn.execute(query, params).fetchall()
+
+    def page_at(self, offset, limit):
+        """
+        Страница строк, начинающаяся с позиции offset. Пропуск строк линеен
+        по offset (обход индекса), поэтому используется только для переходов
+        по ползунку - последовательная прокрутка идет через page
+        """
+        with self.lock, METRICS.timer("db.page_at"):
+            return self.conn.execute(
+                f"SELECT {PAGE_COLUMNS} FROM arrays {PAGE_ORDER} LIMIT ? OFFSET ?",
+                (PREVIEW_BYTES, PREVIEW_BYTES, limit, offset)
+            ).fetchall()
+
+    def key_before(self, key, count):
+        """
+        Ключ строки, стоящей на count строк выше строки key (или самой верхней)
+        :return: (ключ (created_at, id), на сколько строк он выше key)
+        """
+        with self.lock, METRICS.timer("db.key_before"):
+            rows = self.conn.execute(
+                "SELECT created_at, id FROM arrays WHERE (created_at, id) > (?, ?) "
+                "ORDER BY created_at, id LIMIT ?",
+                tuple(key) + (count,)
+            ).fetchall()
+        return (tuple(rows[-1]), len(rows)) if rows else (tuple(key), 0)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+class ConnectionPool:
+    """
+    Соединения с одной БД для многопоточного сервера. В режиме WAL читатели
+    не блокируют ни друг друга, ни писателя, а писатель в SQLite всегда один,
+    поэтому запись идет через единственное хранилище writer (дополнительные
+    пишущие соединения только ждали бы блокировку БД), а чтение - через
+    соединения-читатели, выдаваемые reader() по одному на поток
+    """
+
+    def __init__(self, path='arrays.db', readers=POOL_READERS, **pragmas):
+        """
+        :param path: путь к файлу БД (":memory:" не подходит - у каждого
+            соединения была бы своя БД)
+        :param readers: количество соединений-читателей
+        :param pragmas: synchronous и cache_size для ArrayStorage; журнал всегда WAL
+        """
+        self.writer = ArrayStorage(path, journal_mode="WAL", **pragmas)
+        self._readers = queue.Queue()
+        for _ in range(readers):
+            self._readers.put(ArrayStorage(path, journal_mode=None, **pragmas))
+        self.size = readers
+
+    @contextmanager
+    def reader(self):
+        """Соединение-читатель на время блока with (ожидает свободное)"""
+        storage = self._readers.get()
+        try:
+            yield storage
+        finally:
+            self._readers.put(storage)
+
+    def close(self):
+        """Закрытие всех соединений (читатели должны быть возвращены в пул)"""
+        for _ in range(self.size):
+            self._readers.get().close()
+        self.writer.close()
+
+
+class MetricsTable:
+    """
+    Запись событий реестра метрик в таблицу metrics той же БД.
+    События копятся в памяти и записываются пачками по batch_size;
+    пока соединение находится внутри транзакции (например, bulk_insert),
+    запись откладывается, чтобы не зафиксировать транзакцию раньше времени
+    """
+
+    def __init__(self, storage, metrics=METRICS, batch_size=METRICS_BATCH):
+        """
+        :param storage: ArrayStorage, в БД которого пишутся события
+        :param metrics: реестр, на который подписывается таблица
+        :param batch_size: сколько событий накапливать перед записью
+        """
+        self.storage = storage
+        self.metrics = metrics
+        self.batch_size = batch_size
+        self._pending = []
+        self._lock = threading.Lock()
+        with storage.lock:
+            storage.conn.execute('''
+                CREATE TABLE IF NOT EXISTS metrics (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    seconds REAL NOT NULL,
+                    details TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            ''')
+            storage.conn.commit()
+        metrics.subscribe(self.on_event)
+
+    def on_event(self, name, seconds, details):
+        """Подписчик реестра: событие ставится в очередь на запись"""
+        with self._lock:
+            self._pending.append((name, seconds, json.dumps(details, ensure_ascii=False) if details else None))
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def flush(self):
+        """
+        Запись накопленных событий
+        :return: False, если запись отложена из-за незавершенной транзакции
+        """
+        with self.storage.lock:
+            if self.storage.conn.in_transaction:
+                return False
+            with self._lock:
+                rows, self._pending = self._pending, []
+            if rows:
+                self.storage.conn.executemany("INSERT INTO metrics (name, seconds, details) VALUES (?, ?, ?)", rows)
+                self.storage.conn.commit()
+        return True
+
+    def close(self):
+        """Отписка от реестра и запись оставшихся событий"""
+        self.metrics.unsubscribe(self.on_event)
+        self.flush()
+
+
+def format_preview(value, limit=20):
+    """
+    Краткое текстовое представление массива для таблицы
+    :param value: значение столбца или его начало (BLOB или текст старой
+        схемы - в том числе некорректный, который _migrate_v2 не конвертирует)
+    :param limit: максимальная длина строки
+    :return: строка, обрезанная многоточием
+    """
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        # Текст показывается как есть: начало строки может обрываться на середине числа
+        text = ' '.join(value.split())
+        return text if len(text) <= limit else text[:limit - 3] + "..."
+    if value[:1] == bytes([FORMAT_INT64]):
+        # Начало BLOB обрезается до целого числа элементов int64
+        value = value[:1 + (len(value) - 1) // 8 * 8]
+    arr = decode_array(value)
+    # Каждое число с пробелом занимает хотя бы 2 символа - больше limit чисел не нужно
+    text = ' '.join(map(str, arr[:limit]))
+    return text if len(text) <= limit else text[:limit - 3] + "..."
@@ -0,0 +1,111 @@
+from sequences import common_prefix
+
+# Корзины не больше этого размера досортировываются без раскладки.
+# Подобрано командой `python benchmark.py strings`
+STRING_CUTOFF = 256
+
+# Диапазоны не больше этого размера multikey quicksort отдает встроенной сортировке
+MKQS_CUTOFF = 8
+
+
+def msd_string_sort(items, cutoff=STRING_CUTOFF, small_sort="timsort"):
+    """
+    Поразрядная сортировка (MSD) строк str или bytes.
+    На каждом уровне общий префикс всех строк корзины пропускается за один
+    шаг: он равен общему префиксу минимальной и максимальной строки. Затем
+    строки раскладываются по символу (для bytes - байту) на позиции depth,
+    причем строки, закончившиеся на depth, образуют самую младшую корзину.
+    Мелкие корзины досортировываются встроенной сортировкой или multikey
+    quicksort (Bentley-Sedgewick), который тоже сравнивает только символы
+    после известного общего префикса.
+    Обход корзин выполняется по явному стеку, поэтому длина строк не
+    ограничена глубиной рекурсии Python.
+    :param items: последовательность строк одного типа (str или bytes)
+    :param cutoff: размер корзины, начиная с которого раскладка
+        заменяется досортировкой small_sort
+    :param small_sort: досортировка мелких корзин: "timsort" - встроенной
+        сортировкой (в CPython быстрее: сравнение строк выполняется на C),
+        "mkqs" - multikey quicksort
+    :return: отсортированный список
+    """
+    if small_sort not in ("timsort", "mkqs"):
+        raise ValueError(f"Неизвестный способ досортировки: {small_sort}")
+
+    result = []
+    stack = [(list(items), 0)]
+    while stack:
+        bucket, depth = stack.pop()
+        if len(bucket) <= cutoff:
+            if small_sort == "mkqs":
+                _multikey_quicksort(bucket, 0, len(bucket), depth)
+            else:
+                bucket.sort()
+            result.extend(bucket)
+            continue
+
+        # Общий префикс корзины - общий префикс ее минимума и максимума
+        lo, hi = min(bucket), max(bucket)
+        if lo == hi:
+            result.extend(bucket)  # Все строки равны
+            continue
+        depth = common_prefix(lo, hi, depth)
+
+        # Раскладка по символу на позиции depth; срез длины 0 или 1 одинаково
+        # работает для str и bytes, а пустой срез (конец строки) меньше любого символа
+        buckets = {}
+        for s in bucket:
+            char = s[depth:depth + 1]
+            target = buckets.get(char)
+            if target is None:
+                buckets[char] = [s]
+            else:
+                target.append(s)
+
+        chars = sorted(buckets)
+        if not chars[0]:
+            # Закончившиеся строки равны общему префиксу и идут первыми
+            result.extend(buckets.pop(chars[0]))
+            chars = chars[1:]
+        # Корзины кладутся в стек в обратном порядке, чтобы извлекаться по возрастанию
+        for char in reversed(chars):
+            stack.append((buckets[char], depth + 1))
+    return result
+
+
+def _multikey_quicksort(a, lo, hi, depth):
+    """
+    Multikey quicksort диапазона a[lo:hi] на месте: трехчастное разбиение
+    по символу на позиции depth, средняя часть сортируется со следующей позиции.
+    Все строки диапазона совпадают в первых depth символах
+    """
+    stack = [(lo, hi, depth)]
+    while stack:
+        lo, hi, depth = stack.pop()
+        if hi - lo <= MKQS_CUTOFF:
+            if hi - lo > 1:
+                a[lo:hi] = sorted(a[lo:hi])
+            continue
+
+        mid = (lo + hi) // 2
+        pivot = a[mid][depth:depth + 1]
+
+        # Разбиение Дейкстры: a[lo:lt] < pivot, a[lt:i] == pivot, a[gt:hi] > pivot
+        lt, i, gt = lo, lo, hi
+        while i < gt:
+            char = a[i][depth:depth + 1]
+            if char < pivot:
+                a[lt], a[i] = a[i], a[lt]
+                lt += 1
+                i += 1
+            elif char > pivot:
+                gt -= 1
+                a[gt], a[i] = a[i], a[gt]
+            else:
+                i += 1
+
+        stack.append((lo, lt, depth))
+        stack.append((gt, hi, depth))
+        if pivot:
+            # Равные по символу строки продолжаются со следующей позиции;
+            # при пустом pivot они закончились и уже равны
+            stack.append((lt, gt, depth + 1))
@@ -1,27 +1,34 @@
-import sqlite3
+import os
 import random
+import string
+import tempfile
 import time
-from main import msd_radix_sort
+from array import array
+from types import SimpleNamespace
+
+import RPS3
+import batch
+from array_file import write_array_file
+from external_sort import external_sort_file
+from incremental import INCREMENTAL_RATIO
+from main import SortStats, msd_radix_argsort, msd_radix_sort, msd_radix_sort_inplace, msd_radix_sort_many
+from parsing import parse_ints
+from partial_sort import msd_radix_iter, msd_radix_select, msd_radix_topk
+from sort_cache import SortCache
+from storage import ArrayStorage, decode_array, encode_array, format_preview
+from vector_sort import np
 
 
 class DatabaseTester:
     def __init__(self):
-        self.conn = sqlite3.connect('arrays.db')
+        self.storage = ArrayStorage('arrays.db')
+        self.conn = self.storage.conn
         self.cursor = self.conn.cursor()
         self.ensure_table_exists()
 
     def ensure_table_exists(self):
         """Проверяем существование таблицы и её структуру"""
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS arrays (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                array_data TEXT NOT NULL,
-                sorted_array_data TEXT,
-                is_sorted BOOLEAN DEFAULT 0,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        self.conn.commit()
+        self.storage.ensure_schema()
 
     def generate_random_array(self):
         """Генерация случайного массива"""
@@ -30,21 +37,11 @@ class DatabaseTester:
 
     def insert_arrays(self, count):
         """Тест вставки массивов в БД"""
-        start_time = time.time()
+        start_time = time.perf_counter()
         success = True
 
         try:
-            for _ in range(count):
-                arr = self.generate_random_array()
-                arr_str = ' '.join(map(str, arr))
-                sorted_str = ' '.join(map(str, msd_radix_sort(arr)))
-
-                self.cursor.execute(
-                    "INSERT INTO arrays (array_data, sorted_array_data, is_sorted) VALUES (?, ?, ?)",
-                    (arr_str, sorted_str, 1)
-                )
-
-            self.conn.commit()
+            self.storage.bulk_insert(self.generate_random_array() for _ in range(count))
 
             # Проверяем количество добавленных записей
             self.cursor.execute("SELECT COUNT(*) FROM arrays WHERE id > ?",
@@ -54,12 +51,17 @@ class DatabaseTester:
             if actual_count != count:
                 success = False
 
+            # Счетчик строк для окна просмотра должен совпадать с COUNT(*)
+            self.cursor.execute("SELECT COUNT(*) FROM arrays")
+            if self.storage.count() != self.cursor.fetchone()[0]:
+                success = False
+
         except Exception as e:
             print(f"Ошибка: {str(e)}")
             success = False
             self.conn.rollback()
 
-        elapsed_time = time.time() - start_time
+        elapsed_time = time.perf_counter() - start_time
         return success, elapsed_time
 
     def get_last_id(self):
@@ -98,7 +100,7 @@ class DatabaseTester:
         # Подготовка тестовых данных
         self.prepare_test_data(db_size)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
         success = True
 
         try:
@@ -112,38 +114,55 @@ class DatabaseTester:
 
             total_time = 0
             processed = 0
+            # Все выбранные массивы уже отсортированы в БД - кэш не должен сортировать
+            cache = SortCache(self.storage)
 
             for array_id in random_ids:
                 self.cursor.execute("SELECT array_data FROM arrays WHERE id = ?", (array_id,))
                 arr_data = self.cursor.fetchone()[0]
 
                 # Замер времени сортировки
-                sort_start = time.time()
-                arr = list(map(int, arr_data.split()))
+                sort_start = time.perf_counter()
+                arr = decode_array(arr_data)
                 sorted_arr = msd_radix_sort(arr)
-                sort_time = time.time() - sort_start
+                sort_time = time.perf_counter() - sort_start
 
                 total_time += sort_time
                 processed += 1
 
                 # Проверка правильности сортировки
-                expected = ' '.join(map(str, sorted_arr))
+                expected = list(sorted_arr)
                 self.cursor.execute(
                     "SELECT sorted_array_data FROM arrays WHERE id = ?",
                     (array_id,)
                 )
-                actual = self.cursor.fetchone()[0]
+                actual = list(decode_array(self.cursor.fetchone()[0]))
 
                 if expected != actual:
                     success = False
                     print(f"Ошибка сортировки для массива ID {array_id}")
 
+                if list(cache.sort(arr)) != expected:
+                    success = False
+                    print(f"Ошибка кэша сортировки для массива ID {array_id}")
+
+            if cache.misses:
+                success = False
+
+            # Предпросмотр окна просмотра RPS3 строится по началу BLOB
+            for row in self.storage.page(test_size):
+                stored = self.storage.get(row[0])
+                if format_preview(row[1]) != format_preview(encode_array(stored[0])):
+                    success = False
+                    print(f"Ошибка предпросмотра массива ID {row[0]}")
+
             avg_time = total_time / processed if processed > 0 else 0
-            elapsed_time = time.time() - start_time
+            elapsed_time = time.perf_counter() - start_time
 
             print(f"Результат: {'Успех' if success else 'Ошибка'}")
             print(f"Общее время: {elapsed_time:.4f} сек")
             print(f"Среднее время на массив: {avg_time:.6f} сек")
+            print(f"Кэш: {cache.format_stats()}")
 
             return success, elapsed_time, avg_time
 
@@ -158,17 +177,7 @@ class DatabaseTester:
         self.conn.commit()
 
         # Добавляем новые тестовые данные
-        for _ in range(count):
-            arr = self.generate_random_array()
-            arr_str = ' '.join(map(str, arr))
-            sorted_str = ' '.join(map(str, msd_radix_sort(arr)))
-
-            self.cursor.execute(
-                "INSERT INTO arrays (array_data, sorted_array_data, is_sorted) VALUES (?, ?, ?)",
-                (arr_str, sorted_str, 1)
-            )
-
-        self.conn.commit()
+        self.storage.bulk_insert(self.generate_random_array() for _ in range(count))
 
     def test_clear_database(self, db_size=100):
         """Тест e: очистка базы данных"""
@@ -177,7 +186,7 @@ class DatabaseTester:
         # Подготовка тестовых данных
         self.prepare_test_data(db_size)
 
-        start_time = time.time()
+        start_time = time.perf_counter()
         success = True
 
         try:
@@ -200,11 +209,309 @@ class DatabaseTester:
             if after_count != 0:
                 success = False
 
-            elapsed_time = time.time() - start_time
+            elapsed_time = time.perf_counter() - start_time
+
+            print(f"Результат: {'Успех' if success else 'Ошибка'}")
+            print(f"Время выполнения: {elapsed_time:.4f} сек")
+
+            return success, elapsed_time
+
+        except Exception as e:
+            print(f"Ошибка: {str(e)}")
+            return False, 0
+
+    def test_incremental_update(self, db_size=100):
+        """Тест f: инкрементальная пересортировка измененных и дополненных массивов"""
+        print(f"\nТест f: Инкрементальное обновление ({db_size} массивов)")
+
+        self.prepare_test_data(db_size)
+        start_time = time.perf_counter()
+        success = True
+
+        # Длины массивов, переданных сортировке: сортироваться должна только разность
+        sorted_lengths = []
+
+        def sort_func(values):
+            sorted_lengths.append(len(values))
+            return msd_radix_sort(values)
+
+        try:
+            self.cursor.execute("SELECT id FROM arrays")
+            for (array_id,) in self.cursor.fetchall():
+                arr = list(self.storage.get(array_id)[0])
+                # Правка одного числа и дописывание нескольких
+                arr[random.randrange(len(arr))] = random.randint(0, 1000)
+                arr += self.generate_random_array()[:3]
+                sorted_lengths.clear()
+                if list(self.storage.update_incremental(array_id, arr, sort_func)) != sorted(arr):
+                    success = False
+                    print(f"Ошибка обновления массива ID {array_id}")
+                # Разность - до 5 чисел (замененное, новое и 3 дописанных); если она не больше
+                # len(arr) / INCREMENTAL_RATIO, сортироваться должны только новые числа
+                if len(arr) // INCREMENTAL_RATIO >= 5 and sum(sorted_lengths) > 4:
+                    success = False
+                    print(f"Массив ID {array_id} отсортирован целиком вместо разности")
+
+                values = self.generate_random_array()
+                sorted_lengths.clear()
+                if list(self.storage.append_to_array(array_id, values, sort_func)) != sorted(arr + values):
+                    success = False
+                    print(f"Ошибка дописывания в массив ID {array_id}")
+                if sum(sorted_lengths) > len(values):
+                    success = False
+                    print(f"Массив ID {array_id} отсортирован целиком вместо дописанных чисел")
+
+                stored, stored_sorted = self.storage.get(array_id)
+                if list(stored) != arr + values or list(stored_sorted) != sorted(arr + values):
+                    success = False
+                    print(f"Ошибка записи массива ID {array_id}")
+
+            elapsed_time = time.perf_counter() - start_time
+            print(f"Результат: {'Успех' if success else 'Ошибка'}")
+            print(f"Время выполнения: {elapsed_time:.4f} сек")
+            return success, elapsed_time
+
+        except Exception as e:
+            print(f"Ошибка: {str(e)}")
+            return False, 0
+
+    def test_batch_to_db(self, jobs=2):
+        """Тест g: пакетная сортировка двоичных файлов в нескольких процессах с записью в БД"""
+        print(f"\nТест g: Пакетная загрузка двоичных файлов в БД ({jobs} процесса)")
+
+        self.prepare_test_data(0)
+        start_time = time.perf_counter()
+        success = True
+
+        try:
+            # Массивы из 0 и 1 числа сортировка возвращает как есть - представлением файла
+            arrays = [self.generate_random_array(), [7], [], self.generate_random_array()]
+            with tempfile.TemporaryDirectory() as directory:
+                paths = []
+                for number, arr in enumerate(arrays):
+                    paths.append(os.path.join(directory, f"{number}.bin"))
+                    write_array_file(arr, paths[-1])
+                code = batch.main(["--input-format", "binary", "-j", str(jobs), "--to-db", "arrays.db"] + paths)
+            if code != 0:
+                success = False
+                print(f"Код завершения пакетного режима: {code}")
+
+            self.cursor.execute("SELECT id FROM arrays ORDER BY id")
+            stored = [self.storage.get(array_id) for (array_id,) in self.cursor.fetchall()]
+            if [(list(arr), list(sorted_arr)) for arr, sorted_arr in stored] != \
+                    [(arr, sorted(arr)) for arr in arrays]:
+                success = False
+                print("Массивы в БД не совпадают с входными файлами")
+
+            elapsed_time = time.perf_counter() - start_time
+            print(f"Результат: {'Успех' if success else 'Ошибка'}")
+            print(f"Время выполнения: {elapsed_time:.4f} сек")
+            return success, elapsed_time
+
+        except Exception as e:
+            print(f"Ошибка: {str(e)}")
+            return False, 0
+
+    def test_numpy_input(self, size=3000):
+        """Тест h: сортировка массивов numpy каждым движком"""
+        print(f"\nТест h: Сортировка массивов numpy всеми движками ({size} чисел)")
+        if np is None:
+            print("Результат: Успех (numpy не установлен, тест пропущен)")
+            return True, 0
 
+        start_time = time.perf_counter()
+        success = True
+
+        try:
+            rng = np.random.default_rng(0)
+            arrays = {
+                "int64 со знаком": rng.integers(-2 ** 62, 2 ** 62, size=size),
+                "int64 малой длины": np.array([5, -3, 2 ** 62, -2 ** 62, 7]),
+                # Маска разряда шире узкого типа: ключи не должны оставаться скалярами numpy
+                "uint8": rng.integers(0, 256, size=size).astype(np.uint8),
+                "int8": rng.integers(-128, 128, size=size).astype(np.int8),
+            }
+            for name, arr in arrays.items():
+                expected = np.sort(arr).tolist()
+                for engine in ("auto", "lists", "iterative", "inplace", "numpy"):
+                    for parallel in (False, True):
+                        result = msd_radix_sort(arr, engine=engine, parallel=parallel, workers=2)
+                        if not np.array_equal(result, expected):
+                            success = False
+                            print(f"Неверная сортировка ({name}, engine={engine}, parallel={parallel})")
+
+            elapsed_time = time.perf_counter() - start_time
             print(f"Результат: {'Успех' if success else 'Ошибка'}")
             print(f"Время выполнения: {elapsed_time:.4f} сек")
+            return success, elapsed_time
+
+        except Exception as e:
+            print(f"Ошибка: {str(e)}")
+            return False, 0
+
+    def test_sort_stats(self, size=10000):
+        """Тест i: счетчики по уровням для упорядоченного входа"""
+        print(f"\nТест i: Счетчики движков для упорядоченного входа ({size} чисел)")
+
+        start_time = time.perf_counter()
+        success = True
 
+        try:
+            arr = sorted(random.getrandbits(32) for _ in range(size))
+            for engine in ("lists", "iterative", "inplace"):
+                for name, values in (("по возрастанию", arr), ("по убыванию", arr[::-1])):
+                    # С переданным stats упорядоченный вход не должен уходить в обход движка
+                    stats = SortStats()
+                    if msd_radix_sort(values, engine=engine, stats=stats) != arr:
+                        success = False
+                        print(f"Неверная сортировка ({name}, engine={engine})")
+                    if stats.shortcut is not None or not stats.levels:
+                        success = False
+                        print(f"Счетчики не заполнены ({name}, engine={engine})")
+
+            elapsed_time = time.perf_counter() - start_time
+            print(f"Результат: {'Успех' if success else 'Ошибка'}")
+            print(f"Время выполнения: {elapsed_time:.4f} сек")
+            return success, elapsed_time
+
+        except Exception as e:
+            print(f"Ошибка: {str(e)}")
+            return False, 0
+
+    def test_corrupt_legacy_row(self):
+        """Тест j: загрузка поврежденной строки старой схемы"""
+        print("\nТест j: Поврежденная строка старой схемы")
+
+        self.prepare_test_data(0)
+        start_time = time.perf_counter()
+        success = True
+
+        try:
+            # Текст, который миграция не смогла разобрать, остается в строке как есть
+            text = "1 2 три"
+            self.cursor.execute("INSERT INTO arrays (array_data, sorted_array_data) VALUES (?, NULL)", (text,))
+            self.conn.commit()
+            array_id = self.cursor.lastrowid
+
+            try:
+                self.storage.get(array_id)
+                success = False
+                print("Поврежденная строка загружена без ошибки")
+            except ValueError:
+                pass
+            if format_preview(text) != text:
+                success = False
+                print("Предпросмотр поврежденной строки не совпадает с ее текстом")
+
+            # Окно должно показать ошибку, а не оборвать обработчик исключением
+            errors = []
+            app = RPS3.ArraySorterApp.__new__(RPS3.ArraySorterApp)
+            app.storage = ArrayStorage('arrays.db')
+            app.tree = SimpleNamespace(selection=lambda: ["row"], item=lambda row: {"values": [array_id]})
+            app.status_var = SimpleNamespace(set=lambda status: None)
+            show_error = RPS3.messagebox.showerror
+            RPS3.messagebox.showerror = lambda title, message: errors.append(message)
+            try:
+                app.load_from_db()
+            finally:
+                RPS3.messagebox.showerror = show_error
+                app.storage.close()
+            if len(errors) != 1:
+                success = False
+                print("Ошибка загрузки не показана пользователю")
+
+            elapsed_time = time.perf_counter() - start_time
+            print(f"Результат: {'Успех' if success else 'Ошибка'}")
+            print(f"Время выполнения: {elapsed_time:.4f} сек")
+            return success, elapsed_time
+
+        except Exception as e:
+            print(f"Ошибка: {str(e)}")
+            return False, 0
+
+    def sort_variants(self, arr, workdir):
+        """
+        Результаты всех движков и вариантов сортировки для списка arr
+        :return: список (название, результат, ожидаемый результат)
+        """
+        expected = sorted(arr)
+        results = []
+        for engine in ("auto", "lists", "iterative", "inplace", "numpy"):
+            if engine != "numpy" or np is not None:
+                results.append((f"engine={engine}", list(msd_radix_sort(arr, engine=engine)), expected))
+        results.append(("parallel", list(msd_radix_sort(arr, parallel=True, workers=2)), expected))
+
+        buf = array('q', arr)
+        msd_radix_sort_inplace(buf)
+        results.append(("msd_radix_sort_inplace", list(buf), expected))
+
+        many = msd_radix_sort_many([arr, arr[::-1], expected])
+        results.append(("msd_radix_sort_many", [list(part) for part in many], [expected] * 3))
+
+        # Устойчивость: равные ключи - в исходном порядке индексов
+        results.append(("msd_radix_argsort", list(msd_radix_argsort(arr)), sorted(range(len(arr)), key=arr.__getitem__)))
+
+        results.append(("msd_radix_iter", list(msd_radix_iter(arr)), expected))
+        results.append(("msd_radix_iter reverse", list(msd_radix_iter(arr, reverse=True)), expected[::-1]))
+        results.append(("msd_radix_topk", msd_radix_topk(arr, 10), expected[:10]))
+        results.append(("msd_radix_topk largest", msd_radix_topk(arr, 10, largest=True), expected[::-1][:10]))
+        ranks = [0, len(arr) // 2, len(arr) - 1] if arr else []
+        results.append(("msd_radix_select", [msd_radix_select(arr, rank) for rank in ranks],
+                        [expected[rank] for rank in ranks]))
+
+        # Внешняя сортировка с малым лимитом памяти раскладывает вход по файлам-корзинам
+        input_path = os.path.join(workdir, "input.txt")
+        output_path = os.path.join(workdir, "output.txt")
+        with open(input_path, "w") as f:
+            f.write(" ".join(map(str, arr)))
+        external_sort_file(input_path, output_path, memory_limit=16 * 1024, tmp_dir=workdir)
+        with open(output_path) as f:
+            results.append(("external_sort_file", list(parse_ints(f.read())), expected))
+
+        if np is not None:
+            values = np.array(arr, dtype=np.int64)
+            for engine in ("auto", "lists", "iterative", "inplace", "numpy"):
+                result = msd_radix_sort(values, engine=engine)
+                results.append((f"numpy, engine={engine}", result.tolist(), expected))
+            many = msd_radix_sort_many([values, values[::-1]])
+            results.append(("numpy, msd_radix_sort_many", [list(part) for part in many], [expected] * 2))
+            results.append(("numpy, msd_radix_argsort", msd_radix_argsort(values).tolist(),
+                            sorted(range(len(arr)), key=arr.__getitem__)))
+            results.append(("numpy, msd_radix_topk", msd_radix_topk(values, 10), expected[:10]))
+        return results
+
+    def test_sort_engines(self, size=3000):
+        """Тест k: сравнение всех движков и вариантов сортировки с sorted()"""
+        print(f"\nТест k: Сравнение движков сортировки с sorted() ({size} чисел)")
+
+        start_time = time.perf_counter()
+        success = True
+
+        try:
+            inputs = {
+                "со знаком": [random.randint(-2 ** 40, 2 ** 40) for _ in range(size)],
+                "много повторов": [random.randint(-5, 5) for _ in range(size)],
+                "пустой": [],
+                "один элемент": [42],
+            }
+            with tempfile.TemporaryDirectory() as workdir:
+                for name, arr in inputs.items():
+                    for variant, result, expected in self.sort_variants(arr, workdir):
+                        if result != expected:
+                            success = False
+                            print(f"Неверная сортировка ({name}, {variant})")
+
+            # Строки str и bytes сортирует string_sort (3 буквы - много общих префиксов и повторов)
+            words = ["".join(random.choices(string.ascii_lowercase[:3], k=random.randint(0, 12)))
+                     for _ in range(size)]
+            for items in (words, [word.encode() for word in words], [], ["x"]):
+                if msd_radix_sort(items) != sorted(items):
+                    success = False
+                    print(f"Неверная сортировка строк ({len(items)} строк)")
+
+            elapsed_time = time.perf_counter() - start_time
+            print(f"Результат: {'Успех' if success else 'Ошибка'}")
+            print(f"Время выполнения: {elapsed_time:.4f} сек")
             return success, elapsed_time
 
         except Exception as e:
@@ -228,12 +535,30 @@ class DatabaseTester:
         for size in [100, 1000, 10000]:
             self.test_clear_database(db_size=size)
 
+        # Тест инкрементального обновления
+        self.test_incremental_update()
+
+        # Тест пакетного режима
+        self.test_batch_to_db()
+
+        # Тест сортировки массивов numpy
+        self.test_numpy_input()
+
+        # Тест счетчиков сортировки
+        self.test_sort_stats()
+
+        # Тест поврежденной строки старой схемы
+        self.test_corrupt_legacy_row()
+
+        # Тест всех движков и вариантов сортировки
+        self.test_sort_engines()
+
         print("\n=== Тестирование завершено ===")
 
     def __del__(self):
         """Закрытие соединения с БД"""
-        if hasattr(self, 'conn'):
-            self.conn.close()
+        if hasattr(self, 'storage'):
+            self.storage.close()
 
 
 if __name__ == "__main__":
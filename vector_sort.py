@@ -0,0 +1,149 @@
+try:
+    import numpy as np
+except ImportError:  # numpy - необязательная зависимость
+    np = None
+
+# Сегменты не длиннее этого порога досортировываются одним вызовом numpy.sort
+NUMPY_CUTOFF = 2048
+
+
+def is_numpy_array(obj):
+    """Проверка, является ли obj массивом numpy"""
+    return np is not None and isinstance(obj, np.ndarray)
+
+
+def to_int64(values, copy=True):
+    """
+    Приведение к массиву numpy.int64 без порчи данных: astype молча
+    переворачивает знак uint64 от 2^63 и отбрасывает дробную часть
+    :param values: массив numpy или последовательность целых чисел
+    :param copy: всегда возвращать новый массив
+    :return: массив numpy.int64
+    :raise ValueError: нецелый тип элементов или числа вне диапазона int64
+    """
+    a = np.asarray(values)
+    if a.size == 0:
+        return np.zeros(0, dtype=np.int64)
+    if a.dtype.kind not in "iu":
+        if a.dtype.kind != "O":
+            raise ValueError(f"Сортируются только целые числа, а не {a.dtype}")
+        # Список с числами шире int64 (или не числами)
+        try:
+            return np.array(values, dtype=np.int64)
+        except (OverflowError, TypeError):
+            raise ValueError("Числа не помещаются в int64") from None
+    if a.dtype == np.uint64 and int(a.max()) >= 1 << 63:
+        raise ValueError("Числа не помещаются в int64")
+    return a.astype(np.int64, copy=copy)
+
+
+def numpy_msd_radix_sort(values, radix=256, cutoff=NUMPY_CUTOFF, advance=None, stats=None):
+    """
+    Векторизованная поразрядная сортировка (MSD) на numpy.
+    Цифры целого сегмента вычисляются одной операцией над массивом,
+    границы корзин - через np.bincount и np.cumsum, а перестановка
+    выполняется одним групповым присваиванием. Соседние мелкие корзины
+    объединяются и досортировываются одним вызовом numpy.sort.
+    Сортируются ключи num - min в uint64 (вычитание по модулю 2^64
+    сохраняет порядок на всем диапазоне int64), поэтому отрицательные
+    числа поддерживаются, а количество разрядов определяется диапазоном
+    max - min.
+    :param values: массив numpy или список целых чисел в диапазоне int64
+        (иначе ValueError, см. to_int64)
+    :param radix: основание системы счисления (по умолчанию 256)
+    :param cutoff: размер сегмента, начиная с которого сортировка
+        передается numpy.sort
+    :param advance: функция advance(количество) для учета прогресса:
+        получает число элементов, занявших окончательные места
+    :param stats: main.SortStats для счетчиков по уровням или None
+    :return: новый отсортированный массив numpy.int64
+    """
+    if np is None:
+        raise ImportError("Для векторизованной сортировки требуется пакет numpy")
+
+    a = to_int64(values)
+    if a.size <= 1:
+        return a
+
+    # Находим вес старшего разряда по диапазону значений
+    min_val = int(a.min())
+    span = int(a.max()) - min_val
+    digit = 1
+    while span // digit > 0:
+        digit *= radix
+    digit //= radix
+    if digit == 0:
+        return a  # Все элементы равны
+
+    bias = np.uint64(min_val % (1 << 64))
+    a = a.view(np.uint64)
+    if bias:
+        a -= bias
+
+    # Для radix <= 65536 numpy выполняет устойчивую сортировку цифр за O(n)
+    digit_dtype = np.uint8 if radix <= 256 else np.uint16 if radix <= 65536 else np.int64
+
+    # Номер уровня по весу разряда - для счетчиков
+    levels = {}
+    weight = digit
+    while weight:
+        levels[weight] = len(levels)
+        weight //= radix
+
+    stack = [(0, a.size, digit)]
+    while stack:
+        start, end, digit = stack.pop()
+        segment = a[start:end]
+        if end - start <= cutoff:
+            segment.sort()
+            if advance is not None:
+                advance(end - start)
+            if stats is not None:
+                level = stats.level(levels[digit])
+                level.small += 1
+                level.small_elements += end - start
+            continue
+
+        # Цифры текущего разряда для всего сегмента сразу;
+        # для степени двойки - сдвигом и маской
+        if radix & (radix - 1) == 0:
+            digits = ((segment >> np.uint64(digit.bit_length() - 1)) & np.uint64(radix - 1)).astype(digit_dtype)
+        else:
+            digits = ((segment // np.uint64(digit)) % np.uint64(radix)).astype(digit_dtype)
+        counts = np.bincount(digits, minlength=radix)
+        segment[:] = segment[np.argsort(digits, kind="stable")]
+        if stats is not None:
+            level = stats.level(levels[digit])
+            level.ranges += 1
+            level.elements += end - start
+            level.buckets += int(np.count_nonzero(counts))
+
+        next_digit = digit // radix
+        if next_digit == 0:
+            if advance is not None:
+                advance(end - start)
+            continue
+
+        # Большие корзины сортируем дальше, соседние мелкие - одним вызовом
+        ends = np.cumsum(counts) + start
+        run_start = run_end = start
+        for bucket_end, count in zip(ends.tolist(), counts.tolist()):
+            if count > cutoff:
+                if run_end - run_start > 1:
+                    a[run_start:run_end].sort()
+                stack.append((bucket_end - count, bucket_end, next_digit))
+                run_start = bucket_end
+            elif bucket_end - run_start > cutoff:
+                if run_end - run_start > 1:
+                    a[run_start:run_end].sort()
+                run_start = bucket_end - count
+            run_end = bucket_end
+        if run_end - run_start > 1:
+            a[run_start:run_end].sort()
+        if advance is not None:
+            # Все, что не отложено в стек, уже на своих местах
+            advance(end - start - int(counts[counts > cutoff].sum()))
+
+    if bias:
+        a += bias
+    return a.view(np.int64)